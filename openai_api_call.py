@@ -1,54 +1,737 @@
+import asyncio
+import collections
+import email.utils
+import json
+import random
+import re
 import requests
-import traceback
+import threading
 import time
 import os
+from concurrent.futures import ThreadPoolExecutor, as_completed, wait
 from dotenv import load_dotenv
+from requests.adapters import HTTPAdapter
+from urllib3.connection import HTTPConnection, HTTPSConnection
+from urllib3.connectionpool import HTTPConnectionPool, HTTPSConnectionPool
 
 load_dotenv()
 
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
+# Keep-alive pool: connections kept open per host, and (connect, read) timeouts in seconds
+OPENAI_POOL_SIZE = int(os.getenv("OPENAI_POOL_SIZE", "8"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "10"))
+OPENAI_READ_TIMEOUT = float(os.getenv("OPENAI_READ_TIMEOUT", "420"))
+# Upper bound on in-flight async requests across all afetch_* calls on one client
+OPENAI_MAX_CONCURRENCY = int(os.getenv("OPENAI_MAX_CONCURRENCY", "8"))
+# Account limits the client paces itself to (requests and tokens per minute)
+OPENAI_RPM = int(os.getenv("OPENAI_RPM", "500"))
+OPENAI_TPM = int(os.getenv("OPENAI_TPM", "200000"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "5"))
+# Fail fast for OPENAI_CIRCUIT_COOLDOWN seconds after this many consecutive failures
+OPENAI_CIRCUIT_FAILURES = int(os.getenv("OPENAI_CIRCUIT_FAILURES", "5"))
+OPENAI_CIRCUIT_COOLDOWN = float(os.getenv("OPENAI_CIRCUIT_COOLDOWN", "60"))
+# Hedging: when a call has not returned within this percentile of recent latencies, send a
+# duplicate (optionally to another model or endpoint) and take whichever valid reply comes first
+OPENAI_HEDGE = os.getenv("OPENAI_HEDGE", "0") == "1"
+OPENAI_HEDGE_PERCENTILE = float(os.getenv("OPENAI_HEDGE_PERCENTILE", "95"))
+# Latency samples needed before hedging starts
+OPENAI_HEDGE_MIN_SAMPLES = int(os.getenv("OPENAI_HEDGE_MIN_SAMPLES", "20"))
+OPENAI_HEDGE_MODEL = os.getenv("OPENAI_HEDGE_MODEL") or None  # must accept the same response_format
+OPENAI_HEDGE_BASE_URL = (os.getenv("OPENAI_HEDGE_BASE_URL") or "").rstrip("/") or None
+
+RETRYABLE_STATUS = {408, 409, 429, 500, 502, 503, 504}
+# Completion tokens reserved per request when the body sets no max_tokens
+DEFAULT_COMPLETION_ESTIMATE = 400
+
+
+class RequestFailed(Exception):
+    """A request that could not be completed; ``data`` is its body so it can be replayed later."""
+
+    def __init__(self, message: str, data: dict):
+        super().__init__(message)
+        self.data = data
+
+
+class RetriesExhausted(RequestFailed):
+    pass
+
+
+class CircuitOpenError(RequestFailed):
+    pass
+
+
+def _parse_duration(value: str) -> float | None:
+    """Seconds in a rate-limit reset header such as "1s", "6m0s" or "20ms"."""
+    parts = re.findall(r"(\d+(?:\.\d+)?)(ms|h|m|s)", value or "")
+    if not parts:
+        return None
+    scale = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+    return sum(float(n) * scale[unit] for n, unit in parts)
+
+
+def retry_after(headers) -> float | None:
+    """Server-requested wait, from Retry-After / retry-after-ms or the rate-limit reset headers."""
+    if headers.get("retry-after-ms"):
+        try:
+            return float(headers["retry-after-ms"]) / 1000
+        except ValueError:
+            pass
+    value = headers.get("retry-after")
+    if value:
+        try:
+            return float(value)
+        except ValueError:
+            try:
+                return max(0.0, email.utils.parsedate_to_datetime(value).timestamp() - time.time())
+            except (TypeError, ValueError):
+                pass
+    resets = [
+        _parse_duration(headers.get(h))
+        for h in ("x-ratelimit-reset-requests", "x-ratelimit-reset-tokens")
+        if headers.get(h) and headers.get(h.replace("reset", "remaining")) == "0"
+    ]
+    resets = [r for r in resets if r is not None]
+    return max(resets) if resets else None
+
+
+class TokenBucket:
+    """Refills ``per_minute`` units evenly over a minute; ``reserve`` returns how long to wait."""
+
+    def __init__(self, per_minute: int):
+        self.capacity = float(max(1, per_minute))
+        self.rate = self.capacity / 60.0
+        self.level = self.capacity
+        self.updated = time.monotonic()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def reserve(self, n: float) -> float:
+        # Reservations may drive the level negative; the caller waits for the deficit to refill
+        self._refill()
+        self.level -= n
+        return max(0.0, -self.level / self.rate)
+
+    def refund(self, n: float):
+        self._refill()
+        self.level = min(self.capacity, self.level + n)
+
+    def clamp(self, remaining: float):
+        """Never believe we have more left than the server says."""
+        self._refill()
+        self.level = min(self.level, remaining)
+
+
+class RateLimiter:
+    """Requests-per-minute and tokens-per-minute buckets, corrected by the server's rate-limit headers."""
+
+    def __init__(self, rpm: int = OPENAI_RPM, tpm: int = OPENAI_TPM):
+        self._lock = threading.Lock()
+        self.requests = TokenBucket(rpm)
+        self.tokens = TokenBucket(tpm)
+        self.waited_s = 0.0
+
+    @staticmethod
+    def estimate(data: dict) -> int:
+        prompt = len(json.dumps(data.get("messages", ""), ensure_ascii=False)) // 4
+        return prompt + int(data.get("max_tokens") or DEFAULT_COMPLETION_ESTIMATE)
+
+    def reserve(self, tokens: int) -> float:
+        with self._lock:
+            wait = max(self.requests.reserve(1), self.tokens.reserve(tokens))
+            self.waited_s += wait
+            return wait
+
+    def refund(self, tokens: int) -> None:
+        """Give back tokens reserved for a request that got no reply."""
+        with self._lock:
+            self.tokens.refund(tokens)
+
+    def observe(self, headers, estimate: int, usage: dict | None) -> None:
+        with self._lock:
+            if usage and usage.get("total_tokens"):
+                self.tokens.refund(estimate - usage["total_tokens"])
+            for bucket, header in ((self.requests, "x-ratelimit-remaining-requests"),
+                                   (self.tokens, "x-ratelimit-remaining-tokens")):
+                try:
+                    bucket.clamp(float(headers.get(header)))
+                except (TypeError, ValueError):
+                    pass
+
+
+class CircuitBreaker:
+    """
+    Opens after ``threshold`` consecutive failures; while open, calls fail
+    immediately. After ``cooldown`` seconds the circuit is half-open: one
+    trial call is let through and every other caller still fails fast until
+    the trial records its outcome. Success closes the circuit, and a failure
+    re-opens it for another cooldown. A trial that never reports back is
+    replaced by a new one after a further ``cooldown``.
+    """
+
+    def __init__(self, threshold: int = OPENAI_CIRCUIT_FAILURES, cooldown: float = OPENAI_CIRCUIT_COOLDOWN):
+        self._lock = threading.Lock()
+        self.threshold = max(1, threshold)
+        self.cooldown = cooldown
+        self.failures = 0
+        self.opened_at = None
+        self.trial_at = None
+        self.trips = 0
+
+    def check(self, data: dict) -> None:
+        with self._lock:
+            if self.opened_at is None:
+                return
+            now = time.monotonic()
+            if now - self.opened_at >= self.cooldown and (self.trial_at is None or now - self.trial_at >= self.cooldown):
+                self.trial_at = now
+                return
+            raise CircuitOpenError(
+                f"Circuit open after {self.failures} consecutive failures; not calling the API", data
+            )
+
+    def record_success(self) -> None:
+        with self._lock:
+            self.failures = 0
+            self.opened_at = None
+            self.trial_at = None
+
+    def record_failure(self) -> None:
+        with self._lock:
+            self.failures += 1
+            self.trial_at = None
+            if self.failures >= self.threshold:
+                if self.opened_at is None or time.monotonic() - self.opened_at >= self.cooldown:
+                    self.trips += 1
+                self.opened_at = time.monotonic()
+
+
+class LatencyTracker:
+    """Latencies (ms) of the most recent ``window`` calls, for percentiles."""
+
+    def __init__(self, window: int = 500):
+        self._lock = threading.Lock()
+        self._samples = collections.deque(maxlen=window)
+
+    def __len__(self):
+        return len(self._samples)
+
+    def record(self, ms: float) -> None:
+        with self._lock:
+            self._samples.append(ms)
+
+    def percentile(self, p: float) -> float | None:
+        """Nearest-rank percentile; None before the first sample."""
+        with self._lock:
+            samples = sorted(self._samples)
+        if not samples:
+            return None
+        rank = max(1, min(len(samples), int(-(-p * len(samples) // 100))))
+        return samples[rank - 1]
+
+    def summary(self) -> dict:
+        return {f"p{p}": self.percentile(p) or 0.0 for p in (50, 95, 99)}
+
+
+class ModelCascade:
+    """
+    Models tried in order, cheapest first, each with its own read timeout
+    (see OpenAIIntegration.fetch_cascade). Parsed from a spec such as
+    "gpt-4.1-nano:30,gpt-4o-mini", i.e. ``model[:read_timeout]`` per tier.
+    Counts, per tier, the calls made and whether the reply was accepted,
+    rejected by the caller's checks, or the call failed.
+    """
+
+    def __init__(self, tiers):
+        self._lock = threading.Lock()
+        self.tiers = [(model, float(read_timeout)) for model, read_timeout in tiers]
+        self.counts = {
+            model: {"calls": 0, "accepted": 0, "rejected": 0, "failed": 0, "latency_ms": 0.0}
+            for model, _ in self.tiers
+        }
+
+    @classmethod
+    def parse(cls, spec: str) -> "ModelCascade":
+        tiers = []
+        for part in (spec or "").split(","):
+            model, _, read_timeout = part.strip().partition(":")
+            if not model:
+                continue
+            if model not in OpenAIIntegration.language_models:
+                raise ValueError(f"Unsupported model in cascade: {model}")
+            tiers.append((model, float(read_timeout) if read_timeout else OPENAI_READ_TIMEOUT))
+        return cls(tiers)
+
+    def __bool__(self):
+        return bool(self.tiers)
+
+    @property
+    def spec(self) -> str:
+        """The tiers' models in order, e.g. "gpt-4.1-nano>gpt-4o-mini"; read timeouts are left out."""
+        return ">".join(model for model, _ in self.tiers)
+
+    def record(self, model: str, outcome: str, started: float) -> None:
+        with self._lock:
+            counts = self.counts[model]
+            counts["calls"] += 1
+            counts[outcome] += 1
+            counts["latency_ms"] += (time.perf_counter() - started) * 1000
+
+    def stats(self) -> dict:
+        """Per-tier counts plus ``escalation_rate`` (share of calls passed on to the next tier)."""
+        with self._lock:
+            last = self.tiers[-1][0] if self.tiers else None
+            out = {}
+            for model, counts in self.counts.items():
+                calls = counts["calls"]
+                escalated = 0 if model == last else counts["rejected"] + counts["failed"]
+                out[model] = {
+                    **counts,
+                    "escalation_rate": escalated / calls if calls else 0.0,
+                    "avg_latency_ms": counts["latency_ms"] / calls if calls else 0.0,
+                }
+            return out
+
+
+class ConnectionStats:
+    """Counts HTTP requests against new connections (TCP + TLS handshakes) opened for them."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.requests = 0
+        self.connections = 0
+        self.handshake_ms = 0.0
+
+    def record_request(self):
+        with self._lock:
+            self.requests += 1
+
+    def record_connect(self, ms: float):
+        with self._lock:
+            self.connections += 1
+            self.handshake_ms += ms
+
+    def as_dict(self) -> dict:
+        with self._lock:
+            reused = max(0, self.requests - self.connections)
+            return {
+                "requests": self.requests,
+                "connections": self.connections,
+                "reused": reused,
+                "reuse_rate": reused / self.requests if self.requests else 0.0,
+                "handshake_ms": self.handshake_ms,
+                "avg_handshake_ms": self.handshake_ms / self.connections if self.connections else 0.0,
+            }
+
+
+def _timed(conn_cls, pool_cls, stats):
+    """Subclass a urllib3 connection pool so every new connection's connect() is timed."""
+    class TimedConnection(conn_cls):
+        def connect(self):
+            t0 = time.perf_counter()
+            super().connect()
+            stats.record_connect((time.perf_counter() - t0) * 1000)
+
+    class TimedPool(pool_cls):
+        ConnectionCls = TimedConnection
+
+    return TimedPool
+
+
+class PooledAdapter(HTTPAdapter):
+    def __init__(self, stats: ConnectionStats, pool_size: int):
+        self.stats = stats
+        # Retries are handled by OpenAIIntegration.fetch, not urllib3
+        super().__init__(pool_connections=1, pool_maxsize=pool_size, max_retries=0)
+
+    def init_poolmanager(self, *args, **kwargs):
+        super().init_poolmanager(*args, **kwargs)
+        self.poolmanager.pool_classes_by_scheme = {
+            "http": _timed(HTTPConnection, HTTPConnectionPool, self.stats),
+            "https": _timed(HTTPSConnection, HTTPSConnectionPool, self.stats),
+        }
+
+
 class OpenAIIntegration:
     
     openai_api_key = os.getenv('OPENAI_API_KEY')
-    language_models = ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo", "gpt-4o", "gpt-4o-mini", "o1-preview", "o1-mini"]
+    language_models = ["gpt-3.5-turbo", "gpt-4", "gpt-4-turbo", "gpt-4o", "gpt-4o-mini",
+                       "gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano", "o1-preview", "o1-mini"]
 
-    def __init__(self):
+    def __init__(self, pool_size: int = OPENAI_POOL_SIZE,
+                 connect_timeout: float = OPENAI_CONNECT_TIMEOUT, read_timeout: float = OPENAI_READ_TIMEOUT,
+                 max_concurrency: int = OPENAI_MAX_CONCURRENCY, base_url: str = None):
+        self.base_url = (base_url or OPENAI_BASE_URL).rstrip("/")
         self.headers = {
             "Authorization": f"Bearer {OpenAIIntegration.openai_api_key}",
             # "OpenAI-Organization": "org-BmYxrwj0ESNtpXN2YP0nszD9", # Personal Organization ID
             "OpenAI-Organization": "org-hXrhIEuhzmUaTYtJbHkRKl4W", # Venture Organization ID
             "Content-Type": "application/json"
         }
+        self.timeout = (connect_timeout, read_timeout)
+        # One keep-alive session for the lifetime of the client, so consecutive
+        # profiles reuse the same TCP/TLS connection instead of handshaking each time
+        self.stats = ConnectionStats()
+        self.session = requests.Session()
+        self.session.headers.update(self.headers)
+        adapter = PooledAdapter(self.stats, pool_size)
+        self.session.mount("https://", adapter)
+        self.session.mount("http://", adapter)
+        # Async client and semaphore are created lazily, per event loop
+        self.max_concurrency = max_concurrency
+        self._aclient = None
+        self._asem = None
+        self._aloop = None
+        # Called with one usage record per successful call (see scraper/usage.py)
+        self.on_usage = None
+        # Shared by sync and async calls: pacing to account limits, and fail-fast on outages
+        self.limiter = RateLimiter()
+        self.breaker = CircuitBreaker()
+        # Latency of every successful call, and of what callers saw with hedging
+        self.latency = LatencyTracker()
+        self.hedged_latency = LatencyTracker()
+        self.hedge = OPENAI_HEDGE
+        self.hedge_percentile = OPENAI_HEDGE_PERCENTILE
+        self.hedges = {"calls": 0, "sent": 0, "won": 0}
+        self._hedge_lock = threading.Lock()
+        self._hedge_pool = None
 
-    def fetch(self, data):
-        MAX_RETRIES = 3
-        REQUEST_TIMEOUT = 420
-        retries = 0
-        sleep_time = 1
-        while retries < MAX_RETRIES:
-            try:
-                response = requests.post("https://api.openai.com/v1/chat/completions", headers=self.headers, json=data, timeout=REQUEST_TIMEOUT)
-                if response.status_code == 200:
-                    content = response.json()
-                    print('prompt_tokens', content['usage']['prompt_tokens'])
-                    return content["choices"][0]["message"]["content"]
+    def _report_usage(self, data: dict, content: dict, started: float, retries: int, on_usage=None) -> None:
+        usage = content.get("usage") or {}
+        record = {
+            "model": data.get("model"),
+            "prompt_tokens": usage.get("prompt_tokens", 0),
+            "completion_tokens": usage.get("completion_tokens", 0),
+            "cached_tokens": (usage.get("prompt_tokens_details") or {}).get("cached_tokens", 0),
+            "latency_ms": (time.perf_counter() - started) * 1000,
+            "retries": retries,
+        }
+        self.latency.record(record["latency_ms"])
+        on_usage = on_usage or self.on_usage
+        if on_usage is not None:
+            on_usage(record)
+
+    def _before_attempt(self, data: dict, tokens: int) -> float:
+        """
+        Raises if the circuit is open; otherwise returns the pacing delay
+        before sending. Every attempt takes a request from the limiter, but
+        only the first reserves the request's estimated ``tokens`` (retries
+        pass 0): observe() settles them against the reply's usage, and a
+        request that ends without a reply refunds them.
+        """
+        self.breaker.check(data)
+        return self.limiter.reserve(tokens)
+
+    def _after_response(self, data, status: int, headers, content, estimate: int, started: float, attempt: int,
+                        max_retries: int = None, on_usage=None):
+        """
+        Returns ``(reply, None)`` on success or ``(None, delay)`` for a retryable
+        failure; raises on errors a retry cannot fix. A 200 whose body is not
+        a chat completion (e.g. a proxy's HTML page) is a retryable failure.
+        """
+        completed = status == 200 and isinstance(content, dict) and bool(content.get("choices"))
+        self.limiter.observe(headers, estimate, content.get("usage") if completed else None)
+        if completed:
+            self.breaker.record_success()
+            self._report_usage(data, content, started, attempt, on_usage)
+            return content["choices"][0]["message"]["content"], None
+        if status != 200 and status not in RETRYABLE_STATUS:
+            # The API answered, so the circuit (and a half-open trial) is settled
+            self.breaker.record_success()
+            raise Exception(f"HTTP Error: {status}, message: {content}")
+        self.breaker.record_failure()
+        delay = retry_after(headers)
+        if delay is None:
+            delay = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+        self._log_attempt(f"HTTP {status}" if status != 200 else "HTTP 200 without a completion", attempt, delay,
+                          max_retries)
+        return None, delay
+
+    @staticmethod
+    def _content(response):
+        """The decoded body of a 200 response (None if it is not JSON), else the error text."""
+        if response.status_code != 200:
+            return response.text
+        try:
+            return response.json()
+        except ValueError:
+            return None
+
+    def _connection_error(self, e: Exception, attempt: int, max_retries: int = None) -> float:
+        self.breaker.record_failure()
+        delay = min(60.0, 2 ** attempt) * random.uniform(0.5, 1.0)
+        self._log_attempt(repr(e), attempt, delay, max_retries)
+        return delay
+
+    @staticmethod
+    def _log_attempt(error: str, attempt: int, delay: float, max_retries: int = None) -> None:
+        max_retries = max_retries or OPENAI_MAX_RETRIES
+        then = f"retrying in {delay:.1f}s" if attempt + 1 < max_retries else "giving up"
+        print(f"Error (attempt {attempt + 1}/{max_retries}): {error}; {then}")
+
+    def fetch(self, data, timeout: tuple = None, max_retries: int = None, base_url: str = None, on_usage=None):
+        """
+        POST one chat completion. Paced by the rate limiter, retried with
+        server-directed backoff, and never blocks on the user: an exhausted
+        request raises RetriesExhausted (CircuitOpenError while the circuit
+        is open), both carrying the body for dead-lettering. ``timeout``,
+        ``max_retries``, ``base_url`` and ``on_usage`` override the client
+        defaults for this call.
+        """
+        max_retries = max_retries or OPENAI_MAX_RETRIES
+        estimate = self.limiter.estimate(data)
+        started = time.perf_counter()
+        reserved = 0
+        try:
+            for attempt in range(max_retries):
+                time.sleep(self._before_attempt(data, estimate - reserved))
+                reserved = estimate
+                try:
+                    self.stats.record_request()
+                    response = self.session.post(f"{base_url or self.base_url}/chat/completions", json=data,
+                                                 timeout=timeout or self.timeout)
+                except requests.RequestException as e:
+                    delay = self._connection_error(e, attempt, max_retries)
                 else:
-                    raise Exception(f"HTTP Error: {response.status_code}, message: {response.content}")
-    
+                    reply, delay = self._after_response(
+                        data, response.status_code, response.headers, self._content(response), estimate, started,
+                        attempt, max_retries, on_usage,
+                    )
+                    if delay is None:
+                        return reply
+                if attempt + 1 < max_retries:
+                    time.sleep(delay)
+            raise RetriesExhausted(f"Request failed after {max_retries} attempts", data)
+        except BaseException:
+            self.limiter.refund(reserved)
+            raise
+
+    def fetch_hedged(self, data, accept=None) -> tuple:
+        """
+        fetch() with a hedge: once the call has taken longer than the
+        ``hedge_percentile`` of recent latencies, a duplicate goes out (to
+        OPENAI_HEDGE_MODEL / OPENAI_HEDGE_BASE_URL when set) and the first
+        reply ``accept(reply)`` approves wins (any reply without ``accept``).
+        Returns ``(reply, model)`` with the model that answered. The slower
+        call finishes in the background; if it is still running when this
+        returns, its usage record is tagged ``"scope": "run"`` so it is not
+        charged to whatever the caller does next. Raises the first error only
+        if both calls fail.
+        """
+        if self._hedge_pool is None:
+            self._hedge_pool = ThreadPoolExecutor(max_workers=2 * self.max_concurrency, thread_name_prefix="openai-hedge")
+        started = time.perf_counter()
+        settled = threading.Event()
+
+        def report(record):
+            if self.on_usage is not None:
+                self.on_usage({**record, "scope": "run"} if settled.is_set() else record)
+
+        with self._hedge_lock:
+            self.hedges["calls"] += 1
+        futures = {self._hedge_pool.submit(self.fetch, data, on_usage=report): data["model"]}
+        delay = self.latency.percentile(self.hedge_percentile) if len(self.latency) >= OPENAI_HEDGE_MIN_SAMPLES else None
+        if delay is not None and not wait(futures, timeout=delay / 1000).done:
+            hedge = {**data, "model": OPENAI_HEDGE_MODEL} if OPENAI_HEDGE_MODEL else data
+            futures[self._hedge_pool.submit(self.fetch, hedge, base_url=OPENAI_HEDGE_BASE_URL, on_usage=report)] = hedge["model"]
+            with self._hedge_lock:
+                self.hedges["sent"] += 1
+        primary = next(iter(futures))
+        answer, error = None, None
+        try:
+            for future in as_completed(futures):
+                try:
+                    candidate = future.result()
+                except Exception as e:
+                    error = error or e
+                    continue
+                answer = answer or (candidate, futures[future])
+                if accept is None or accept(candidate):
+                    answer = (candidate, futures[future])
+                    if future is not primary:
+                        with self._hedge_lock:
+                            self.hedges["won"] += 1
+                    break
+        finally:
+            settled.set()
+        if answer is None:
+            raise error
+        self.hedged_latency.record((time.perf_counter() - started) * 1000)
+        return answer
+
+    def fetch_cascade(self, string: str, cascade: ModelCascade, accept, response_format=None,
+                      system: str = None) -> tuple:
+        """
+        Try the tiers of ``cascade`` in order and return ``(reply, model)`` for
+        the first reply ``accept(reply)`` approves. Every tier but the last
+        gets one attempt at its own read timeout, and a failed call or a
+        rejected reply escalates to the next tier. The last tier's reply is
+        returned even when rejected, and its failure is raised.
+        ``response_format`` may be a callable taking the model name.
+        """
+        for n, (model, read_timeout) in enumerate(cascade.tiers):
+            last = n == len(cascade.tiers) - 1
+            fmt = response_format(model) if callable(response_format) else response_format
+            data = self.payload(string, model, fmt, system)
+            started = time.perf_counter()
+            try:
+                reply = self.fetch(data, timeout=(self.timeout[0], read_timeout), max_retries=None if last else 1)
             except Exception as e:
-                traceback.print_exc()
-                print(f"Error: {str(e)}")
-                time.sleep(sleep_time)
-                sleep_time *= 2
-                retries += 1
-                if retries == MAX_RETRIES:
-                    answer = input(f"Max retries reached. Would you like to continue? (y/n): ")
-                    if answer.lower() != "y":
-                        raise e
-
-    def fetch_response(self, string: str, image_path: str = None, model: str = "gpt-4o") -> str:
-        if model in OpenAIIntegration.language_models:
-            data = {
-                "model": model,
-                "messages": [{"role": "user", "content": string}]
-            }
-        return self.fetch(data)
\ No newline at end of file
+                cascade.record(model, "failed", started)
+                if last:
+                    raise
+                print(f"    ↗️  {model} failed ({repr(e)}); escalating")
+                continue
+            accepted = accept(reply)
+            cascade.record(model, "accepted" if accepted else "rejected", started)
+            if accepted or last:
+                return reply, model
+            print(f"    ↗️  {model} reply rejected; escalating")
+        raise ValueError("empty model cascade")
+
+    def fetch_response(self, string: str, image_path: str = None, model: str = "gpt-4o",
+                       response_format: dict = None, system: str = None) -> str:
+        return self.fetch_answer(string, model, response_format, system)[0]
+
+    def fetch_answer(self, string: str, model: str = "gpt-4o", response_format: dict = None,
+                     system: str = None) -> tuple:
+        """fetch_response() as ``(reply, model)``: with hedging on, OPENAI_HEDGE_MODEL may have answered."""
+        data = self.payload(string, model, response_format, system)
+        return self.fetch_hedged(data) if self.hedge else (self.fetch(data), model)
+
+    @staticmethod
+    def payload(string: str, model: str, response_format: dict = None, system: str = None) -> dict:
+        """
+        Chat-completions request body for one prompt (also used for Batch API
+        lines). ``system`` goes first, so static instructions form a prefix
+        the provider's prompt cache can reuse across requests.
+        """
+        if model not in OpenAIIntegration.language_models:
+            raise ValueError(f"Unsupported model: {model}")
+        messages = [{"role": "system", "content": system}] if system else []
+        data = {
+            "model": model,
+            "messages": messages + [{"role": "user", "content": string}]
+        }
+        if response_format is not None:
+            data["response_format"] = response_format
+        return data
+
+    async def _async_client(self):
+        """
+        httpx.AsyncClient and concurrency semaphore bound to the running loop.
+        A client left over from an earlier loop is closed once replaced.
+        """
+        loop = asyncio.get_running_loop()
+        if self._aloop is not loop:
+            try:
+                import httpx
+            except ImportError as e:
+                raise RuntimeError("Async OpenAI calls require httpx (pip install httpx)") from e
+            connect, read = self.timeout
+            stale = self._aclient
+            self._aclient = httpx.AsyncClient(
+                headers=self.headers,
+                timeout=httpx.Timeout(read, connect=connect),
+                limits=httpx.Limits(max_connections=self.max_concurrency,
+                                    max_keepalive_connections=self.max_concurrency),
+            )
+            self._asem = asyncio.Semaphore(self.max_concurrency)
+            self._aloop = loop
+            if stale is not None:
+                try:
+                    await stale.aclose()
+                except Exception:
+                    pass  # its connections belonged to a loop that is gone; they are dropped instead
+        return self._aclient, self._asem
+
+    async def afetch(self, data):
+        """Async counterpart of fetch(): same pacing, backoff and circuit breaker."""
+        client, sem = await self._async_client()
+        estimate = self.limiter.estimate(data)
+        started = time.perf_counter()
+        reserved = 0
+        try:
+            for attempt in range(OPENAI_MAX_RETRIES):
+                await asyncio.sleep(self._before_attempt(data, estimate - reserved))
+                reserved = estimate
+                try:
+                    async with sem:
+                        response = await client.post(f"{self.base_url}/chat/completions", json=data)
+                except Exception as e:  # httpx.TransportError and friends
+                    delay = self._connection_error(e, attempt)
+                else:
+                    reply, delay = self._after_response(
+                        data, response.status_code, response.headers, self._content(response), estimate, started,
+                        attempt,
+                    )
+                    if delay is None:
+                        return reply
+                if attempt + 1 < OPENAI_MAX_RETRIES:
+                    await asyncio.sleep(delay)
+            raise RetriesExhausted(f"Request failed after {OPENAI_MAX_RETRIES} attempts", data)
+        except BaseException:  # including a cancelled afetch
+            self.limiter.refund(reserved)
+            raise
+
+    async def afetch_response(self, string: str, model: str = "gpt-4o", response_format: dict = None,
+                              system: str = None) -> str:
+        return await self.afetch(self.payload(string, model, response_format, system))
+
+    async def afetch_many(self, prompts, model: str = "gpt-4o", concurrency: int = None,
+                          response_format: dict = None, system: str = None) -> list:
+        """
+        Send many prompts concurrently and return replies in input order.
+
+        ``concurrency`` caps this call further below the client-wide
+        ``max_concurrency``. An item that still fails after its retries is
+        returned as the exception instead of its reply, so one bad prompt
+        does not abort the rest.
+        """
+        local = asyncio.Semaphore(concurrency or self.max_concurrency)
+
+        async def one(prompt):
+            async with local:
+                return await self.afetch_response(prompt, model=model, response_format=response_format, system=system)
+
+        return await asyncio.gather(*(one(p) for p in prompts), return_exceptions=True)
+
+    def fetch_many(self, prompts, model: str = "gpt-4o", concurrency: int = None,
+                   response_format: dict = None, system: str = None) -> list:
+        """Synchronous wrapper around afetch_many() for callers without an event loop."""
+        async def run():
+            try:
+                return await self.afetch_many(prompts, model=model, concurrency=concurrency,
+                                              response_format=response_format, system=system)
+            finally:
+                await self.aclose()
+        return asyncio.run(run())
+
+    async def aclose(self):
+        if self._aclient is not None:
+            await self._aclient.aclose()
+        self._aclient = self._asem = self._aloop = None
+
+    def connection_stats(self) -> dict:
+        with self._hedge_lock:
+            hedges = dict(self.hedges)
+        calls = hedges["calls"]
+        return {
+            **self.stats.as_dict(),
+            "rate_limit_wait_s": self.limiter.waited_s,
+            "circuit_trips": self.breaker.trips,
+            "latency_ms": self.latency.summary(),
+            "hedged_latency_ms": self.hedged_latency.summary(),
+            "hedges_sent": hedges["sent"],
+            "hedges_won": hedges["won"],
+            "hedge_rate": hedges["sent"] / calls if calls else 0.0,
+        }
+
+    def close(self):
+        if self._hedge_pool is not None:
+            # Losing hedges are not awaited
+            self._hedge_pool.shutdown(wait=False)
+            self._hedge_pool = None
+        self.session.close()
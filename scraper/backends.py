@@ -0,0 +1,244 @@
+"""
+Backends ContactExtractor sends its prompts to.
+
+ContactExtractor only needs the ExtractionBackend methods below, so the
+same pipeline (cache, pre-extraction, packing, dead letters) runs against:
+
+- ``openai`` - the OpenAI API (OpenAIIntegration: pacing, retries, hedging);
+- ``local``  - any OpenAI-compatible chat-completions server on our own
+  hardware (llama.cpp ``llama-server``, vLLM, ...) at LOCAL_LLM_BASE_URL,
+  without account rate limits or per-token cost;
+- ``fake``   - a deterministic, offline stand-in for tests and dry runs.
+
+Pick one with EXTRACTION_BACKEND, and compare them over a corpus of
+captured profiles with:
+
+    python -m scraper.backends bench scraper/tests/data/profiles --backend openai --backend local
+"""
+from __future__ import annotations
+import argparse, json, re, time
+from pathlib import Path
+from typing import Any, Callable, Dict, List, Protocol, runtime_checkable
+
+from openai_api_call import OpenAIIntegration, RateLimiter
+
+from .config import (
+    EXTRACTION_BACKEND, EXTRACTION_MODEL,
+    LOCAL_LLM_BASE_URL, LOCAL_LLM_MODEL, LOCAL_LLM_API_KEY, LOCAL_LLM_MAX_CONCURRENCY,
+)
+from .pre_extract import pre_extract
+from .prompts import DETAILS_INSTRUCTIONS, PACKED_INSTRUCTIONS
+
+BACKENDS = ("openai", "local", "fake")
+
+
+@runtime_checkable
+class ExtractionBackend(Protocol):
+    """What ContactExtractor calls. ``model`` is the model the backend serves by default."""
+
+    model: str
+    # Called with one usage record per completed call (see usage.py)
+    on_usage: Callable[[Dict[str, Any]], None] | None
+
+    def payload(self, string: str, model: str, response_format: dict = None, system: str = None) -> dict: ...
+
+    def fetch_response(self, string: str, image_path: str = None, model: str = None,
+                       response_format: dict = None, system: str = None) -> str: ...
+
+    def fetch_answer(self, string: str, model: str = None, response_format: dict = None,
+                     system: str = None) -> tuple: ...
+
+    def fetch_many(self, prompts, model: str = None, concurrency: int = None,
+                   response_format: dict = None, system: str = None) -> list: ...
+
+    def connection_stats(self) -> dict: ...
+
+    def close(self) -> None: ...
+
+
+class OpenAIBackend(OpenAIIntegration):
+    def __init__(self, model: str = EXTRACTION_MODEL, **kwargs):
+        super().__init__(**kwargs)
+        self.model = model
+
+
+class LocalBackend(OpenAIBackend):
+    """
+    An OpenAI-compatible server we run ourselves. Any model name is passed
+    through, no OpenAI credentials are sent, and there is no account rate
+    limit to pace to; connection pooling, retries and the circuit breaker
+    are the same as for OpenAI.
+    """
+
+    def __init__(self, base_url: str = LOCAL_LLM_BASE_URL, model: str = LOCAL_LLM_MODEL,
+                 api_key: str | None = LOCAL_LLM_API_KEY, max_concurrency: int = LOCAL_LLM_MAX_CONCURRENCY, **kwargs):
+        super().__init__(model=model, base_url=base_url, max_concurrency=max_concurrency,
+                         pool_size=max_concurrency, **kwargs)
+        self.headers = {"Content-Type": "application/json"}
+        if api_key:
+            self.headers["Authorization"] = f"Bearer {api_key}"
+        self.session.headers.clear()
+        self.session.headers.update(self.headers)
+        self.limiter = RateLimiter(rpm=10 ** 9, tpm=10 ** 12)
+
+    @staticmethod
+    def payload(string: str, model: str, response_format: dict = None, system: str = None) -> dict:
+        messages = [{"role": "system", "content": system}] if system else []
+        data = {"model": model, "messages": messages + [{"role": "user", "content": string}]}
+        if response_format is not None:
+            data["response_format"] = response_format
+        return data
+
+
+# Profile headline, e.g. "Head of Mathematics at Riverside Academy"
+_HEADLINE = re.compile(r"^(?P<title>[^\n]+?) at (?P<school>[^\n]+)$", re.M)
+_PROFILE_TEXT = "(profile + contact-info dump):\n\n"
+
+
+def _fake_contact(text: str) -> Dict[str, Any]:
+    found = pre_extract(text)
+    headline = _HEADLINE.search(text)
+    lines = [line.strip() for line in text.splitlines() if line.strip()]
+    name = found.get("name")
+    if name is None and headline is not None:
+        before = text[:headline.start()].strip().splitlines()
+        name = before[-1].strip() if before else None
+    return {
+        "name": name or (lines[0] if lines else "Unknown"),
+        "title": headline.group("title").strip() if headline else None,
+        "department": None,
+        "email": found.get("email"),
+        "phone": found.get("phone"),
+        "linkedin_url": found.get("linkedin_url"),
+        "bio": None,
+    }
+
+
+class FakeBackend:
+    """
+    Deterministic offline backend: answers every prompt from the profile text
+    itself (pre_extract patterns plus the "<title> at <school>" headline), so
+    the same input always gives the same reply. Records zero-cost usage.
+    """
+
+    def __init__(self, model: str = "fake", latency_s: float = 0.0):
+        self.model = model
+        self.latency_s = latency_s
+        self.on_usage = None
+        self.calls = 0
+
+    @staticmethod
+    def payload(string: str, model: str, response_format: dict = None, system: str = None) -> dict:
+        return LocalBackend.payload(string, model, response_format, system)
+
+    def _reply(self, string: str, system: str | None) -> str:
+        text = string.split(_PROFILE_TEXT, 1)[-1]
+        if system == PACKED_INSTRUCTIONS:
+            contacts = []
+            for block in text.split("### Profile ")[1:]:
+                pid, _, body = block.partition("\n")
+                contacts.append({"profile_id": pid.strip(), **_fake_contact(body)})
+            return json.dumps({"contacts": contacts})
+        contact = _fake_contact(text)
+        if system == DETAILS_INSTRUCTIONS:
+            contact = {k: contact[k] for k in ("title", "department", "bio")}
+        return json.dumps(contact)
+
+    def fetch_response(self, string: str, image_path: str = None, model: str = None,
+                       response_format: dict = None, system: str = None) -> str:
+        started = time.perf_counter()
+        if self.latency_s:
+            time.sleep(self.latency_s)
+        self.calls += 1
+        reply = self._reply(string, system)
+        if self.on_usage is not None:
+            self.on_usage({
+                "model": model or self.model,
+                "prompt_tokens": (len(string) + len(system or "")) // 4,
+                "completion_tokens": len(reply) // 4,
+                "cached_tokens": 0,
+                "latency_ms": (time.perf_counter() - started) * 1000,
+                "retries": 0,
+            })
+        return reply
+
+    def fetch_answer(self, string: str, model: str = None, response_format: dict = None,
+                     system: str = None) -> tuple:
+        return self.fetch_response(string, model=model, response_format=response_format, system=system), model or self.model
+
+    def fetch_many(self, prompts, model: str = None, concurrency: int = None,
+                   response_format: dict = None, system: str = None) -> list:
+        return [self.fetch_response(p, model=model, response_format=response_format, system=system) for p in prompts]
+
+    def connection_stats(self) -> dict:
+        return {}
+
+    def close(self) -> None:
+        pass
+
+
+def make_backend(name: str = EXTRACTION_BACKEND) -> ExtractionBackend:
+    if name == "openai":
+        return OpenAIBackend()
+    if name == "local":
+        return LocalBackend()
+    if name == "fake":
+        return FakeBackend()
+    raise ValueError(f"Unknown extraction backend {name!r}; expected one of {', '.join(BACKENDS)}")
+
+
+# ---------- benchmark ----------
+def benchmark(corpus: Path, names: List[str], pack_size: int = 1) -> List[Dict[str, Any]]:
+    """Extract the corpus uncached with each backend; accuracy, latency, tokens and cost per contact."""
+    from .extraction import ContactExtractor
+    from .preprocess import _field_accuracy, load_corpus
+    from .usage import UsageMeter
+
+    corpus_items = load_corpus(corpus)
+    items = [(expected.get("school", ""), text, None) for _, text, expected in corpus_items]
+    rows = []
+    for name in names:
+        backend = make_backend(name)
+        meter = UsageMeter()
+        backend.on_usage = meter.record
+        extractor = ContactExtractor(backend, model=backend.model, pack_size=pack_size)
+        started = time.perf_counter()
+        try:
+            contacts = extractor.extract_many(items)
+        finally:
+            backend.close()
+        elapsed = time.perf_counter() - started
+        usage = meter.end("run")
+        n = len(contacts)
+        rows.append({
+            "backend": name,
+            "model": backend.model,
+            "profiles": n,
+            "accuracy": sum(_field_accuracy(e, c) for (_, _, e), c in zip(corpus_items, contacts)) / n if n else 0.0,
+            "contacts_per_s": n / elapsed if elapsed else 0.0,
+            "latency_ms_per_call": usage["latency_ms"] / usage["calls"] if usage["calls"] else 0.0,
+            "tokens_per_contact": (usage["prompt_tokens"] + usage["completion_tokens"]) / n if n else 0.0,
+            "cost_per_contact_usd": usage["cost_usd"] / n if n else 0.0,
+            "parse": dict(extractor.outcomes),
+        })
+    return rows
+
+
+def main(argv=None):
+    p = argparse.ArgumentParser(description="Extraction backend tools.")
+    sub = p.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Compare backends over a corpus of captured profiles")
+    bench.add_argument("corpus", help="Directory of <name>.txt profiles with <name>.json expected contacts")
+    bench.add_argument("--backend", action="append", choices=BACKENDS, help="Backend to run (repeatable)")
+    bench.add_argument("--pack", type=int, default=1, metavar="N", help="Profiles per request")
+    args = p.parse_args(argv)
+
+    for r in benchmark(Path(args.corpus), args.backend or [EXTRACTION_BACKEND], args.pack):
+        print(f"{r['backend']:<7} {r['model']:<20} accuracy {r['accuracy']:.0%}, "
+              f"{r['contacts_per_s']:.2f} contacts/s, {r['latency_ms_per_call']:.0f} ms/call, "
+              f"{r['tokens_per_contact']:.0f} tokens/contact, ${r['cost_per_contact_usd']:.5f}/contact, "
+              f"{r['parse']['failed']} parse failures")
+
+
+if __name__ == "__main__":
+    main()
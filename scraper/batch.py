@@ -0,0 +1,350 @@
+"""
+Offline extraction through the provider's Batch API.
+
+With ``EXTRACTION_MODE=batch`` the scraper never waits on the LLM: each
+uncached profile is recorded as one Batch API request line in
+``.cache/batch/pending.jsonl`` and a URL-only placeholder contact is
+journaled. These commands then move the requests through the provider:
+
+    python -m scraper.batch submit
+    python -m scraper.batch poll --wait
+    python -m scraper.batch ingest --output output.xlsx
+
+Requests the live client gave up on (retries exhausted or circuit open) are
+dead-lettered to ``.cache/batch/dead_letter.jsonl`` in the same format, and
+``submit`` sends them along with the pending ones.
+
+``submit`` uploads the pending requests and creates one batch per
+``BATCH_MAX_REQUESTS`` lines, ``poll`` refreshes their status and downloads
+finished output, and ``ingest`` validates each reply as a Contact, stores it
+in the LLM response cache and journals it over its placeholder. Each batch
+lives in its own directory under ``.cache/batch`` with a ``manifest.json``.
+Run ``submit`` and ``ingest`` while the scraper is stopped.
+"""
+from __future__ import annotations
+import argparse, json, os, sys, time
+from pathlib import Path
+from typing import Any, Dict, Iterator, List
+
+from .config import BATCH_DIR
+from .extraction import default_cache, parse_contact_lenient
+from .io_utils import (
+    DurableAppender,
+    ResultsJournal,
+    ResultsStore,
+    ParquetResultsDataset,
+    journal_path_for,
+    store_path_for,
+    OUTPUT_DEFAULT,
+)
+
+ENDPOINT = "/v1/chat/completions"
+COMPLETION_WINDOW = "24h"
+BATCH_MAX_REQUESTS = 50_000  # provider limit per batch
+TERMINAL = {"completed", "failed", "expired", "cancelled"}
+
+PENDING_FILE = "pending.jsonl"
+DEAD_LETTER_FILE = "dead_letter.jsonl"
+MANIFEST = "manifest.json"
+REQUESTS_FILE = "requests.jsonl"
+INDEX_FILE = "index.jsonl"
+OUTPUT_FILE = "output.jsonl"
+ERRORS_FILE = "errors.jsonl"
+
+
+class BatchRecorder:
+    """
+    Appends deferred requests to ``pending.jsonl`` (or ``dead_letter.jsonl``
+    for requests the live client gave up on). Each line is a Batch API
+    request plus a ``meta`` object (school, profile URL, pre-extracted
+    fields) that ``submit`` strips into the batch's index before upload.
+    """
+
+    def __init__(self, root: Path = BATCH_DIR, filename: str = PENDING_FILE):
+        self._out = DurableAppender(root / filename)
+        self.recorded = 0
+
+    def record(self, custom_id: str, body: Dict[str, Any], school_name: str, href: str | None,
+               known: Dict[str, Any] | None = None) -> None:
+        self._out.write_json({
+            "custom_id": custom_id,
+            "method": "POST",
+            "url": ENDPOINT,
+            "body": body,
+            "meta": {"school": school_name, "href": href, "model": body.get("model"), "known": known or {}},
+        })
+        self.recorded += 1
+
+    def close(self) -> None:
+        self._out.close()
+
+
+def _read_jsonl(path: Path) -> Iterator[Dict[str, Any]]:
+    if not path.exists():
+        return
+    with open(path, encoding="utf-8") as fh:
+        for line in fh:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn tail
+
+
+def _write_json(path: Path, data: Dict[str, Any]) -> None:
+    tmp = path.with_suffix(".tmp")
+    tmp.write_text(json.dumps(data, indent=2), encoding="utf-8")
+    os.replace(tmp, path)
+
+
+def load_manifests(root: Path) -> List[Dict[str, Any]]:
+    manifests = []
+    for path in sorted(root.glob(f"*/{MANIFEST}")):
+        m = json.loads(path.read_text(encoding="utf-8"))
+        m["_dir"] = path.parent
+        manifests.append(m)
+    return manifests
+
+
+def save_manifest(manifest: Dict[str, Any]) -> None:
+    _write_json(manifest["_dir"] / MANIFEST, {k: v for k, v in manifest.items() if k != "_dir"})
+
+
+def _check(response, what: str):
+    if response.status_code != 200:
+        raise RuntimeError(f"{what} failed: HTTP {response.status_code}: {response.text[:500]}")
+    return response
+
+
+# ---------- submit ----------
+def submit(session, base_url: str, root: Path = BATCH_DIR) -> List[Dict[str, Any]]:
+    """Split pending and dead-lettered requests into batch directories, upload them and create the batches."""
+    sources = [p for p in (root / PENDING_FILE, root / DEAD_LETTER_FILE) if p.exists()]
+    if not sources:
+        return []
+    # Duplicate prompts (same cache key) are sent once; every placeholder gets the reply
+    requests_by_id: Dict[str, Dict[str, Any]] = {}
+    index: List[Dict[str, Any]] = []
+    for source in sources:
+        for rec in _read_jsonl(source):
+            meta = rec.pop("meta", {})
+            requests_by_id.setdefault(rec["custom_id"], rec)
+            index.append({"custom_id": rec["custom_id"], **meta})
+
+    ids = list(requests_by_id)
+    stamp = time.strftime("%Y%m%d-%H%M%S")
+    manifests = []
+    for n, start in enumerate(range(0, len(ids), BATCH_MAX_REQUESTS)):
+        chunk = set(ids[start:start + BATCH_MAX_REQUESTS])
+        batch_dir = root / f"{stamp}-{n:03d}"
+        batch_dir.mkdir(parents=True, exist_ok=True)
+        with open(batch_dir / REQUESTS_FILE, "w", encoding="utf-8") as fh:
+            for cid in ids[start:start + BATCH_MAX_REQUESTS]:
+                fh.write(json.dumps(requests_by_id[cid], ensure_ascii=False) + "\n")
+        with open(batch_dir / INDEX_FILE, "w", encoding="utf-8") as fh:
+            for entry in index:
+                if entry["custom_id"] in chunk:
+                    fh.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        manifest = {"_dir": batch_dir, "requests": len(chunk), "status": "prepared", "ingested": False}
+        save_manifest(manifest)
+        manifests.append(manifest)
+    # Requests are safely in their batch directories; start fresh files
+    for source in sources:
+        source.unlink()
+
+    for manifest in manifests:
+        _upload_and_create(session, base_url, manifest)
+    return manifests
+
+
+def _upload_and_create(session, base_url: str, manifest: Dict[str, Any]) -> None:
+    with open(manifest["_dir"] / REQUESTS_FILE, "rb") as fh:
+        upload = _check(session.post(
+            f"{base_url}/files",
+            data={"purpose": "batch"},
+            files={"file": (REQUESTS_FILE, fh, "application/jsonl")},
+            headers={"Content-Type": None},  # let requests set the multipart boundary
+        ), "File upload").json()
+    manifest["input_file_id"] = upload["id"]
+    batch = _check(session.post(f"{base_url}/batches", json={
+        "input_file_id": upload["id"],
+        "endpoint": ENDPOINT,
+        "completion_window": COMPLETION_WINDOW,
+    }), "Batch creation").json()
+    manifest.update(batch_id=batch["id"], status=batch.get("status", "validating"), submitted_at=time.time())
+    save_manifest(manifest)
+
+
+# ---------- poll ----------
+def _download(session, base_url: str, file_id: str, dest: Path) -> None:
+    response = _check(session.get(f"{base_url}/files/{file_id}/content", stream=True), "Download")
+    tmp = dest.with_suffix(".part")
+    with open(tmp, "wb") as fh:
+        for chunk in response.iter_content(chunk_size=1 << 20):
+            fh.write(chunk)
+    os.replace(tmp, dest)
+
+
+def poll(session, base_url: str, root: Path = BATCH_DIR) -> List[Dict[str, Any]]:
+    """Refresh every unfinished batch and download output of completed ones."""
+    manifests = load_manifests(root)
+    for m in manifests:
+        if m["status"] == "prepared":
+            _upload_and_create(session, base_url, m)  # submit was interrupted
+        if m["status"] not in TERMINAL:
+            batch = _check(session.get(f"{base_url}/batches/{m['batch_id']}"), "Batch status").json()
+            m.update(
+                status=batch["status"],
+                output_file_id=batch.get("output_file_id"),
+                error_file_id=batch.get("error_file_id"),
+                request_counts=batch.get("request_counts"),
+            )
+            save_manifest(m)
+        if m["status"] == "completed":
+            for key, name in (("output_file_id", OUTPUT_FILE), ("error_file_id", ERRORS_FILE)):
+                if m.get(key) and not (m["_dir"] / name).exists():
+                    _download(session, base_url, m[key], m["_dir"] / name)
+    return manifests
+
+
+# ---------- ingest ----------
+def _reply_content(result: Dict[str, Any]) -> str | None:
+    response = result.get("response") or {}
+    if response.get("status_code") != 200:
+        return None
+    return response["body"]["choices"][0]["message"]["content"]
+
+
+def ingest(output_path: Path, parquet: bool = False, root: Path = BATCH_DIR, cache=None) -> Dict[str, int]:
+    """
+    Journal the validated contacts of every downloaded, not yet ingested batch
+    over their placeholders, then refresh the store and the output.
+    """
+    counts = {"batches": 0, "contacts": 0, "repaired": 0, "invalid": 0, "failed": 0, "orphaned": 0}
+    ready = [m for m in load_manifests(root) if not m.get("ingested") and (m["_dir"] / OUTPUT_FILE).exists()]
+    if not ready:
+        return counts
+
+    journal = ResultsJournal(journal_path_for(output_path))
+    # Placeholders were journaled under the profile URL that was visited
+    school_for_url: Dict[str, str] = {}
+    for rec in journal.replay():
+        if rec.get("kind") == "contact":
+            url = (rec.get("contact") or {}).get("linkedin_url")
+            if url:
+                school_for_url[url] = str(rec.get("id"))
+
+    try:
+        for m in ready:
+            index: Dict[str, List[Dict[str, Any]]] = {}
+            for entry in _read_jsonl(m["_dir"] / INDEX_FILE):
+                index.setdefault(entry["custom_id"], []).append(entry)
+            events = []
+            for result in _read_jsonl(m["_dir"] / OUTPUT_FILE):
+                cid = result.get("custom_id")
+                reply = _reply_content(result)
+                if reply is None:
+                    counts["failed"] += 1
+                    continue
+                entries = index.get(cid, [])
+                # Entries sharing a custom_id share the prompt, so the same pre-extracted fields
+                known = entries[0].get("known") if entries else None
+                try:
+                    contact, repaired = parse_contact_lenient(reply, known)
+                except Exception:
+                    counts["invalid"] += 1
+                    continue
+                counts["repaired"] += repaired
+                if cache is not None and entries:
+                    cache.put(cid, entries[0].get("model"), reply)
+                for entry in entries:
+                    # Dead-lettered placeholders keep a pre-extracted profile URL, if one was found
+                    urls = (entry.get("href"), (entry.get("known") or {}).get("linkedin_url"))
+                    url = next((u for u in urls if u in school_for_url), None)
+                    if url is None:
+                        counts["orphaned"] += 1
+                        continue
+                    events.append(("contact", {"id": school_for_url[url], "contact": {**contact, "linkedin_url": url}}))
+            if events:
+                journal.append_many(events)
+            counts["contacts"] += len(events)
+            counts["batches"] += 1
+            m["ingested"] = True
+            save_manifest(m)
+    finally:
+        journal.close()
+
+    store = ResultsStore(store_path_for(output_path))
+    try:
+        store.catch_up(journal)
+        if parquet:
+            ParquetResultsDataset(output_path, store).catch_up(journal)
+        else:
+            store.export_excel(output_path)
+    finally:
+        store.close()
+    return counts
+
+
+# ---------- CLI ----------
+def _session():
+    from openai_api_call import OPENAI_BASE_URL, OpenAIIntegration
+    return OpenAIIntegration().session, OPENAI_BASE_URL
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Submit, poll and ingest Batch API extraction jobs.")
+    p.add_argument("--batch-dir", default=str(BATCH_DIR), help="Directory holding pending requests and batches")
+    sub = p.add_subparsers(dest="command", required=True)
+    sub.add_parser("submit", help="Upload pending requests and create batches")
+    poll_p = sub.add_parser("poll", help="Refresh batch status and download finished output")
+    poll_p.add_argument("--wait", action="store_true", help="Keep polling until every batch has finished")
+    poll_p.add_argument("--interval", type=float, default=60.0, help="Seconds between polls with --wait")
+    ingest_p = sub.add_parser("ingest", help="Merge downloaded results into the output")
+    ingest_p.add_argument("--output", default=None, help="OUTPUT .xlsx, or dataset directory with --output-format parquet")
+    ingest_p.add_argument("--output-format", choices=["xlsx", "parquet"], default="xlsx")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    root = Path(args.batch_dir).expanduser().resolve()
+
+    if args.command == "submit":
+        session, base_url = _session()
+        manifests = submit(session, base_url, root)
+        if not manifests:
+            sys.exit(f"No pending or dead-lettered requests in {root}")
+        for m in manifests:
+            print(f"📤 {m['_dir'].name}: {m['requests']} requests -> batch {m.get('batch_id')} ({m['status']})")
+
+    elif args.command == "poll":
+        session, base_url = _session()
+        while True:
+            manifests = poll(session, base_url, root)
+            for m in manifests:
+                counts = m.get("request_counts") or {}
+                print(f"⏳ {m['_dir'].name}: {m['status']} "
+                      f"({counts.get('completed', 0)}/{counts.get('total', m['requests'])} done)")
+            if not args.wait or all(m["status"] in TERMINAL for m in manifests):
+                break
+            time.sleep(args.interval)
+
+    else:
+        parquet = args.output_format == "parquet"
+        default_output = OUTPUT_DEFAULT.with_suffix("") if parquet else OUTPUT_DEFAULT
+        output_path = Path(args.output or default_output).expanduser().resolve()
+        cache = default_cache()
+        try:
+            counts = ingest(output_path, parquet=parquet, root=root, cache=cache)
+        finally:
+            if cache is not None:
+                cache.close()
+        print(
+            f"✅  Ingested {counts['batches']} batches: {counts['contacts']} contacts "
+            f"({counts['repaired']} repaired replies), {counts['invalid']} invalid, {counts['failed']} failed, {counts['orphaned']} without a placeholder. "
+            f"Results in {output_path}"
+        )
+
+
+if __name__ == "__main__":
+    main()
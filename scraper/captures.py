@@ -0,0 +1,119 @@
+"""
+Compressed store of the raw text captured from each profile page.
+
+Every visit keeps the profile's ``main_text`` and ``contact_text``
+(zlib-compressed) keyed by canonical profile URL, school and capture time,
+plus the URL the contact was journaled under. Prompt changes and model
+upgrades can then be replayed over the stored corpus with
+``python -m scraper.reextract`` instead of going back to the browser.
+"""
+from __future__ import annotations
+import sqlite3, threading, time, zlib
+from pathlib import Path
+from typing import Any, Dict, Iterator
+
+from .io_utils import canonical_profile_url
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS captures (
+    url TEXT NOT NULL,
+    school TEXT NOT NULL,
+    captured_at REAL NOT NULL,
+    contact_url TEXT,
+    main_text BLOB NOT NULL,
+    contact_text BLOB NOT NULL,
+    raw_bytes INTEGER NOT NULL,
+    PRIMARY KEY (url, school, captured_at)
+);
+"""
+COMPRESSION_LEVEL = 6
+# Compressed rows fetched from SQLite at a time by latest()
+FETCH_SIZE = 64
+
+
+def profile_text(main_text: str | None, contact_text: str | None) -> str:
+    """The text sent for extraction; the same for live scraping and re-extraction, so cache keys match."""
+    return (main_text or "") + "\n" + (contact_text or "")
+
+
+def _pack(text: str | None) -> bytes:
+    return zlib.compress((text or "").encode("utf-8"), COMPRESSION_LEVEL)
+
+
+def _unpack(blob: bytes) -> str:
+    return zlib.decompress(blob).decode("utf-8")
+
+
+class CaptureStore:
+    def __init__(self, path: Path):
+        self.path = path
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+
+    def record(self, href: str, school: str, main_text: str | None, contact_text: str | None,
+               contact_url: str | None = None, captured_at: float | None = None) -> None:
+        url = canonical_profile_url(href)
+        if url is None:
+            return
+        raw = len((main_text or "").encode("utf-8")) + len((contact_text or "").encode("utf-8"))
+        with self._lock, self.conn:
+            self.conn.execute(
+                "INSERT OR REPLACE INTO captures "
+                "(url, school, captured_at, contact_url, main_text, contact_text, raw_bytes) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (url, school, captured_at or time.time(), contact_url, _pack(main_text), _pack(contact_text), raw),
+            )
+
+    def latest(self, school: str | None = None) -> Iterator[Dict[str, Any]]:
+        """
+        The most recent capture of every (profile, school), optionally for one
+        school, streamed from the database rather than loaded all at once.
+        """
+        query = (
+            "SELECT url, school, captured_at, contact_url, main_text, contact_text FROM captures c "
+            "WHERE captured_at = (SELECT MAX(captured_at) FROM captures "
+            "                     WHERE url = c.url AND school = c.school)"
+        )
+        params: tuple = ()
+        if school is not None:
+            query += " AND school = ?"
+            params = (school,)
+        with self._lock:
+            cursor = self.conn.execute(query + " ORDER BY school, url", params)
+        # Rows are read from the cursor and decompressed as the caller asks for them,
+        # so only the captures in use are held in memory
+        while True:
+            with self._lock:
+                rows = cursor.fetchmany(FETCH_SIZE)
+            if not rows:
+                break
+            for url, school_name, captured_at, contact_url, main_blob, contact_blob in rows:
+                yield {
+                    "url": url,
+                    "school": school_name,
+                    "captured_at": captured_at,
+                    "contact_url": contact_url,
+                    "main_text": _unpack(main_blob),
+                    "contact_text": _unpack(contact_blob),
+                }
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            captures, profiles, raw, stored = self.conn.execute(
+                "SELECT COUNT(*), COUNT(DISTINCT url || char(0) || school), COALESCE(SUM(raw_bytes), 0), "
+                "COALESCE(SUM(LENGTH(main_text) + LENGTH(contact_text)), 0) FROM captures"
+            ).fetchone()
+        return {
+            "captures": captures,
+            "profiles": profiles,
+            "raw_bytes": raw,
+            "stored_bytes": stored,
+            "compression_ratio": raw / stored if stored else 0.0,
+        }
+
+    def close(self) -> None:
+        self.conn.close()
@@ -0,0 +1,186 @@
+"""
+Offline compaction of the per-school ``.cache/runs/*.jsonl`` files into one
+deliverable:
+
+    python -m scraper.compact --output contacts.xlsx
+    python -m scraper.compact --output contacts.parquet --workers 8
+    python -m scraper.compact --output contacts.sqlite --runs-dir path/to/runs
+
+Run files are parsed in parallel worker processes. Their contacts are
+de-duplicated by canonical ``linkedin_url``, and the newest record wins
+(``captured_at``, falling back to the file's mtime). Parsed files are merged
+into an on-disk SQLite table as they arrive, so memory is bounded by the
+files in flight rather than by the size of the corpus.
+"""
+from __future__ import annotations
+import argparse, json, os, sqlite3, sys, tempfile
+from concurrent.futures import ProcessPoolExecutor, FIRST_COMPLETED, wait
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Tuple
+
+from .config import CACHE_DIR
+from .io_utils import CONTACT_FIELDS, CONTACTS_SHEET, canonical_profile_url, stream_write_excel
+
+OUTPUT_COLUMNS = ["school", *CONTACT_FIELDS, "captured_at"]
+FORMATS = {".xlsx": "xlsx", ".parquet": "parquet", ".sqlite": "sqlite", ".db": "sqlite"}
+
+MERGE_SCHEMA = f"""
+CREATE TABLE IF NOT EXISTS contacts (
+    key TEXT PRIMARY KEY,
+    school TEXT,
+    {", ".join(f"{f} TEXT" for f in CONTACT_FIELDS)},
+    captured_at REAL,
+    src TEXT
+);
+CREATE INDEX IF NOT EXISTS ix_contacts_school ON contacts (school);
+"""
+
+
+def read_run_file(path: str) -> List[Tuple[Any, ...]]:
+    """
+    Parse one run file (in a worker process) into merge rows, keeping only
+    the newest record per canonical URL within the file.
+    """
+    school = Path(path).stem
+    mtime = os.path.getmtime(path)
+    best: Dict[str, Tuple[Any, ...]] = {}
+    with open(path, encoding="utf-8") as fh:
+        for line_no, line in enumerate(fh, 1):
+            try:
+                rec = json.loads(line)
+            except json.JSONDecodeError:
+                continue  # torn or corrupt line
+            if not isinstance(rec, dict):
+                continue  # valid JSON, but not a contact
+            url = canonical_profile_url(rec.get("linkedin_url"))
+            # Contacts without a URL cannot be matched; keep each one
+            key = url or f"nourl:{school}:{line_no}"
+            captured_at = float(rec.get("captured_at") or mtime)
+            src = f"{Path(path).name}:{line_no:09d}"
+            row = (key, school, *(rec.get(f) for f in CONTACT_FIELDS), captured_at, src)
+            prev = best.get(key)
+            if prev is None or (captured_at, src) >= (prev[-2], prev[-1]):
+                best[key] = row
+    return list(best.values())
+
+
+def _merge(conn: sqlite3.Connection, rows: List[Tuple[Any, ...]]) -> None:
+    cols = ["key", "school", *CONTACT_FIELDS, "captured_at", "src"]
+    updates = ", ".join(f"{c}=excluded.{c}" for c in cols[1:])
+    with conn:
+        conn.executemany(
+            f"INSERT INTO contacts ({', '.join(cols)}) VALUES ({', '.join('?' * len(cols))}) "
+            f"ON CONFLICT(key) DO UPDATE SET {updates} "
+            "WHERE (excluded.captured_at, excluded.src) >= (contacts.captured_at, contacts.src)",
+            rows,
+        )
+
+
+def merge_run_files(files: List[Path], db_path: Path, workers: int) -> Tuple[int, int]:
+    """Parse ``files`` in parallel and merge them into ``db_path``. Returns (records, unique)."""
+    conn = sqlite3.connect(str(db_path))
+    conn.execute("PRAGMA journal_mode=OFF")
+    conn.execute("PRAGMA synchronous=OFF")
+    conn.executescript(MERGE_SCHEMA)
+    records = 0
+    pending_files = iter(files)
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        # Keep a bounded window of files in flight
+        in_flight = set()
+        for path in pending_files:
+            in_flight.add(pool.submit(read_run_file, str(path)))
+            if len(in_flight) >= workers * 2:
+                break
+        while in_flight:
+            done, in_flight = wait(in_flight, return_when=FIRST_COMPLETED)
+            for fut in done:
+                rows = fut.result()
+                records += len(rows)
+                _merge(conn, rows)
+                nxt = next(pending_files, None)
+                if nxt is not None:
+                    in_flight.add(pool.submit(read_run_file, str(nxt)))
+    unique = conn.execute("SELECT COUNT(*) FROM contacts").fetchone()[0]
+    conn.close()
+    return records, unique
+
+
+def iter_compacted(conn: sqlite3.Connection, chunk: int = 10_000) -> Iterator[List[Tuple[Any, ...]]]:
+    cur = conn.execute(f"SELECT {', '.join(OUTPUT_COLUMNS)} FROM contacts ORDER BY school, captured_at")
+    while True:
+        rows = cur.fetchmany(chunk)
+        if not rows:
+            return
+        yield rows
+
+
+def write_output(db_path: Path, output: Path, fmt: str) -> None:
+    if fmt == "sqlite":
+        conn = sqlite3.connect(str(db_path))
+        with conn:
+            conn.execute("CREATE INDEX IF NOT EXISTS ix_contacts_url ON contacts (linkedin_url)")
+        conn.close()
+        os.replace(db_path, output)
+        return
+
+    conn = sqlite3.connect(str(db_path))
+    try:
+        if fmt == "parquet":
+            try:
+                import pyarrow as pa
+                import pyarrow.parquet as pq
+            except ImportError as e:
+                raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)") from e
+            schema = pa.schema([(c, pa.float64() if c == "captured_at" else pa.string()) for c in OUTPUT_COLUMNS])
+            tmp_fd, tmp_path = tempfile.mkstemp(suffix=".parquet", dir=str(output.parent))
+            os.close(tmp_fd)
+            with pq.ParquetWriter(tmp_path, schema) as pw:
+                for rows in iter_compacted(conn):
+                    pw.write_table(pa.Table.from_pylist([dict(zip(OUTPUT_COLUMNS, r)) for r in rows], schema=schema))
+            os.replace(tmp_path, output)
+        else:
+            rows = (row for chunk in iter_compacted(conn) for row in chunk)
+            stream_write_excel(output, [(CONTACTS_SHEET, OUTPUT_COLUMNS, rows)])
+    finally:
+        conn.close()
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(
+        description="Merge .cache/runs JSONL files into one de-duplicated output."
+    )
+    p.add_argument("--runs-dir", default=str(CACHE_DIR / "runs"), help="Directory of per-school .jsonl run files")
+    p.add_argument("--output", required=True, help="OUTPUT .xlsx, .parquet or .sqlite")
+    p.add_argument("--format", choices=sorted(set(FORMATS.values())), help="Override the format implied by --output")
+    p.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Parallel parser processes")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    runs_dir = Path(args.runs_dir).expanduser().resolve()
+    output = Path(args.output).expanduser().resolve()
+    fmt = args.format or FORMATS.get(output.suffix.lower())
+    if fmt is None:
+        sys.exit(f"Cannot infer output format from {output.name}; pass --format")
+
+    files = sorted(runs_dir.glob("*.jsonl"))
+    if not files:
+        sys.exit(f"No run files found in {runs_dir}")
+    print(f"🗜️  Compacting {len(files)} run files with {args.workers} workers...")
+
+    output.parent.mkdir(parents=True, exist_ok=True)
+    tmp_fd, tmp_db = tempfile.mkstemp(suffix=".sqlite", dir=str(output.parent))
+    os.close(tmp_fd)
+    db_path = Path(tmp_db)
+    try:
+        records, unique = merge_run_files(files, db_path, max(1, args.workers))
+        write_output(db_path, output, fmt)
+    finally:
+        db_path.unlink(missing_ok=True)
+
+    print(f"✅  {records} records -> {unique} unique contacts. Results in {output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -22,6 +22,15 @@ CHROME_DEBUG_PORT = int(os.getenv("CHROME_DEBUG_PORT", "0"))
 FORCE_CLOSE_CHROME = os.getenv("FORCE_CLOSE_CHROME", "1") == "1"
 PROXY = os.getenv("PROXY")
 MAX_PROFILES_PER_DAY = int(os.getenv("MAX_PROFILES_PER_DAY", "100000"))
+# Rebuild the output workbook from the results journal every N contacts
+CHECKPOINT_EVERY = int(os.getenv("CHECKPOINT_EVERY", "50"))
+# Durability of JSONL appends (journal, batch queue; the event log is never fsynced):
+#   fsync - fsync after every record
+#   group - fsync every GROUP_COMMIT_RECORDS records or GROUP_COMMIT_MS milliseconds
+#   os    - flush to the OS only, let it decide when to write back
+DURABILITY = os.getenv("DURABILITY", "fsync").lower()  # fsync | group | os
+GROUP_COMMIT_RECORDS = int(os.getenv("GROUP_COMMIT_RECORDS", "64"))
+GROUP_COMMIT_MS = int(os.getenv("GROUP_COMMIT_MS", "200"))
 
 # --- Data Impulse Proxy Settings ---
 USE_DATA_IMPULSE = os.getenv("USE_DATA_IMPULSE", "true").lower() == "true"
@@ -36,4 +45,35 @@ TZ_TOLERANCE_HOURS = int(os.getenv("TZ_TOLERANCE_HOURS", "1"))
 DI_STICKY_SESSION = os.getenv("DI_STICKY_SESSION")  # optional sticky/session id
 
 # Warm-up behavior: "always" or "once"
-WARM_UP_MODE = os.getenv("WARM_UP_MODE", "always").lower()  # always | once
\ No newline at end of file
+WARM_UP_MODE = os.getenv("WARM_UP_MODE", "always").lower()  # always | once
+
+# --- LLM extraction ---
+# openai | local (OpenAI-compatible server, e.g. llama.cpp or vLLM) | fake (deterministic, offline); see backends.py
+EXTRACTION_BACKEND = os.getenv("EXTRACTION_BACKEND", "openai").lower()
+EXTRACTION_MODEL = os.getenv("EXTRACTION_MODEL", "gpt-4o-mini")
+LOCAL_LLM_BASE_URL = os.getenv("LOCAL_LLM_BASE_URL", "http://127.0.0.1:8080/v1")
+LOCAL_LLM_MODEL = os.getenv("LOCAL_LLM_MODEL", "local")
+LOCAL_LLM_API_KEY = os.getenv("LOCAL_LLM_API_KEY")
+LOCAL_LLM_MAX_CONCURRENCY = int(os.getenv("LOCAL_LLM_MAX_CONCURRENCY", "4"))
+# Live extraction tries these models cheapest first, escalating when a reply fails validation
+# or the confidence checks, e.g. "gpt-4.1-nano:30,gpt-4o-mini" (model[:read timeout s]; empty = EXTRACTION_MODEL only)
+EXTRACTION_CASCADE = os.getenv("EXTRACTION_CASCADE", "")
+# Content-addressed cache of extraction responses (see llm_cache.py)
+LLM_CACHE_ENABLED = os.getenv("LLM_CACHE_ENABLED", "1") == "1"
+LLM_CACHE_PATH = Path(os.getenv("LLM_CACHE_PATH", str(CACHE_DIR / "llm_cache.sqlite")))
+LLM_CACHE_MAX_MB = int(os.getenv("LLM_CACHE_MAX_MB", "512"))
+LLM_CACHE_TTL_DAYS = float(os.getenv("LLM_CACHE_TTL_DAYS", "90"))
+# Strip boilerplate from profile text and cap it at this many tokens (0 = no cap)
+PREPROCESS_ENABLED = os.getenv("PREPROCESS_ENABLED", "1") == "1"
+PROMPT_TOKEN_BUDGET = int(os.getenv("PROMPT_TOKEN_BUDGET", "1500"))
+# Pull name/e-mail/phone/URL with patterns and ask the LLM only for title, department and bio
+PRE_EXTRACT_ENABLED = os.getenv("PRE_EXTRACT_ENABLED", "1") == "1"
+# Profiles of one school packed into a single prompt by ContactExtractor.extract_many (1 = no packing)
+EXTRACTION_PACK_SIZE = int(os.getenv("EXTRACTION_PACK_SIZE", "1"))
+# live  - call the LLM for each profile while scraping
+# batch - record uncached prompts for the Batch API instead (see batch.py)
+EXTRACTION_MODE = os.getenv("EXTRACTION_MODE", "live").lower()  # live | batch
+BATCH_DIR = CACHE_DIR / "batch"
+# Keep the raw text of every profile visit (compressed) for `python -m scraper.reextract`
+CAPTURE_ENABLED = os.getenv("CAPTURE_ENABLED", "1") == "1"
+CAPTURE_PATH = Path(os.getenv("CAPTURE_PATH", str(CACHE_DIR / "captures.sqlite")))
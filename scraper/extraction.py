@@ -0,0 +1,501 @@
+"""
+Turns captured profile text into a validated Contact via the LLM.
+
+Kept separate from the browser code so the same path can run without
+Selenium (e.g. re-extraction of stored text).
+"""
+from __future__ import annotations
+import json
+from typing import Any, Dict, Iterable, List, Tuple
+
+from .config import (
+    EXTRACTION_MODEL,
+    LLM_CACHE_ENABLED, LLM_CACHE_PATH, LLM_CACHE_MAX_MB, LLM_CACHE_TTL_DAYS,
+    PREPROCESS_ENABLED, PROMPT_TOKEN_BUDGET, PRE_EXTRACT_ENABLED, EXTRACTION_PACK_SIZE,
+)
+from pydantic import ValidationError
+
+from openai_api_call import RequestFailed
+
+from .json_repair import repair_json
+from .llm_cache import ResponseCache
+from .models import Contact, ContactDetails
+from .pre_extract import FIELDS as PRE_EXTRACT_FIELDS, pre_extract
+from .preprocess import clean_profile_text, count_tokens
+from . import prompts as default_prompts
+
+
+def empty_contact(href: str | None) -> Dict[str, Any]:
+    """All-null record stored when extraction fails, so the profile is not lost."""
+    return {
+        "name": None,
+        "title": None,
+        "department": None,
+        "email": None,
+        "phone": None,
+        "linkedin_url": href,
+        "bio": None,
+    }
+
+
+# Models that accept a strict JSON schema, and those limited to plain JSON mode
+STRUCTURED_OUTPUT_MODELS = {"gpt-4o", "gpt-4o-mini", "gpt-4.1", "gpt-4.1-mini", "gpt-4.1-nano"}
+JSON_MODE_MODELS = {"gpt-4-turbo", "gpt-3.5-turbo"}
+
+
+def contact_json_schema(schema_model=Contact) -> Dict[str, Any]:
+    """
+    ``schema_model`` (Contact or ContactDetails) as a strict structured-output
+    schema: every field is listed in ``required`` (strict mode demands it)
+    and optional fields are nullable.
+    """
+    properties = {
+        name: {"type": "string"} if field.is_required() else {"type": ["string", "null"]}
+        for name, field in schema_model.model_fields.items()
+    }
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def response_format_for(model: str, schema_model=Contact) -> Dict[str, Any] | None:
+    if model in STRUCTURED_OUTPUT_MODELS:
+        name = schema_model.__name__.lower()
+        return {"type": "json_schema", "json_schema": {"name": name, "strict": True, "schema": contact_json_schema(schema_model)}}
+    if model in JSON_MODE_MODELS:
+        return {"type": "json_object"}
+    return None
+
+
+def packed_response_format(model: str) -> Dict[str, Any] | None:
+    """Response format for PACKED_TEMPLATE: ``{"contacts": [Contact + profile_id, ...]}``."""
+    if model in STRUCTURED_OUTPUT_MODELS:
+        item = contact_json_schema(Contact)
+        item["properties"] = {"profile_id": {"type": "string"}, **item["properties"]}
+        item["required"] = list(item["properties"])
+        schema = {
+            "type": "object",
+            "properties": {"contacts": {"type": "array", "items": item}},
+            "required": ["contacts"],
+            "additionalProperties": False,
+        }
+        return {"type": "json_schema", "json_schema": {"name": "contacts", "strict": True, "schema": schema}}
+    if model in JSON_MODE_MODELS:
+        return {"type": "json_object"}
+    return None
+
+
+def render_pack(school_name: str, texts: List[str],
+                template: str = default_prompts.PACKED_TEMPLATE) -> Tuple[str, List[str]]:
+    """PACKED_TEMPLATE (sent after PACKED_INSTRUCTIONS) for ``texts``; returns (prompt, profile ids in order)."""
+    ids = [f"P{n}" for n in range(1, len(texts) + 1)]
+    profiles = "\n\n".join(f"### Profile {pid}\n{text}" for pid, text in zip(ids, texts))
+    prompt = template.format_map({"count": len(texts), "school_name": school_name, "profiles": profiles})
+    return prompt, ids
+
+
+def split_packed_reply(reply: str, ids: List[str], urls: List[str | None]) -> Dict[int, Dict[str, Any]]:
+    """
+    Map the items of a packed reply back to their profiles, by position in
+    ``ids``. An item is matched by its ``profile_id`` or, failing that, by a
+    ``linkedin_url`` equal to one in ``urls``; unmatched, duplicate and
+    non-object items are dropped, so the caller can retry those profiles on
+    their own. Raises ValueError when the reply holds no list of contacts.
+    """
+    try:
+        data = json.loads(reply)
+    except ValueError:
+        data = repair_json(reply)
+    items = data.get("contacts") if isinstance(data, dict) else data
+    if not isinstance(items, list):
+        raise ValueError("packed reply has no contacts list")
+    by_id = {pid: n for n, pid in enumerate(ids)}
+    by_url = {_url_key(u): n for n, u in enumerate(urls) if u}
+    matched: Dict[int, Dict[str, Any]] = {}
+    for item in items:
+        if not isinstance(item, dict):
+            continue
+        item = dict(item)
+        pid = str(item.pop("profile_id", "") or "").strip().lstrip("#").strip()
+        n = by_id.get(pid)
+        if n is None and item.get("linkedin_url"):
+            n = by_url.get(_url_key(item["linkedin_url"]))
+        if n is not None and n not in matched:
+            matched[n] = item
+    return matched
+
+
+def _url_key(url: str) -> str:
+    return str(url).lower().split("?")[0].rstrip("/").removeprefix("https://").removeprefix("http://").removeprefix("www.")
+
+
+def plausible(contact: Dict[str, Any], text: str) -> bool:
+    """
+    Confidence checks on a validated contact, used to decide whether a
+    cascade tier's reply is kept: it has a title, and every word of the name
+    appears in the profile ``text`` (a cheap guard against invented names).
+    """
+    name = (contact.get("name") or "").lower()
+    if not contact.get("title") or not name.strip():
+        return False
+    lowered = " ".join(text.lower().split())
+    return all(part in lowered for part in name.split())
+
+
+def parse_contact(reply: str) -> Dict[str, Any]:
+    return Contact.model_validate(json.loads(reply)).model_dump(mode="json")
+
+
+def parse_contact_lenient(reply: str, known: Dict[str, Any] | None = None) -> Tuple[Dict[str, Any], bool]:
+    """
+    Validate ``reply`` as a Contact, falling back to local JSON repair and
+    then to dropping optional fields that fail validation. ``known`` fields
+    (from pre_extract) take precedence over the reply's. Returns
+    ``(contact, repaired)``; raises ValueError if the reply cannot be saved.
+    """
+    known = known or {}
+    try:
+        parsed = json.loads(reply)
+        if isinstance(parsed, dict):
+            return Contact.model_validate({**parsed, **known}).model_dump(mode="json"), False
+    except ValueError:  # JSONDecodeError and ValidationError
+        pass
+    data = repair_json(reply)
+    if not isinstance(data, dict):
+        raise ValueError("reply is not a JSON object")
+    data = {**data, **known}
+    try:
+        return Contact.model_validate(data).model_dump(mode="json"), True
+    except ValidationError as e:
+        bad = {err["loc"][0] for err in e.errors() if err["loc"]}
+        if "name" in bad:
+            raise
+        data = {k: v for k, v in data.items() if k not in bad}
+        return Contact.model_validate(data).model_dump(mode="json"), True
+
+
+def default_cache() -> ResponseCache | None:
+    if not LLM_CACHE_ENABLED:
+        return None
+    return ResponseCache(
+        LLM_CACHE_PATH,
+        max_bytes=LLM_CACHE_MAX_MB * 1024 * 1024,
+        ttl_seconds=LLM_CACHE_TTL_DAYS * 86400,
+    )
+
+
+class ContactExtractor:
+    """
+    Pulls the verbatim contact fields with patterns (see pre_extract.py),
+    cleans the profile text (see preprocess.py), renders the prompt,
+    consults the response cache, calls the LLM on a miss (with the Contact
+    schema as the response format where the model supports it) and
+    validates the reply, repairing near-valid JSON locally. When the name was
+    pre-extracted the prompt only asks for title, department and bio.
+
+    Only replies that validate are cached. ``last_meta`` describes the most
+    recent call (cache hit, tokens saved, pre-extracted fields, parse
+    outcome) for the event log; ``outcomes`` counts valid, repaired and
+    failed replies.
+
+    With a ``batch`` recorder, misses are not sent: the request is recorded
+    for the Batch API and a URL-only placeholder is returned, to be replaced
+    when ``python -m scraper.batch ingest`` merges the results. Requests the
+    client gives up on (RequestFailed) go the same way through the
+    ``dead_letter`` recorder instead of stalling the run.
+
+    With a ``cascade`` (openai_api_call.ModelCascade), live misses go to its
+    cheapest model first and move up a tier when the reply fails validation
+    or ``plausible``.
+
+    ``prompts`` is the module holding the templates (scraper.prompts by
+    default); another module with the same names is a different prompt
+    version, and its TEMPLATE_VERSION keeps its replies apart in the cache.
+
+    ``extract_many`` can pack up to ``pack_size`` profiles of one school into
+    a single PACKED_TEMPLATE request; profiles whose item is missing from
+    the reply or fails validation are retried one per request.
+    """
+
+    def __init__(self, client, model: str = EXTRACTION_MODEL, cache: ResponseCache | None = None, batch=None,
+                 preprocess: bool = PREPROCESS_ENABLED, token_budget: int | None = PROMPT_TOKEN_BUDGET or None,
+                 narrow: bool = PRE_EXTRACT_ENABLED, dead_letter=None, pack_size: int = EXTRACTION_PACK_SIZE,
+                 cascade=None, prompts=None):
+        self.client = client
+        self.model = model
+        self.cache = cache
+        self.batch = batch
+        self.dead_letter = dead_letter
+        self.dead_lettered = 0
+        self.preprocess = preprocess
+        self.token_budget = token_budget
+        self.narrow = narrow
+        self.pack_size = pack_size
+        self.cascade = cascade or None
+        self.prompts = prompts or default_prompts
+        self.packed_format = packed_response_format(model)
+        self.packs = {"requests": 0, "profiles": 0, "fallbacks": 0}
+        self.last_meta: Dict[str, Any] = {}
+        self.totals = {"profiles": 0, "tokens_raw": 0, "tokens_sent": 0}
+        self.response_format = response_format_for(model)
+        self.details_format = response_format_for(model, ContactDetails)
+        self.outcomes = {"valid": 0, "repaired": 0, "failed": 0}
+        self.pre_hits = {"profiles": 0, "narrowed": 0, "prompt_tokens_saved": 0, **{f: 0 for f in PRE_EXTRACT_FIELDS}}
+
+    def _prompt(self, school_name: str, text: str) -> Tuple[str, str, str, Dict[str, Any] | None, Dict[str, Any], Dict[str, Any]]:
+        """Returns (instructions, prompt, cache key, response format, known fields, meta)."""
+        text, known, meta = self._prepare(text)
+        return (*self._render(school_name, text, known, meta), meta)
+
+    def _prepare(self, text: str) -> Tuple[str, Dict[str, Any], Dict[str, Any]]:
+        """Pre-extracts and cleans ``text``; returns (text to send, pre-extracted fields, meta)."""
+        meta: Dict[str, Any] = {}
+        known: Dict[str, Any] = {}
+        if self.narrow:
+            known = pre_extract(text)
+            self.pre_hits["profiles"] += 1
+            for field in known:
+                self.pre_hits[field] += 1
+            meta["pre_extracted"] = sorted(known)
+        if self.preprocess:
+            text, pre = clean_profile_text(text, self.token_budget)
+            meta.update(pre)
+            self.totals["profiles"] += 1
+            self.totals["tokens_raw"] += pre["tokens_raw"]
+            self.totals["tokens_sent"] += pre["tokens_sent"]
+        return text, known, meta
+
+    def _render(self, school_name: str, text: str, known: Dict[str, Any],
+                meta: Dict[str, Any]) -> Tuple[str, str, str, Dict[str, Any] | None, Dict[str, Any]]:
+        """
+        Returns (instructions, prompt, cache key, response format, known fields
+        to trust). The instructions are static per template and go first as
+        the system message; the prompt carries the school and profile text.
+        """
+        fields = {"school_name": school_name, "text": text}
+        if "name" in known:
+            instructions = self.prompts.DETAILS_INSTRUCTIONS
+            prompt = self.prompts.DETAILS_TEMPLATE.format_map({**fields, "name": known["name"]})
+            saved = (count_tokens(self.prompts.INSTRUCTIONS) + count_tokens(self.prompts.TEMPLATE.format_map(fields))
+                     - count_tokens(instructions) - count_tokens(prompt))
+            self.pre_hits["narrowed"] += 1
+            self.pre_hits["prompt_tokens_saved"] += saved
+            meta["prompt_tokens_saved"] = saved
+            response_format = self.details_format
+        else:
+            known = {}  # only trusted alongside a narrowed prompt
+            instructions = self.prompts.INSTRUCTIONS
+            prompt = self.prompts.TEMPLATE.format_map(fields)
+            response_format = self.response_format
+        return instructions, prompt, self._cache_key(self.model, prompt), response_format, known
+
+    def _cache_key(self, model: str, prompt: str) -> str:
+        # The instructions are fixed for a TEMPLATE_VERSION, and each template's prompt is distinct
+        return ResponseCache.key(model, self.prompts.TEMPLATE_VERSION, prompt)
+
+    def _accept(self, reply: str, key: str, cached: bool, href: str | None, known: Dict[str, Any],
+                model: str | None = None) -> Dict[str, Any]:
+        try:
+            contact, repaired = parse_contact_lenient(reply, known)
+        except Exception as e:
+            print(f"    ⚠️  OpenAI parse failed: {repr(e)}")
+            self.outcomes["failed"] += 1
+            self.last_meta["parse"] = "failed"
+            return {**empty_contact(href), **known}
+        outcome = "repaired" if repaired else "valid"
+        self.outcomes[outcome] += 1
+        self.last_meta["parse"] = outcome
+        if self.cache is not None and not cached:
+            self.cache.put(key, model or self.model, reply)
+        return contact
+
+    def _fetch_cascade(self, instructions: str, prompt: str, text: str, known: Dict[str, Any]) -> Tuple[str, str]:
+        schema_model = ContactDetails if known else Contact
+
+        def accept(reply: str) -> bool:
+            try:
+                contact, _ = parse_contact_lenient(reply, known)
+            except Exception:
+                return False
+            return plausible(contact, text)
+
+        return self.client.fetch_cascade(
+            prompt, self.cascade, accept,
+            response_format=lambda model: response_format_for(model, schema_model), system=instructions,
+        )
+
+    def extract(self, school_name: str, text: str, href: str | None = None) -> Dict[str, Any]:
+        instructions, prompt, key, response_format, known, meta = self._prompt(school_name, text)
+        if self.cascade is not None:
+            # Any tier may answer, so replies belong to the cascade as configured, not to self.model
+            key = self._cache_key(self.cascade.spec, prompt)
+        reply = self.cache.get(key) if self.cache is not None else None
+        self.last_meta = {"cache_hit": reply is not None, **meta}
+        if reply is None and self.batch is not None:
+            body = self.client.payload(prompt, self.model, response_format, instructions)
+            self.batch.record(key, body, school_name, href, known)
+            self.last_meta["deferred"] = True
+            return empty_contact(href)
+        model = None
+        if reply is None:
+            try:
+                if self.cascade is not None:
+                    reply, model = self._fetch_cascade(instructions, prompt, text, known)
+                    self.last_meta["model"] = model
+                else:
+                    reply, model = self.client.fetch_answer(prompt, model=self.model, response_format=response_format,
+                                                            system=instructions)
+                    if model != self.model:
+                        # A hedge to another model answered; keep its reply out of this model's cache slot
+                        self.last_meta["model"] = model
+                        key = self._cache_key(model, prompt)
+            except RequestFailed as e:
+                return self._dead_letter(e, key, school_name, href, known)
+        return self._accept(reply, key, self.last_meta["cache_hit"], href, known, model)
+
+    def _dead_letter(self, e: RequestFailed, key: str, school_name: str, href: str | None,
+                     known: Dict[str, Any]) -> Dict[str, Any]:
+        if self.dead_letter is None:
+            raise e
+        print(f"    ☠️  {e}; dead-lettered for batch replay")
+        self.dead_letter.record(key, e.data, school_name, href, known)
+        self.dead_lettered += 1
+        self.last_meta["dead_lettered"] = True
+        return {**empty_contact(href), **known}
+
+    def extract_many(self, items: Iterable[Tuple[str, str, str | None]],
+                     concurrency: int | None = None, pack_size: int | None = None) -> List[Dict[str, Any]]:
+        """
+        Extract many ``(school_name, text, href)`` items, in order. Cache hits
+        are served locally; the misses go out concurrently through the
+        client's ``fetch_many``, one call per response format, or packed
+        ``pack_size`` profiles of a school per call. Items whose call failed
+        come back empty.
+        """
+        pack_size = self.pack_size if pack_size is None else pack_size
+        items = list(items)
+        results: List[Dict[str, Any] | None] = [None] * len(items)
+        # (index, text, instructions, prompt, cache key, response format, known fields)
+        misses: List[Tuple[int, str, str, str, str, Dict[str, Any] | None, Dict[str, Any]]] = []
+        for i, (school_name, text, href) in enumerate(items):
+            text, known, meta = self._prepare(text)
+            instructions, prompt, key, response_format, known = self._render(school_name, text, known, meta)
+            reply = self.cache.get(key) if self.cache is not None else None
+            if reply is None:
+                misses.append((i, text, instructions, prompt, key, response_format, known))
+            else:
+                results[i] = self._accept(reply, key, True, href, known)
+        if pack_size > 1:
+            misses = self._send_packed(items, misses, results, pack_size, concurrency)
+        self._send_single(items, misses, results, concurrency)
+        return results
+
+    def _send_single(self, items, misses, results, concurrency) -> None:
+        groups: Dict[Tuple[str, str], list] = {}
+        for miss in misses:
+            groups.setdefault((miss[2], json.dumps(miss[5], sort_keys=True)), []).append(miss)
+        for group_misses in groups.values():
+            replies = self.client.fetch_many(
+                [m[3] for m in group_misses], model=self.model, concurrency=concurrency,
+                response_format=group_misses[0][5], system=group_misses[0][2],
+            )
+            for (i, _, _, _, key, _, known), reply in zip(group_misses, replies):
+                href = items[i][2]
+                if isinstance(reply, RequestFailed) and self.dead_letter is not None:
+                    results[i] = self._dead_letter(reply, key, items[i][0], href, known)
+                elif isinstance(reply, BaseException):
+                    print(f"    ⚠️  OpenAI call failed for {href}: {repr(reply)}")
+                    results[i] = {**empty_contact(href), **known}
+                else:
+                    results[i] = self._accept(reply, key, False, href, known)
+
+    def _send_packed(self, items, misses, results, pack_size, concurrency) -> list:
+        """
+        Send ``misses`` as packs of up to ``pack_size`` profiles per school and
+        fill ``results`` from the replies; returns the misses still to be sent
+        one by one (lone profiles, and those the pack did not answer validly).
+        """
+        by_school: Dict[str, list] = {}
+        for miss in misses:
+            by_school.setdefault(items[miss[0]][0], []).append(miss)
+        packs, single = [], []
+        for school_name, school_misses in by_school.items():
+            for n in range(0, len(school_misses), pack_size):
+                chunk = school_misses[n:n + pack_size]
+                if len(chunk) > 1:
+                    texts = [m[1] for m in chunk]
+                    packs.append((school_name, chunk, *render_pack(school_name, texts, self.prompts.PACKED_TEMPLATE)))
+                else:
+                    single.extend(chunk)
+        if not packs:
+            return single
+        replies = self.client.fetch_many(
+            [prompt for _, _, prompt, _ in packs], model=self.model, concurrency=concurrency,
+            response_format=self.packed_format, system=self.prompts.PACKED_INSTRUCTIONS,
+        )
+        for (school_name, chunk, _, ids), reply in zip(packs, replies):
+            self.packs["requests"] += 1
+            self.packs["profiles"] += len(chunk)
+            if isinstance(reply, BaseException):
+                print(f"    ⚠️  Packed call for {school_name} failed, retrying one by one: {repr(reply)}")
+                self.packs["fallbacks"] += len(chunk)
+                single.extend(chunk)
+                continue
+            urls = [m[6].get("linkedin_url") or items[m[0]][2] for m in chunk]
+            try:
+                matched = split_packed_reply(reply, ids, urls)
+            except ValueError as e:
+                print(f"    ⚠️  Packed reply for {school_name} unreadable, retrying one by one: {repr(e)}")
+                matched = {}
+            for n, (i, _, _, _, key, _, known) in enumerate(chunk):
+                contact = self._accept_packed(matched.get(n), key, known)
+                if contact is None:
+                    self.packs["fallbacks"] += 1
+                    single.append(chunk[n])
+                else:
+                    results[i] = contact
+        return single
+
+    def _accept_packed(self, item: Dict[str, Any] | None, key: str, known: Dict[str, Any]) -> Dict[str, Any] | None:
+        """Validate one item of a packed reply; None when it must be retried on its own."""
+        if item is None:
+            return None
+        reply = json.dumps(item, ensure_ascii=False)
+        try:
+            contact, repaired = parse_contact_lenient(reply, known)
+        except Exception:
+            return None
+        self.outcomes["repaired" if repaired else "valid"] += 1
+        # Cached under the profile's single-prompt key, so later runs hit it either way
+        if self.cache is not None:
+            self.cache.put(key, self.model, reply)
+        return contact
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {}
+        if self.cache is not None:
+            stats["cache"] = self.cache.stats()
+        if self.totals["profiles"]:
+            stats["preprocess"] = dict(self.totals)
+        if self.pre_hits["profiles"]:
+            stats["pre_extract"] = dict(self.pre_hits)
+        if any(self.outcomes.values()):
+            stats["parse"] = dict(self.outcomes)
+        if self.dead_lettered:
+            stats["dead_lettered"] = self.dead_lettered
+        if self.packs["requests"]:
+            stats["packed"] = dict(self.packs)
+        if self.cascade is not None:
+            stats["cascade"] = self.cascade.stats()
+        return stats
+
+    def close(self) -> None:
+        if self.cache is not None:
+            self.cache.close()
+        if self.batch is not None:
+            self.batch.close()
+        if self.dead_letter is not None:
+            self.dead_letter.close()
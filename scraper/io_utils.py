@@ -1,13 +1,15 @@
 from __future__ import annotations
-import json, os, shutil, tempfile
+import csv, json, os, queue, shutil, sqlite3, tempfile, threading, uuid
 from pathlib import Path
-from typing import List, Dict, Any
+from contextlib import contextmanager
+from typing import List, Dict, Any, Callable, Iterable, Iterator, Tuple
+from urllib.parse import urlsplit
 import ast
 import datetime as _dt
 import time as _time
 
 import pandas as pd
-from .config import ROOT, TZ_TOLERANCE_HOURS
+from .config import ROOT, TZ_TOLERANCE_HOURS, DURABILITY, GROUP_COMMIT_RECORDS, GROUP_COMMIT_MS
 
 # default output file is now XLSX
 OUTPUT_DEFAULT = ROOT / "output.xlsx"
@@ -79,22 +81,132 @@ def choose_country_for_timezone(offset_hours: int, tolerance_hours: int = TZ_TOL
     return candidates[0]
 
 # ---------- Excel helpers ----------
-def read_input(path: Path) -> pd.DataFrame:
-    """Read the input *Excel* with columns id,name (both coerced to str)."""
-    df = pd.read_excel(path, dtype={"id": str, "name": str})
-    if df.isnull().any().any():
-        raise ValueError("Input Excel contains nulls in mandatory columns.")
-    return df
+INPUT_COLUMNS = ("id", "name")
+
+
+def _input_cell(value: Any) -> str | None:
+    if value is None or (isinstance(value, float) and value != value):
+        return None
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)  # Excel stores numeric ids as floats
+    value = str(value)
+    return value if value.strip() else None
+
+
+def _header_index(header, path: Path) -> tuple[int, int]:
+    names = [str(h).strip() if h is not None else "" for h in header]
+    missing = [c for c in INPUT_COLUMNS if c not in names]
+    if missing:
+        raise ValueError(f"Input {path.name} is missing mandatory column(s): {', '.join(missing)}")
+    return names.index("id"), names.index("name")
+
+
+def iter_input(path: Path) -> Iterator[Tuple[str, str]]:
+    """
+    Lazily yield (id, name) rows from an .xlsx, .csv or .parquet input.
+
+    The header is checked up front; rows are validated one at a time and
+    rows with an empty id or name are reported and skipped, so even a very
+    large list starts being processed immediately.
+    """
+    suffix = path.suffix.lower()
+    if suffix in (".xlsx", ".xlsm"):
+        from openpyxl import load_workbook
+
+        wb = load_workbook(path, read_only=True, data_only=True)
+        try:
+            rows = wb.worksheets[0].iter_rows(values_only=True)
+            id_idx, name_idx = _header_index(next(rows, ()), path)
+        except Exception:
+            wb.close()
+            raise
+        source = ((r[id_idx] if len(r) > id_idx else None, r[name_idx] if len(r) > name_idx else None) for r in rows)
+        closer = wb.close
+    elif suffix == ".csv":
+        fh = open(path, newline="", encoding="utf-8-sig")
+        try:
+            reader = csv.reader(fh)
+            id_idx, name_idx = _header_index(next(reader, []), path)
+        except Exception:
+            fh.close()
+            raise
+        source = ((r[id_idx] if len(r) > id_idx else None, r[name_idx] if len(r) > name_idx else None) for r in reader)
+        closer = fh.close
+    elif suffix == ".parquet":
+        try:
+            import pyarrow.parquet as pq
+        except ImportError as e:
+            raise RuntimeError("Reading .parquet input requires pyarrow (pip install pyarrow)") from e
+        pf = pq.ParquetFile(path)
+        closer = pf.close if hasattr(pf, "close") else (lambda: None)
+        try:
+            _header_index(pf.schema_arrow.names, path)
+        except Exception:
+            closer()
+            raise
+        source = (
+            (i, n)
+            for batch in pf.iter_batches(columns=list(INPUT_COLUMNS))
+            for i, n in zip(batch.column("id").to_pylist(), batch.column("name").to_pylist())
+        )
+    else:
+        raise ValueError(f"Unsupported input format: {path.suffix} (expected .xlsx, .csv or .parquet)")
+
+    def _rows() -> Iterator[Tuple[str, str]]:
+        try:
+            for line_no, (raw_id, raw_name) in enumerate(source, start=2):
+                school_id, school_name = _input_cell(raw_id), _input_cell(raw_name)
+                if school_id is None or school_name is None:
+                    if raw_id is None and raw_name is None:
+                        continue  # blank line
+                    print(f"⚠️  Skipping input row {line_no}: missing id or name")
+                    continue
+                yield school_id, school_name
+        finally:
+            closer()
+
+    return _rows()
+
+
+CONTACT_FIELDS = ["name", "title", "department", "email", "phone", "linkedin_url", "bio"]
+SCHOOLS_SHEET = "schools"
+CONTACTS_SHEET = "contacts"
+# Excel refuses to open a workbook with a longer cell; the journal and store keep the full text
+EXCEL_CELL_LIMIT = 32_767
+TRUNCATED_MARKER = " … [truncated]"
+
+
+def excel_cell(value: Any) -> Any:
+    """``value`` cut to EXCEL_CELL_LIMIT characters, ending in TRUNCATED_MARKER, if it is a longer string."""
+    if isinstance(value, str) and len(value) > EXCEL_CELL_LIMIT:
+        return value[:EXCEL_CELL_LIMIT - len(TRUNCATED_MARKER)] + TRUNCATED_MARKER
+    return value
 
 
 def read_output(path: Path) -> pd.DataFrame | None:
-    """Read the existing output (if any) as DataFrame."""
+    """
+    Read the existing output (if any) as DataFrame with a list-valued
+    ``contacts`` column, regrouped from the long-format contacts sheet.
+    """
     if not path.exists():
         return None
-    
-    df = pd.read_excel(path, dtype={"id": str}, keep_default_na=False)
 
+    sheets = pd.read_excel(path, sheet_name=None, dtype={"id": str, "school_id": str}, keep_default_na=False)
+    if CONTACTS_SHEET in sheets:
+        df = sheets[SCHOOLS_SHEET]
+        contacts = sheets[CONTACTS_SHEET].reindex(columns=["school_id", *CONTACT_FIELDS])
+        contacts = contacts.replace({"": None})
+        grouped = (
+            contacts.groupby("school_id", sort=False)[CONTACT_FIELDS].apply(lambda g: g.to_dict("records"))
+            if len(contacts) else pd.Series(dtype=object)
+        )
+        df["contacts"] = df["id"].map(grouped)
+        df["contacts"] = [c if isinstance(c, list) else [] for c in df["contacts"]]
+        return df
+
+    df = next(iter(sheets.values()))
     if "contacts" in df.columns:
+        # Legacy workbooks stored each school's contacts as one repr() string.
         def literal_eval_safe(val):
             if pd.isna(val) or not isinstance(val, str) or not val.startswith('['):
                 return []
@@ -107,34 +219,715 @@ def read_output(path: Path) -> pd.DataFrame | None:
     return df
 
 
-def atomic_write_excel(df: pd.DataFrame, path: Path) -> None:
+def contacts_long_frame(df: pd.DataFrame) -> pd.DataFrame:
+    """Explode a list-valued ``contacts`` column into one row per contact keyed by school_id."""
+    exploded = df[["id", "contacts"]].explode("contacts").dropna(subset=["contacts"])
+    contacts = pd.DataFrame(exploded["contacts"].tolist(), columns=CONTACT_FIELDS)
+    contacts.insert(0, "school_id", exploded["id"].to_numpy())
+    return contacts
+
+
+def atomic_write_excel(df: pd.DataFrame, path: Path, contacts: pd.DataFrame | None = None) -> None:
     """
     Write DataFrame to XLSX atomically:
     1. write to temp file,
     2. move into place (POSIX-style atomic replace on same filesystem).
+
+    Contacts go to their own long-format sheet (school_id + contact fields),
+    either passed in directly or exploded from a list-valued ``contacts``
+    column, so a school's contacts never share a cell. A single value longer
+    than Excel's 32,767-character limit (e.g. a huge bio) is truncated with
+    a marker (see excel_cell).
     """
+    if contacts is None and "contacts" in df.columns:
+        contacts = contacts_long_frame(df)
+    if "contacts" in df.columns:
+        df = df.drop(columns=["contacts"])
+    df = df.apply(lambda col: col.map(excel_cell))
+    if contacts is not None:
+        contacts = contacts.apply(lambda col: col.map(excel_cell))
     tmp_fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=str(path.parent))
     os.close(tmp_fd)
     with pd.ExcelWriter(tmp_path, engine="openpyxl") as xlw:
-        df.to_excel(xlw, index=False)
+        if contacts is None:
+            df.to_excel(xlw, index=False)
+        else:
+            df.to_excel(xlw, sheet_name=SCHOOLS_SHEET, index=False)
+            contacts.to_excel(xlw, sheet_name=CONTACTS_SHEET, index=False)
     shutil.move(tmp_path, path)  # atomic on same filesystem
 
 
-# ---------- JSON-fragment helpers (unchanged) ----------
-def append_contact_fragment(tmp_path: Path, profile_json: Dict[str, Any]) -> None:
-    with open(tmp_path, "a", encoding="utf-8") as fh:
-        json.dump(profile_json, fh, ensure_ascii=False)
-        fh.write("\n")
-        fh.flush()
-        os.fsync(fh.fileno())
+# ---------- Durable appends ----------
+DURABILITY_POLICIES = ("fsync", "group", "os")
+
+
+class DurableAppender:
+    """
+    Append-mode text file held open for the whole run.
+
+    Every record is flushed to the OS; when it is fsync'ed depends on the
+    durability policy:
+
+    * ``fsync`` – after every record (or every ``append_many`` burst)
+    * ``group`` – once ``group_records`` records are pending or the oldest
+      pending record is ``group_ms`` old (a timer covers idle periods)
+    * ``os``    – never explicitly; the OS writes back on its own schedule
+
+    ``stats`` counts records, fsyncs and time spent in fsync so the policies
+    can be compared per deployment.
+    """
+
+    def __init__(
+        self,
+        path: Path,
+        policy: str = DURABILITY,
+        group_records: int = GROUP_COMMIT_RECORDS,
+        group_ms: int = GROUP_COMMIT_MS,
+    ):
+        if policy not in DURABILITY_POLICIES:
+            raise ValueError(f"Unknown durability policy {policy!r} (expected one of {', '.join(DURABILITY_POLICIES)})")
+        self.path = path
+        self.policy = policy
+        self.group_records = max(1, group_records)
+        self.group_ms = max(1, group_ms)
+        self._fh = None
+        self._lock = threading.Lock()
+        self._pending = 0
+        self._timer: threading.Timer | None = None
+        self.stats = {"records": 0, "fsyncs": 0, "fsync_ms": 0.0}
+
+    def write_lines(self, lines: List[str]) -> None:
+        """Append complete lines (without trailing newline) as one commit."""
+        with self._lock:
+            if self._fh is None:
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                self._fh = open(self.path, "a", encoding="utf-8")
+            self._fh.write("".join(line + "\n" for line in lines))
+            self._fh.flush()
+            self.stats["records"] += len(lines)
+            self._pending += len(lines)
+            if self.policy == "fsync" or (self.policy == "group" and self._pending >= self.group_records):
+                self._sync_locked()
+            elif self.policy == "group" and self._timer is None:
+                self._timer = threading.Timer(self.group_ms / 1000, self.sync)
+                self._timer.daemon = True
+                self._timer.start()
+
+    def write_json(self, record: Dict[str, Any]) -> None:
+        self.write_lines([json.dumps(record, ensure_ascii=False)])
+
+    def sync(self) -> None:
+        with self._lock:
+            self._sync_locked()
+
+    def _sync_locked(self) -> None:
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+        if self._fh is None or not self._pending:
+            return
+        t0 = _time.perf_counter()
+        os.fsync(self._fh.fileno())
+        self.stats["fsync_ms"] += (_time.perf_counter() - t0) * 1000
+        self.stats["fsyncs"] += 1
+        self._pending = 0
+
+    def close(self) -> None:
+        with self._lock:
+            if self.policy != "os":
+                self._sync_locked()
+            elif self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+            if self._fh is not None:
+                self._fh.close()
+                self._fh = None
+            self._pending = 0
+
+
+def format_durability_stats(label: str, stats: Dict[str, Any]) -> str:
+    avg = stats["fsync_ms"] / stats["fsyncs"] if stats["fsyncs"] else 0.0
+    return (
+        f"{label}: {stats['records']} records, {stats['fsyncs']} fsyncs, "
+        f"{stats['fsync_ms']:.0f} ms in fsync (avg {avg:.1f} ms)"
+    )
+
+
+def stream_write_excel(path: Path, sheets: List[Tuple[str, List[str], Iterable[Iterable[Any]]]]) -> None:
+    """
+    Write ``(sheet_name, columns, rows)`` sheets with openpyxl's write-only
+    workbook, which spools rows to disk as they are appended, so memory stays
+    flat however many rows the iterators produce. Same temp-file-and-rename
+    atomicity and oversize-cell truncation as atomic_write_excel.
+    """
+    from openpyxl import Workbook
+
+    tmp_fd, tmp_path = tempfile.mkstemp(suffix=".xlsx", dir=str(path.parent))
+    os.close(tmp_fd)
+    try:
+        wb = Workbook(write_only=True)
+        for name, columns, rows in sheets:
+            ws = wb.create_sheet(title=name)
+            ws.append(list(columns))
+            for row in rows:
+                ws.append([excel_cell(v) for v in row])
+        wb.save(tmp_path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    shutil.move(tmp_path, path)  # atomic on same filesystem
+
+
+# ---------- Results journal ----------
+class ResultsJournal:
+    """
+    Append-only JSONL journal of run results. One line per event:
+
+        {"seq": 1, "ts": ..., "kind": "school",    "id": "42", "name": "..."}
+        {"seq": 2, "ts": ..., "kind": "contact",   "id": "42", "contact": {...}}
+        {"seq": 3, "ts": ..., "kind": "unmatched", "id": "43", "name": "..."}
+
+    Appends are synced according to the durability policy (see
+    DurableAppender; the default fsyncs every append). A torn final line
+    (crash mid-write) is ignored on replay and truncated before appending.
+    """
+
+    def __init__(self, path: Path, policy: str = DURABILITY):
+        self.path = path
+        self._out = DurableAppender(path, policy=policy)
+        self._seq = 0
+        if path.exists():
+            self._truncate_torn_tail()
+            for rec in self.replay():
+                self._seq = max(self._seq, int(rec.get("seq", 0)))
+
+    def _truncate_torn_tail(self) -> None:
+        """Drop a partial last line so new appends start on a clean line."""
+        with open(self.path, "rb+") as fh:
+            size = pos = fh.seek(0, os.SEEK_END)
+            end = 0
+            while pos > 0:
+                step = min(64 * 1024, pos)
+                fh.seek(pos - step)
+                nl = fh.read(step).rfind(b"\n")
+                if nl != -1:
+                    end = pos - step + nl + 1
+                    break
+                pos -= step
+            if end != size:
+                fh.truncate(end)
+
+    def replay(self) -> Iterator[Dict[str, Any]]:
+        """Yield every complete record in write order."""
+        if not self.path.exists():
+            return
+        with open(self.path, encoding="utf-8") as fh:
+            for line in fh:
+                if not line.endswith("\n"):
+                    break  # torn tail from an interrupted write
+                try:
+                    yield json.loads(line)
+                except json.JSONDecodeError:
+                    continue
+
+    def append(self, kind: str, **fields: Any) -> Dict[str, Any]:
+        return self.append_many([(kind, fields)])[0]
+
+    def append_many(self, events: List[Tuple[str, Dict[str, Any]]]) -> List[Dict[str, Any]]:
+        """Append several (kind, fields) events as one commit (a single fsync under ``fsync``)."""
+        records = []
+        for kind, fields in events:
+            self._seq += 1
+            records.append({"seq": self._seq, "ts": _time.time(), "kind": kind, **fields})
+        self._out.write_lines([json.dumps(r, ensure_ascii=False) for r in records])
+        return records
+
+    @property
+    def last_seq(self) -> int:
+        return self._seq
+
+    @property
+    def stats(self) -> Dict[str, Any]:
+        return self._out.stats
+
+    def close(self) -> None:
+        self._out.close()
+
+    def wipe(self) -> None:
+        self.close()
+        self.path.unlink(missing_ok=True)
+        self._seq = 0
+
+
+def canonical_profile_url(url: str | None) -> str | None:
+    """
+    Normalize a LinkedIn profile URL for matching: https, www host, no query
+    or fragment, lower-case path with one trailing slash.
+    """
+    if not url or not str(url).strip():
+        return None
+    parts = urlsplit(str(url).strip())
+    host = (parts.netloc or "").lower()
+    if host == "linkedin.com" or host.endswith(".linkedin.com"):
+        host = "www.linkedin.com"
+    path = parts.path.rstrip("/").lower()
+    return f"https://{host}{path}/"
+
+
+def school_slug(name: str) -> str:
+    return "".join(c.lower() if c.isalnum() else "-" for c in name).strip("-")
+
+
+def export_run_files(journal: ResultsJournal, run_dir: Path, since_seq: int = 0) -> int:
+    """
+    Rebuild the per-school ``<run_dir>/<school-slug>.jsonl`` views by replaying
+    the journal. Only schools that received contacts after ``since_seq`` are
+    rewritten (each atomically); every line is a contact plus its
+    ``captured_at`` journal timestamp. Returns the number of files written.
+    """
+    names: Dict[str, str] = {}
+    touched: set[str] = set()
+    for rec in journal.replay():
+        sid = str(rec.get("id"))
+        if rec.get("kind") in ("school", "unmatched") and rec.get("name"):
+            names[sid] = rec["name"]
+        elif rec.get("kind") == "contact" and int(rec.get("seq", 0)) > since_seq:
+            touched.add(sid)
+    if not touched:
+        return 0
+
+    lines: Dict[str, List[str]] = {sid: [] for sid in touched}
+    for rec in journal.replay():
+        sid = str(rec.get("id"))
+        if rec.get("kind") == "contact" and sid in lines:
+            row = {**(rec.get("contact") or {}), "captured_at": rec.get("ts")}
+            lines[sid].append(json.dumps(row, ensure_ascii=False))
+
+    run_dir.mkdir(parents=True, exist_ok=True)
+    for sid, rows in lines.items():
+        path = run_dir / f"{school_slug(names.get(sid, sid))}.jsonl"
+        tmp = path.with_suffix(".jsonl.tmp")
+        tmp.write_text("".join(r + "\n" for r in rows), encoding="utf-8")
+        os.replace(tmp, path)
+    return len(lines)
+
+
+def journal_path_for(output_path: Path) -> Path:
+    """Journal that backs an output workbook, e.g. contacts.xlsx -> contacts.journal.jsonl."""
+    return output_path.with_suffix(".journal.jsonl")
+
+
+def seed_journal(journal: ResultsJournal, rows: List[Dict[str, Any]], unmatched_rows: List[Dict[str, Any]]) -> None:
+    """Import results from a pre-journal workbook so the journal is complete."""
+    for row in rows:
+        journal.append("school", id=str(row["id"]), name=row.get("name"))
+        for contact in row.get("contacts") or []:
+            journal.append("contact", id=str(row["id"]), contact=contact)
+    for row in unmatched_rows:
+        journal.append("unmatched", id=str(row["id"]), name=row.get("name"))
+
+
+# ---------- SQLite results store ----------
+
+class ResultsStore:
+    """
+    Indexed SQLite view of the results journal.
+
+    Journal records are applied in ``seq`` order and the last applied seq is
+    kept in ``meta``, so the store can always be caught up (or rebuilt from
+    scratch) by replaying the journal. Because the journal is the durable copy,
+    the store runs with ``synchronous=NORMAL``. Contacts are stored and
+    deduplicated per school on their canonical profile URL.
+    """
+
+    # Bumped when applying the journal changes; an older store is rebuilt on open
+    # (2: contacts keyed on the canonical profile URL)
+    STORE_VERSION = "2"
+    SCHEMA = f"""
+    CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+    CREATE TABLE IF NOT EXISTS schools (
+        id TEXT PRIMARY KEY,
+        name TEXT,
+        matched INTEGER NOT NULL DEFAULT 0,
+        unmatched INTEGER NOT NULL DEFAULT 0,
+        seq INTEGER NOT NULL
+    );
+    CREATE TABLE IF NOT EXISTS contacts (
+        seq INTEGER PRIMARY KEY,
+        school_id TEXT NOT NULL,
+        {", ".join(f"{f} TEXT" for f in CONTACT_FIELDS)},
+        UNIQUE (school_id, linkedin_url)
+    );
+    CREATE INDEX IF NOT EXISTS ix_contacts_school ON contacts (school_id);
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        # Shared between the scraping loop (lookups) and the writer thread.
+        self._lock = threading.RLock()
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(self.SCHEMA)
+        row = self.conn.execute("SELECT value FROM meta WHERE key='store_version'").fetchone()
+        if row is None or row[0] != self.STORE_VERSION:
+            self.reset()  # catch_up() rebuilds it from the journal
+        row = self.conn.execute("SELECT value FROM meta WHERE key='applied_seq'").fetchone()
+        self.applied_seq = int(row[0]) if row else 0
+
+    # --- applying journal records ---
+    def apply(self, record: Dict[str, Any]) -> None:
+        """Apply one journal record (idempotent for already-applied seqs)."""
+        self.apply_many([record])
+
+    def apply_many(self, records: List[Dict[str, Any]]) -> None:
+        """Apply journal records in one transaction."""
+        with self._lock, self.conn:
+            for record in records:
+                self._apply(record)
+            self.conn.execute(
+                "INSERT INTO meta (key, value) VALUES ('applied_seq', ?) "
+                "ON CONFLICT(key) DO UPDATE SET value=excluded.value",
+                (str(self.applied_seq),),
+            )
+
+    def _apply(self, record: Dict[str, Any]) -> None:
+        seq, kind, sid = int(record["seq"]), record.get("kind"), str(record.get("id"))
+        if seq <= self.applied_seq:
+            return
+        if kind in ("school", "unmatched"):
+            flag = "matched" if kind == "school" else "unmatched"
+            self.conn.execute(
+                f"INSERT INTO schools (id, name, {flag}, seq) VALUES (?, ?, 1, ?) "
+                f"ON CONFLICT(id) DO UPDATE SET {flag}=1, name=COALESCE(excluded.name, name)",
+                (sid, record.get("name"), seq),
+            )
+        elif kind == "contact":
+            contact = record.get("contact") or {}
+            contact = {**contact, "linkedin_url": canonical_profile_url(contact.get("linkedin_url"))}
+            self.conn.execute(
+                "INSERT INTO schools (id, name, matched, seq) VALUES (?, NULL, 1, ?) ON CONFLICT(id) DO NOTHING",
+                (sid, seq),
+            )
+            self.conn.execute(
+                f"INSERT INTO contacts (seq, school_id, {', '.join(CONTACT_FIELDS)}) "
+                f"VALUES (?, ?, {', '.join('?' * len(CONTACT_FIELDS))}) "
+                f"ON CONFLICT(school_id, linkedin_url) DO UPDATE SET "
+                + ", ".join(f"{f}=excluded.{f}" for f in CONTACT_FIELDS),
+                (seq, sid, *(contact.get(f) for f in CONTACT_FIELDS)),
+            )
+        self.applied_seq = seq
+
+    def catch_up(self, journal: ResultsJournal) -> int:
+        """Apply every journal record newer than the store. Returns how many were applied."""
+        if journal.last_seq < self.applied_seq:
+            # The journal lost an unsynced tail (relaxed durability + OS crash)
+            # that the store had already seen: rebuild from the journal.
+            self.reset()
+        start, batch, applied = self.applied_seq, [], 0
+        for rec in journal.replay():
+            if int(rec.get("seq", 0)) > start:
+                batch.append(rec)
+                if len(batch) >= 1000:
+                    self.apply_many(batch)
+                    applied, batch = applied + len(batch), []
+        if batch:
+            self.apply_many(batch)
+        return applied + len(batch)
+
+    def reset(self) -> None:
+        with self._lock, self.conn:
+            self.conn.execute("DELETE FROM contacts")
+            self.conn.execute("DELETE FROM schools")
+            self.conn.execute("DELETE FROM meta")
+            self.conn.execute("INSERT INTO meta (key, value) VALUES ('store_version', ?)", (self.STORE_VERSION,))
+            self.applied_seq = 0
+
+    # --- indexed queries ---
+    def school_status(self, school_id: str) -> str | None:
+        """'matched', 'unmatched' or None if the school was never processed."""
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT matched, unmatched FROM schools WHERE id = ?", (str(school_id),)
+            ).fetchone()
+            if row is None:
+                return None
+            return "matched" if row[0] else "unmatched"
+
+    def contacts_for(self, school_id: str) -> List[Dict[str, Any]]:
+        with self._lock:
+            cur = self.conn.execute(
+                f"SELECT {', '.join(CONTACT_FIELDS)} FROM contacts WHERE school_id = ? ORDER BY seq",
+                (str(school_id),),
+            )
+            return [dict(zip(CONTACT_FIELDS, r)) for r in cur]
+
+    def unmatched_frame(self) -> pd.DataFrame:
+        with self._lock:
+            return pd.read_sql_query(
+                "SELECT id, name FROM schools WHERE unmatched = 1 ORDER BY seq", self.conn
+            )
+
+    @contextmanager
+    def snapshot(self) -> Iterator[sqlite3.Connection]:
+        """
+        Separate read connection inside one read transaction: a consistent
+        view that can be streamed without holding the writer's lock.
+        """
+        conn = sqlite3.connect(str(self.path))
+        try:
+            conn.execute("BEGIN")
+            yield conn
+        finally:
+            conn.close()
+
+    def export_excel(self, path: Path) -> None:
+        """Stream the schools and contacts sheets straight from store cursors."""
+        with self.snapshot() as conn:
+            schools = conn.execute("SELECT id, name FROM schools WHERE matched = 1 ORDER BY seq")
+            contacts = conn.execute(
+                f"SELECT c.school_id, {', '.join('c.' + f for f in CONTACT_FIELDS)} "
+                "FROM contacts c JOIN schools s ON s.id = c.school_id "
+                "WHERE s.matched = 1 ORDER BY c.seq"
+            )
+            stream_write_excel(path, [
+                (SCHOOLS_SHEET, ["id", "name"], schools),
+                (CONTACTS_SHEET, ["school_id", *CONTACT_FIELDS], contacts),
+            ])
+
+    def close(self) -> None:
+        self.conn.close()
+
 
+def store_path_for(output_path: Path) -> Path:
+    """Results store that backs an output workbook, e.g. contacts.xlsx -> contacts.sqlite."""
+    return output_path.with_suffix(".sqlite")
 
-def merge_fragments(tmp_path: Path) -> List[Dict[str, Any]]:
-    if not tmp_path.exists():
-        return []
-    with open(tmp_path, encoding="utf-8") as fh:
-        return [json.loads(line) for line in fh]
 
+# ---------- Parquet dataset output ----------
+def _require_pyarrow():
+    try:
+        import pyarrow as pa
+        import pyarrow.dataset as ds
+    except ImportError as e:
+        raise RuntimeError("Parquet output requires pyarrow (pip install pyarrow)") from e
+    return pa, ds
+
+
+def _school_partitioning():
+    pa, ds = _require_pyarrow()
+    return ds.partitioning(pa.schema([("school_id", pa.string())]), flavor="hive")
+
+
+class ParquetResultsDataset:
+    """
+    Columnar copy of the results store as an Arrow/Parquet dataset:
+
+        <root>/schools/part-<seq>-<uuid>-<n>.parquet        (appended)
+        <root>/contacts/school_id=<id>/part-0.parquet       (one partition per school)
+
+    Journal records are noted with ``mark`` and written by ``flush``: new
+    schools are appended as a new part file and each touched school's contact
+    partition is rewritten from the store, so de-duplicated contacts stay
+    exact without ever rewriting other schools.
+    """
+
+    def __init__(self, root: Path, store: ResultsStore):
+        self.pa, self.ds = _require_pyarrow()
+        self.root = root
+        self.store = store
+        self._new_schools: Dict[str, Dict[str, Any]] = {}
+        self._dirty: set[str] = set()
+        self._pending_seq = 0
+        (root / "schools").mkdir(parents=True, exist_ok=True)
+        (root / "contacts").mkdir(parents=True, exist_ok=True)
+        seq_file = root / "_flushed_seq"
+        self.flushed_seq = int(seq_file.read_text()) if seq_file.exists() else 0
+
+    def catch_up(self, journal: ResultsJournal) -> None:
+        """Re-mark journal records that were never flushed (e.g. after a crash) and flush them."""
+        if journal.last_seq < self.flushed_seq:
+            self.flushed_seq = 0  # journal lost its tail; re-flush everything
+        for rec in journal.replay():
+            if int(rec.get("seq", 0)) > self.flushed_seq:
+                self.mark(rec)
+        self.flush()
+
+    def mark(self, record: Dict[str, Any]) -> None:
+        self._pending_seq = max(self._pending_seq, int(record.get("seq", 0)))
+        kind, sid = record.get("kind"), str(record.get("id"))
+        if kind in ("school", "unmatched"):
+            status = "matched" if kind == "school" else "unmatched"
+            self._new_schools[sid] = {"id": sid, "name": record.get("name"), "status": status}
+        elif kind == "contact":
+            self._dirty.add(sid)
+
+    def flush(self) -> None:
+        if self._new_schools:
+            table = self.pa.Table.from_pylist(
+                list(self._new_schools.values()),
+                schema=self.pa.schema([("id", self.pa.string()), ("name", self.pa.string()), ("status", self.pa.string())]),
+            )
+            self.ds.write_dataset(
+                table, self.root / "schools", format="parquet",
+                # Unique per flush (two flushes can share a millisecond); the seq keeps parts in journal order
+                basename_template=f"part-{self._pending_seq:012d}-{uuid.uuid4().hex[:12]}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            self._new_schools.clear()
+        if self._dirty:
+            schema = self.pa.schema(
+                [("school_id", self.pa.string())] + [(f, self.pa.string()) for f in CONTACT_FIELDS]
+            )
+            rows = [
+                {"school_id": sid, **c}
+                for sid in sorted(self._dirty)
+                for c in self.store.contacts_for(sid)
+            ]
+            self.ds.write_dataset(
+                self.pa.Table.from_pylist(rows, schema=schema), self.root / "contacts", format="parquet",
+                partitioning=_school_partitioning(),
+                basename_template="part-{i}.parquet",
+                existing_data_behavior="delete_matching",
+            )
+            self._dirty.clear()
+        if self._pending_seq > self.flushed_seq:
+            self.flushed_seq = self._pending_seq
+            tmp = self.root / "_flushed_seq.tmp"
+            tmp.write_text(str(self.flushed_seq))
+            os.replace(tmp, self.root / "_flushed_seq")
+
+
+def read_results_dataset(
+    root: Path,
+    table: str = "contacts",
+    columns: List[str] | None = None,
+    school_id: str | None = None,
+) -> pd.DataFrame:
+    """
+    Read the schools or contacts table of a results dataset. Only the
+    requested ``columns`` are decoded, and ``school_id`` is pushed down so
+    other schools' partitions are never opened, e.g.
+
+        read_results_dataset(root, columns=["email", "title"], school_id="42")
+    """
+    _, ds = _require_pyarrow()
+    if table == "contacts":
+        dataset = ds.dataset(root / "contacts", format="parquet", partitioning=_school_partitioning())
+        key = "school_id"
+    else:
+        dataset = ds.dataset(root / "schools", format="parquet")
+        key = "id"
+    flt = (ds.field(key) == str(school_id)) if school_id is not None else None
+    df = dataset.to_table(columns=columns, filter=flt).to_pandas()
+    if table == "schools" and columns is None:
+        df = df.drop_duplicates(subset="id", keep="last").reset_index(drop=True)
+    return df
+
+
+# ---------- Background results writer ----------
+class ResultsWriter:
+    """
+    Writer stage that takes result persistence off the scraping thread.
+
+    ``submit`` puts an event on a bounded queue and returns immediately (it
+    only blocks when the queue is full). A daemon thread drains whatever has
+    queued up, journals the whole burst with one fsync, applies it to the
+    store in one transaction and hands it to ``on_records``. ``checkpoint``
+    runs on the same thread every ``checkpoint_every`` contacts, whenever an
+    unmatched school arrives, on ``request_checkpoint`` and on ``close``.
+
+    Events reach the journal in submit order, and the store and exports are
+    only touched after the journal fsync, so the journal stays the durable
+    copy. ``close`` (call it from a ``finally``) drains the queue first.
+    """
+
+    _CHECKPOINT = object()
+    _STOP = object()
+
+    def __init__(
+        self,
+        journal: ResultsJournal,
+        store: ResultsStore,
+        checkpoint: Callable[[], None],
+        checkpoint_every: int = 50,
+        on_records: Callable[[List[Dict[str, Any]]], None] | None = None,
+        max_queue: int = 1000,
+        max_batch: int = 500,
+    ):
+        self.journal = journal
+        self.store = store
+        self._checkpoint = checkpoint
+        self._on_records = on_records
+        self.checkpoint_every = checkpoint_every
+        self.max_batch = max_batch
+        self._queue: "queue.Queue[Any]" = queue.Queue(maxsize=max_queue)
+        self._since_checkpoint = 0
+        self._error: BaseException | None = None
+        self._closed = False
+        self._thread = threading.Thread(target=self._run, name="results-writer", daemon=True)
+        self._thread.start()
+
+    def submit(self, kind: str, **fields: Any) -> None:
+        self._raise_if_failed()
+        self._queue.put((kind, fields))
+
+    def request_checkpoint(self) -> None:
+        self._raise_if_failed()
+        self._queue.put(self._CHECKPOINT)
+
+    def flush(self) -> None:
+        """Block until everything submitted so far has been written."""
+        self._queue.join()
+        self._raise_if_failed()
+
+    def close(self) -> None:
+        """Drain the queue, write a final checkpoint and stop the thread."""
+        if self._closed:
+            return
+        self._closed = True
+        self._queue.put(self._CHECKPOINT)
+        self._queue.put(self._STOP)
+        self._thread.join()
+        self.journal.close()
+        self._raise_if_failed()
+
+    def _raise_if_failed(self) -> None:
+        if self._error is not None:
+            raise RuntimeError("Results writer failed") from self._error
+
+    def _run(self) -> None:
+        stop = False
+        while not stop:
+            items = [self._queue.get()]
+            while len(items) < self.max_batch:
+                try:
+                    items.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+            try:
+                if self._error is None:
+                    stop = self._write(items)
+                else:
+                    stop = any(i is self._STOP for i in items)
+            except BaseException as e:  # surfaced to the scraping thread on its next call
+                self._error = e
+                stop = any(i is self._STOP for i in items)
+            finally:
+                for _ in items:
+                    self._queue.task_done()
 
-def wipe_fragments(tmp_path: Path) -> None:
-    tmp_path.unlink(missing_ok=True)
\ No newline at end of file
+    def _write(self, items: List[Any]) -> bool:
+        events = [i for i in items if isinstance(i, tuple)]
+        want_checkpoint = any(i is self._CHECKPOINT for i in items)
+        if events:
+            records = self.journal.append_many(events)
+            self.store.apply_many(records)
+            if self._on_records is not None:
+                self._on_records(records)
+            self._since_checkpoint += sum(1 for r in records if r["kind"] == "contact")
+            want_checkpoint = want_checkpoint or any(r["kind"] == "unmatched" for r in records)
+        if want_checkpoint or self._since_checkpoint >= self.checkpoint_every:
+            self._checkpoint()
+            self._since_checkpoint = 0
+        return any(i is self._STOP for i in items)
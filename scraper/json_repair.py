@@ -0,0 +1,114 @@
+"""
+Local repair of near-valid JSON replies from the LLM.
+
+Handles the usual ways a reply misses strict JSON:
+- prose or Markdown fences around the object;
+- single-quoted strings, unquoted keys and Python literals (None/True/False);
+- trailing commas and raw newlines inside strings;
+- output cut off mid-object (open strings, keys without values, unclosed
+  brackets).
+
+Only the first top-level object is kept.
+"""
+from __future__ import annotations
+import json
+from typing import Any, List
+
+LITERALS = {
+    "null": "null", "None": "null",
+    "true": "true", "True": "true",
+    "false": "false", "False": "false",
+}
+NUMBER_CHARS = set("0123456789.eE+-")
+
+
+def _read_string(s: str, i: int) -> tuple[str, int]:
+    """Read the string opened by the quote at ``s[i]``; returns (JSON string token, next index)."""
+    quote, j, n = s[i], i + 1, len(s)
+    buf: List[str] = []
+    while j < n and s[j] != quote:
+        ch = s[j]
+        if ch == "\\" and j + 1 < n:
+            # \' is not a JSON escape
+            buf.append("'" if s[j + 1] == "'" else s[j:j + 2])
+            j += 2
+            continue
+        if ch == '"':
+            buf.append('\\"')  # only reachable inside a single-quoted string
+        elif ch == "\n":
+            buf.append("\\n")
+        elif ch == "\t":
+            buf.append("\\t")
+        else:
+            buf.append(ch)
+        j += 1
+    # An unterminated string (truncated output) is closed here
+    return '"' + "".join(buf) + '"', j + 1
+
+
+def _drop_trailing_comma(tokens: List[str]) -> None:
+    if tokens and tokens[-1] == ",":
+        tokens.pop()
+
+
+def normalize(text: str) -> str:
+    """Rewrite the first ``{...}`` in ``text`` as strict JSON, as far as it can be guessed."""
+    start = text.find("{")
+    if start == -1:
+        raise ValueError("no JSON object in reply")
+    s, i = text, start
+    tokens: List[str] = []
+    stack: List[str] = []
+    while i < len(s):
+        ch = s[i]
+        if ch in "\"'":
+            tok, i = _read_string(s, i)
+            tokens.append(tok)
+            continue
+        if ch in "{[":
+            stack.append("}" if ch == "{" else "]")
+            tokens.append(ch)
+        elif ch in "}]":
+            _drop_trailing_comma(tokens)
+            if stack:
+                stack.pop()
+            tokens.append(ch)
+            if not stack:
+                break  # end of the first top-level object
+        elif ch in ",:":
+            tokens.append(ch)
+        elif ch.isdigit() or ch == "-":
+            j = i
+            while j < len(s) and s[j] in NUMBER_CHARS:
+                j += 1
+            tokens.append(s[i:j])
+            i = j
+            continue
+        elif ch.isalpha() or ch == "_":
+            j = i
+            while j < len(s) and (s[j].isalnum() or s[j] in "_-"):
+                j += 1
+            word = s[i:j]
+            # Bare words are literals, or unquoted keys
+            tokens.append(LITERALS.get(word, json.dumps(word)))
+            i = j
+            continue
+        # whitespace and stray characters are dropped
+        i += 1
+
+    if stack:
+        # Truncated: finish the pending member, then close what is open
+        if tokens and tokens[-1] == ":":
+            tokens.append("null")
+        _drop_trailing_comma(tokens)
+        if stack[-1] == "}" and len(tokens) >= 2 and tokens[-1].startswith('"') and tokens[-2] in "{,":
+            tokens.append(":null")  # a key without its value
+        while stack:
+            _drop_trailing_comma(tokens)
+            tokens.append(stack.pop())
+    return "".join(tokens)
+
+
+def repair_json(text: str) -> Any:
+    """Parse ``text`` leniently. Raises ValueError when it cannot be made into JSON."""
+    return json.loads(normalize(text))
@@ -32,7 +32,6 @@ import time
 import os
 import sys
 import tempfile
-import uuid
 import socket
 import traceback
 from rapidfuzz import fuzz
@@ -145,11 +144,18 @@ from .config import (
     CHROME_BINARY_PATH, CHROME_USER_DATA_DIR, CHROME_PROFILE_DIRECTORY, CHROME_DEBUG_PORT, FORCE_CLOSE_CHROME,
     PROXY, USE_DATA_IMPULSE, DI_USERNAME, DI_PASSWORD, DI_HOST, DI_PORT,
     GEO_ENFORCE, DI_COUNTRY, TZ_TOLERANCE_HOURS, DI_STICKY_SESSION, WARM_UP_MODE,
+    EXTRACTION_MODE,
+    EXTRACTION_CASCADE,
+    EXTRACTION_BACKEND,
+    CAPTURE_ENABLED, CAPTURE_PATH,
 )
 from .linkedin_selectors import Selectors as S
-from .prompts import TEMPLATE
-from .models import Contact
-from openai_api_call import OpenAIIntegration
+from .extraction import ContactExtractor, default_cache, empty_contact
+from .batch import BatchRecorder, DEAD_LETTER_FILE
+from .usage import UsageMeter
+from .backends import make_backend
+from .captures import CaptureStore, profile_text
+from openai_api_call import ModelCascade
 from .driver_manager import ensure_cft_bundle
 from .cookie_bridge import (
     load_cached_cookies,
@@ -157,7 +163,7 @@ from .cookie_bridge import (
     load_linkedin_cookies_from_chrome,
     inject_cookies,
 )
-from .io_utils import get_local_timezone_offset_hours, choose_country_for_timezone
+from .io_utils import get_local_timezone_offset_hours, choose_country_for_timezone, DurableAppender
 
 def _build_realistic_user_agent() -> str:
     try:
@@ -180,6 +186,10 @@ class NoGoodMatchFound(Exception):
 
 class LinkedInScraper:
     def __init__(self, headless: bool = HEADLESS, skip_warmup: bool = False):
+        # Long-lived handles for the event log
+        self._event_log: DurableAppender | None = None
+        self._latest_fh = None
+
         # Set up comprehensive Chrome output suppression early
         self._setup_chrome_output_suppression()
         
@@ -201,7 +211,20 @@ class LinkedInScraper:
         # Counter for periodic proxy verification
         self._profiles_processed = 0
         self._proxy_check_interval = 20  # Check every 20 profiles
-        self.openai = OpenAIIntegration()
+        self.backend = make_backend(EXTRACTION_BACKEND)
+        self.usage = UsageMeter()
+        self.backend.on_usage = self.usage.record
+        # In batch mode uncached prompts are deferred to `python -m scraper.batch`
+        self.extractor = ContactExtractor(
+            self.backend,
+            model=self.backend.model,
+            cache=default_cache(),
+            batch=BatchRecorder() if EXTRACTION_MODE == "batch" else None,
+            dead_letter=BatchRecorder(filename=DEAD_LETTER_FILE),
+            # Cascade tiers are OpenAI models
+            cascade=ModelCascade.parse(EXTRACTION_CASCADE) if EXTRACTION_BACKEND == "openai" else None,
+        )
+        self.captures = CaptureStore(CAPTURE_PATH) if CAPTURE_ENABLED else None
 
     def _warm_up_profile(self):
         """
@@ -340,18 +363,23 @@ class LinkedInScraper:
     def _log_event(self, event_type: str, data: dict) -> None:
         try:
             logs_dir = CACHE_DIR / "logs"
-            logs_dir.mkdir(parents=True, exist_ok=True)
+            if self._event_log is None:
+                logs_dir.mkdir(parents=True, exist_ok=True)
+                # Diagnostics only: flushed to the OS per record, never fsynced
+                self._event_log = DurableAppender(logs_dir / "unified_log.jsonl", policy="os")
+                self._latest_fh = open(logs_dir / "latest.json", "w", encoding="utf-8")
             record = {
                 "ts": int(time.time()),
                 "event": event_type,
                 **(data or {}),
             }
             # Append to unified log file
-            with open(logs_dir / "unified_log.jsonl", "a", encoding="utf-8") as fh:
-                fh.write(json.dumps(record, ensure_ascii=False) + "\n")
-            # Also write a rolling latest.json for quick inspection
-            with open(logs_dir / "latest.json", "w", encoding="utf-8") as fh2:
-                json.dump(record, fh2, ensure_ascii=False)
+            self._event_log.write_json(record)
+            # Also keep a rolling latest.json for quick inspection
+            self._latest_fh.seek(0)
+            self._latest_fh.truncate()
+            json.dump(record, self._latest_fh, ensure_ascii=False)
+            self._latest_fh.flush()
         except Exception:
             pass
 
@@ -399,6 +427,12 @@ class LinkedInScraper:
             snapshot = {}
         return snapshot
 
+    def log_usage(self, scope: str, meta: dict | None = None) -> dict:
+        """Close a usage scope ("profile", "school" or "run") and log it as a <scope>_usage event."""
+        usage = self.usage.run_summary() if scope == "run" else self.usage.end(scope)
+        self._log_event(f"{scope}_usage", {**(meta or {}), **usage})
+        return usage
+
     def log_network_snapshot(self, meta: dict | None = None) -> None:
         snap = self.get_network_snapshot()
         merged = {**(meta or {}), **(snap or {})}
@@ -2780,7 +2814,7 @@ class LinkedInScraper:
         print(f"✅ Finished harvesting this page")
     
     def _extract_profile_current_tab(self, school_name: str, href: str) -> Dict[str, Any]:
-        """Assumes we're already on a profile tab. Extracts text, opens contact modal, calls OpenAI, persists."""
+        """Assumes we're already on a profile tab. Extracts text, opens contact modal, calls OpenAI."""
         # Start timer for total profile time
         profile_start_time = time.time()
         
@@ -2910,41 +2944,42 @@ class LinkedInScraper:
         except Exception as e:
             print(f"    (no or skipped contact modal) {repr(e)}")
 
-        # 3) Send to OpenAI
-        combined_text = (main_text or "") + "\n" + (contact_text or "")
-        prompt = TEMPLATE.format_map({"school_name": school_name, "text": combined_text})
+        # 3) Send to OpenAI (served from the response cache when seen before)
+        combined_text = profile_text(main_text, contact_text)
 
         contact_modal_opened = bool(contact_text)
+        self.usage.begin("profile")
         try:
-            ai_json_str = self.openai.fetch_response(prompt, model="gpt-4o-mini")
-            ai_dict = json.loads(ai_json_str)
-            contact = Contact.model_validate(ai_dict).model_dump(mode="json")
+            contact = self.extractor.extract(school_name, combined_text, href)
         except Exception as e:
-            print(f"    ⚠️  OpenAI parse failed: {repr(e)}")
-            contact = {
-                "name": None,
-                "title": None,
-                "department": None,
-                "email": None,
-                "phone": None,
-                "linkedin_url": href,
-                "bio": None,
-            }
-
-        # 4) Always persist immediately to avoid data loss
-        try:
-            # Make sure the URL is present
-            contact.setdefault("linkedin_url", href)
-            self._persist_contact(school_name, contact)
-            # Log found keys and whether contact modal was opened
+            print(f"    ⚠️  OpenAI call failed: {repr(e)}")
+            contact = empty_contact(href)
+        usage = self.log_usage("profile", {"linkedin_url": href, "school": school_name})
+
+        # 4) Hand back to the caller, which journals it (the single durable write)
+        # Make sure the URL is present
+        contact.setdefault("linkedin_url", href)
+        # Keep the raw text so later prompt or model changes can be re-run without the browser
+        if self.captures is not None:
             try:
-                found_keys = [k for k, v in contact.items() if k not in ("linkedin_url",) and bool(v)]
-                self._log_event("profile_extracted", {"found_keys": found_keys, "contact_modal_opened": contact_modal_opened})
-            except Exception:
-                pass
-            print(f"    💾 Saved: {json.dumps(contact, ensure_ascii=False)}")
-        except Exception as e:
-            print(f"    ⚠️  Failed to persist: {repr(e)}")
+                self.captures.record(href, school_name, main_text, contact_text, contact_url=contact.get("linkedin_url"))
+            except Exception as e:
+                print(f"    ⚠️  Capture not stored: {repr(e)}")
+        # Log found keys and whether contact modal was opened
+        try:
+            found_keys = [k for k, v in contact.items() if k not in ("linkedin_url",) and bool(v)]
+            self._log_event("profile_extracted", {"found_keys": found_keys, "contact_modal_opened": contact_modal_opened, **self.extractor.last_meta})
+        except Exception:
+            pass
+        meta = self.extractor.last_meta
+        if "tokens_raw" in meta:
+            print(f"    ✂️  Profile text {meta['tokens_raw']} -> {meta['tokens_sent']} tokens")
+        if usage["calls"]:
+            print(
+                f"    💰 {usage['prompt_tokens']} prompt ({usage['cached_tokens']} cached, {usage['cached_share']:.0%}) + "
+                f"{usage['completion_tokens']} completion tokens, {usage['latency_ms']:.0f} ms, ${usage['cost_usd']:.5f}"
+            )
+        print(f"    🧾 Extracted: {json.dumps(contact, ensure_ascii=False)}")
 
         # Ensure minimum time spent on profile (people rarely leave in under 3 seconds)
         total_time_on_profile = time.time() - profile_start_time
@@ -2959,7 +2994,7 @@ class LinkedInScraper:
     def _process_profile(self, url: str, school_name: str) -> Dict[str, Any]:
         """
         Open profile in a new tab, scrape main text + contact modal, call OpenAI,
-        persist result to disk, close tab, and return to results.
+        close tab, and return to results.
         """
         parent = self.driver.current_window_handle
         profile_link_element = self.driver.find_element(By.XPATH, f"//a[@href='{url}']")
@@ -3028,16 +3063,12 @@ class LinkedInScraper:
                 contact_text = ""
 
                 combined_text = (main_text or "") + "\n" + (contact_text or "")
-                prompt = TEMPLATE.format_map({"school_name": school_name, "text": combined_text})
 
                 # Call OpenAI and validate output
-                ai_json_str = self.openai.fetch_response(prompt, model="gpt-4o-mini")
-                ai_dict = json.loads(ai_json_str)
-                contact = Contact.model_validate(ai_dict).model_dump(mode="json")
+                contact = self.extractor.extract(school_name, combined_text, url)
                 contact.setdefault("linkedin_url", url)
 
                 print(f"🧾 Extracted: {json.dumps(contact, ensure_ascii=False)}")
-                self._persist_contact(school_name, contact)
                 return contact
 
         finally:
@@ -3063,40 +3094,6 @@ class LinkedInScraper:
                 self.driver.switch_to.window(parent)
                 self._human_delay()
 
-    def _persist_contact(self, school_name: str, contact: Dict[str, Any]) -> None:
-        """Write each contact to disk right away to avoid data loss."""
-        try:
-            safe_school = re.sub(r'[^a-z0-9]+', '-', school_name.lower()).strip('-')
-            outdir = CACHE_DIR / "contacts_spool" / safe_school
-            outdir.mkdir(parents=True, exist_ok=True)
-
-            key = contact.get("linkedin_url") or contact.get("name") or str(uuid.uuid4())
-            key = re.sub(r'[^a-z0-9]+', '-', key.lower()).strip('-')[:80]
-
-            path = outdir / f"{int(time.time()*1000)}-{key}.json"
-            with open(path, "w", encoding="utf-8") as f:
-                json.dump(contact, f, ensure_ascii=False, indent=2)
-        except Exception as e:
-            print(f"⚠️  Failed to persist contact: {e}")
-
-    
-    def _school_slug(self, name: str) -> str:
-        return "".join(c.lower() if c.isalnum() else "-" for c in name).strip("-")
-
-    def _persist_contact(self, school_name: str, contact: dict) -> None:
-        """
-        Append one JSON object per line to a per-school file:
-        .cache/runs/<school-slug>.jsonl
-        """
-        try:
-            run_dir = (CACHE_DIR / "runs")
-            run_dir.mkdir(parents=True, exist_ok=True)
-            fpath = run_dir / f"{self._school_slug(school_name)}.jsonl"
-            with open(fpath, "a", encoding="utf-8") as fh:
-                fh.write(json.dumps(contact, ensure_ascii=False) + "\n")
-        except Exception as e:
-            print(f"⚠️ Failed to persist contact: {e}")
-
     def _collect_profile_links(self) -> List[str]:
         print("Collecting profile links")
         """
@@ -3209,7 +3206,22 @@ class LinkedInScraper:
             pass
 
     # ---------- teardown ----------
+    def durability_stats(self) -> dict[str, dict]:
+        """fsync counters of the scraper's own JSONL log (see DurableAppender)."""
+        stats = {}
+        if self._event_log is not None:
+            stats["event log"] = self._event_log.stats
+        return stats
+
     def close(self):
+        self.extractor.close()
+        self.backend.close()
+        if self.captures is not None:
+            self.captures.close()
+        if self._event_log is not None:
+            self._event_log.close()
+        if self._latest_fh is not None:
+            self._latest_fh.close()
         try:
             self.driver.quit()
         finally:
@@ -0,0 +1,141 @@
+"""
+Persistent, content-addressed cache of LLM extraction responses.
+
+Entries are keyed by a SHA-256 of (model, prompt template version, prompt
+text), so re-running or resuming over profiles that were already extracted
+costs no tokens and no API round trip. The SQLite file is bounded by size
+(least-recently-used entries are evicted first) and entries expire after a
+TTL.
+"""
+from __future__ import annotations
+import hashlib, sqlite3, threading, time
+from pathlib import Path
+from typing import Any, Dict
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS responses (
+    key TEXT PRIMARY KEY,
+    model TEXT,
+    response TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    created_at REAL NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS ix_responses_last_used ON responses (last_used);
+CREATE INDEX IF NOT EXISTS ix_responses_created_at ON responses (created_at);
+"""
+# Seconds between sweeps for expired entries (get() also drops an expired entry it finds)
+EXPIRE_INTERVAL_S = 300
+
+
+class ResponseCache:
+    def __init__(self, path: Path, max_bytes: int, ttl_seconds: float):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.ttl_seconds = ttl_seconds
+        self._lock = threading.Lock()
+        path.parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(path), check_same_thread=False)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript(SCHEMA)
+        self._entries, self._bytes = self.conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM responses"
+        ).fetchone()
+        self.counters = {"hits": 0, "misses": 0, "expired": 0, "evictions": 0}
+        with self._lock, self.conn:
+            self._expire_locked()
+
+    @staticmethod
+    def key(model: str, template_version: str, text: str) -> str:
+        h = hashlib.sha256()
+        for part in (model, template_version, text):
+            h.update(part.encode("utf-8"))
+            h.update(b"\0")
+        return h.hexdigest()
+
+    def get(self, key: str) -> str | None:
+        now = time.time()
+        with self._lock:
+            row = self.conn.execute(
+                "SELECT response, size, created_at FROM responses WHERE key = ?", (key,)
+            ).fetchone()
+            if row is None:
+                self.counters["misses"] += 1
+                return None
+            response, size, created_at = row
+            if now - created_at > self.ttl_seconds:
+                with self.conn:
+                    self.conn.execute("DELETE FROM responses WHERE key = ?", (key,))
+                self._entries -= 1
+                self._bytes -= size
+                self.counters["expired"] += 1
+                self.counters["misses"] += 1
+                return None
+            with self.conn:
+                self.conn.execute("UPDATE responses SET last_used = ? WHERE key = ?", (now, key))
+            self.counters["hits"] += 1
+            return response
+
+    def put(self, key: str, model: str, response: str) -> None:
+        size = len(response.encode("utf-8"))
+        now = time.time()
+        with self._lock, self.conn:
+            old = self.conn.execute("SELECT size FROM responses WHERE key = ?", (key,)).fetchone()
+            self.conn.execute(
+                "INSERT OR REPLACE INTO responses (key, model, response, size, created_at, last_used) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (key, model, response, size, now, now),
+            )
+            self._entries += 0 if old else 1
+            self._bytes += size - (old[0] if old else 0)
+            if now - self._expired_at >= EXPIRE_INTERVAL_S:
+                self._expire_locked()
+            self._evict_locked()
+
+    def _expire_locked(self) -> None:
+        """Drop every entry past its TTL (an index range scan on created_at)."""
+        self._expired_at = time.time()
+        cutoff = self._expired_at - self.ttl_seconds
+        freed, n = self.conn.execute(
+            "SELECT COALESCE(SUM(size), 0), COUNT(*) FROM responses WHERE created_at < ?", (cutoff,)
+        ).fetchone()
+        if n:
+            self.conn.execute("DELETE FROM responses WHERE created_at < ?", (cutoff,))
+            self._entries -= n
+            self._bytes -= freed
+            self.counters["expired"] += n
+
+    def _evict_locked(self) -> None:
+        # Least-recently-used entries go until under budget; expiry runs separately (see put)
+        while self._bytes > self.max_bytes:
+            victims = self.conn.execute(
+                "SELECT key, size FROM responses ORDER BY last_used LIMIT 64"
+            ).fetchall()
+            if not victims:
+                self._entries = self._bytes = 0
+                break
+            doomed = []
+            for k, size in victims:
+                doomed.append((k,))
+                self._bytes -= size
+                if self._bytes <= self.max_bytes:
+                    break
+            self.conn.executemany("DELETE FROM responses WHERE key = ?", doomed)
+            self._entries -= len(doomed)
+            self.counters["evictions"] += len(doomed)
+
+    def stats(self) -> Dict[str, Any]:
+        lookups = self.counters["hits"] + self.counters["misses"]
+        return {
+            **self.counters,
+            "entries": self._entries,
+            "bytes": self._bytes,
+            "hit_rate": self.counters["hits"] / lookups if lookups else 0.0,
+        }
+
+    def close(self) -> None:
+        with self._lock:
+            with self.conn:
+                self._expire_locked()
+            self.conn.close()
@@ -1,33 +1,44 @@
 from __future__ import annotations
-import argparse, sys
+import argparse, shutil, signal, sys
 from pathlib import Path
-import pandas as pd
 import traceback
 traceback.print_exc()
 
 # ⬇️  Excel-aware helpers
 from .io_utils import (
-    read_input,
+    iter_input,
     read_output,
     atomic_write_excel,
-    append_contact_fragment,
-    merge_fragments,
-    wipe_fragments,
+    ResultsJournal,
+    ResultsStore,
+    ParquetResultsDataset,
+    ResultsWriter,
+    export_run_files,
+    format_durability_stats,
+    journal_path_for,
+    store_path_for,
+    seed_journal,
     OUTPUT_DEFAULT,
 )
 from .linkedin_scraper import LinkedInScraper, NoGoodMatchFound
-from .config import MAX_PROFILES_PER_DAY
+from .config import CACHE_DIR, MAX_PROFILES_PER_DAY, CHECKPOINT_EVERY, DURABILITY, EXTRACTION_BACKEND
 
 
 def parse_args(argv=None):
     p = argparse.ArgumentParser(
         description="Extract LinkedIn contacts and store results in an Excel file."
     )
-    p.add_argument("--input", required=True, help="INPUT .xlsx with columns id,name")
+    p.add_argument("--input", required=True, help="INPUT .xlsx, .csv or .parquet with columns id,name")
     p.add_argument(
         "--output",
-        default=str(OUTPUT_DEFAULT),
-        help="OUTPUT .xlsx (appends unless --no-continue)",
+        default=None,
+        help="OUTPUT .xlsx, or dataset directory with --output-format parquet (appends unless --no-continue)",
+    )
+    p.add_argument(
+        "--output-format",
+        choices=["xlsx", "parquet"],
+        default="xlsx",
+        help="xlsx workbook (default) or a Parquet dataset partitioned by school",
     )
     p.add_argument(
         "--no-continue",
@@ -42,73 +53,46 @@ def parse_args(argv=None):
     return p.parse_args(argv)
 
 
-def main(argv=None):
-    args = parse_args(argv)
-    input_path = Path(args.input).expanduser().resolve()
-    output_path = Path(args.output).expanduser().resolve()
-    unmatched_output_path = output_path.parent / "unmatched_schools.xlsx"
-
-    df_in = read_input(input_path)
-
-    # handle --no-continue
-    if args.no_continue and output_path.exists():
-        if input("⚠️  --no-continue will erase existing output. Proceed? (y/N) ").lower() != "y":
-            sys.exit("Aborted.")
-        output_path.unlink()
-        # Also remove the unmatched file when starting over
-        if unmatched_output_path.exists():
-            unmatched_output_path.unlink()
-
-    df_out = read_output(output_path)
-    already_done = set(df_out["id"]) if df_out is not None else set()
-
-    unmatched_rows = []
-    # Also load previously unmatched schools to avoid re-running them
-    if unmatched_output_path.exists():
-        df_unmatched_prev = read_output(unmatched_output_path)
-        if df_unmatched_prev is not None and "id" in df_unmatched_prev.columns:
-            already_done.update(set(df_unmatched_prev["id"]))
-            unmatched_rows.extend(df_unmatched_prev.to_dict('records'))
-
-    scraper = LinkedInScraper(skip_warmup=args.skip_warmup)
-    scraper.login()
-
-    rows = []
+def run_schools(scraper, input_rows, store, writer):
+    """Scrape every pending input school, handing results to the writer stage."""
+    schools_in_output = 0
     consecutive_failures = 0
+    started = set()
 
-    for record in df_in.itertuples(index=False):
-        school_id, school_name = record.id, record.name
-        if school_id in already_done:
-            # FIX: Only try to append previous results if they exist in the successful output dataframe.
-            # This prevents an IndexError for schools that were previously "unmatched".
-            if df_out is not None and school_id in df_out["id"].values:
-                rows.append(df_out[df_out["id"] == school_id].iloc[0].to_dict())
+    for school_id, school_name in input_rows:
+        status = "matched" if school_id in started else store.school_status(school_id)
+        if status is not None:
+            # Previously "unmatched" schools are skipped but have no output row.
+            if status == "matched":
+                schools_in_output += 1
             continue
         
         print(f"➡️  Iteration start: {school_name} ({school_id})")
 
-        if len(rows) >= MAX_PROFILES_PER_DAY:
+        if schools_in_output >= MAX_PROFILES_PER_DAY:
             print(f"🏁 Daily limit of {MAX_PROFILES_PER_DAY} profiles reached. Exiting.")
             break
 
-        tmp_frag = output_path.parent / f"{school_id}.contacts.tmp"
-        wipe_fragments(tmp_frag)
-
         try:
             # Log start of school
             print(f"▶️  Starting: {school_name} ({school_id})")
+            scraper.usage.begin("school")
             scraper.search_school(school_name)
             
-            # Prepare a row for the current school.
-            # We'll append contacts to this row as they are scraped.
-            school_row = {"id": school_id, "name": school_name, "contacts": []}
-            rows.append(school_row)
+            # Register the school; contacts are recorded as they are scraped.
+            writer.submit("school", id=school_id, name=school_name)
+            started.add(school_id)
+            schools_in_output += 1
             
-            # Iteratively process contacts and save after each one
+            # Each contact becomes one journal record on the writer thread; the
+            # workbook is only rebuilt at checkpoints.
+            contacts = 0
             for contact in scraper.harvest_profiles(school_name):
-                school_row["contacts"].append(contact)
-                # Atomically write the entire updated dataframe to Excel
-                atomic_write_excel(pd.DataFrame(rows), output_path)
+                writer.submit("contact", id=school_id, contact=contact)
+                contacts += 1
+
+            writer.request_checkpoint()
+            scraper.log_usage("school", {"school_id": school_id, "school": school_name, "contacts": contacts})
 
             # Log snapshot after completing a school
             try:
@@ -121,15 +105,10 @@ def main(argv=None):
         # CATCH THE NEW EXCEPTION SEPARATELY
         except NoGoodMatchFound as e:
             print(f"🟡 Skipping school: {e}")
-            unmatched_rows.append({"id": school_id, "name": school_name})
-            
-            # Write to unmatched file immediately (real-time updates)
+            # The writer rewrites the unmatched file (and checkpoints) right away.
             print(f"📝 Adding '{school_name}' to unmatched schools file...")
-            unmatched_df = pd.DataFrame(unmatched_rows)
-            atomic_write_excel(unmatched_df, unmatched_output_path)
-            
-            # Also write the main output file
-            atomic_write_excel(pd.DataFrame(rows), output_path)
+            writer.submit("unmatched", id=school_id, name=school_name)
+            started.add(school_id)
             consecutive_failures = 0  # not counted as fatal failure
             continue # Move to the next school
 
@@ -148,20 +127,173 @@ def main(argv=None):
                 print("⛔ Detected 3 consecutive failures. Assuming temporary restriction. Exiting gracefully.")
                 break
             continue
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    input_path = Path(args.input).expanduser().resolve()
+    parquet = args.output_format == "parquet"
+    default_output = OUTPUT_DEFAULT.with_suffix("") if parquet else OUTPUT_DEFAULT
+    output_path = Path(args.output or default_output).expanduser().resolve()
+    unmatched_output_path = output_path.parent / "unmatched_schools.xlsx"
+
+    journal_path = journal_path_for(output_path)
+    store_path = store_path_for(output_path)
+
+    input_rows = iter_input(input_path)
+
+    # handle --no-continue
+    if args.no_continue and (output_path.exists() or journal_path.exists()):
+        if input("⚠️  --no-continue will erase existing output. Proceed? (y/N) ").lower() != "y":
+            sys.exit("Aborted.")
+        if output_path.is_dir():
+            shutil.rmtree(output_path)
+        else:
+            output_path.unlink(missing_ok=True)
+        journal_path.unlink(missing_ok=True)
+        for p in (store_path, Path(f"{store_path}-wal"), Path(f"{store_path}-shm")):
+            p.unlink(missing_ok=True)
+        # Also remove the unmatched file when starting over
+        if unmatched_output_path.exists():
+            unmatched_output_path.unlink()
+
+    # The journal is the only durable write per contact and the single source
+    # of truth. Everything else is a view rebuilt by replaying it: the SQLite
+    # store (indexed lookups), the workbooks or Parquet dataset exported from
+    # the store, and the per-school .cache/runs files.
+    journal = ResultsJournal(journal_path)
+    if not journal_path.exists():
+        # First run with a journal: import any results from an older workbook
+        df_out = read_output(output_path) if not parquet else None
+        prev_rows = df_out.to_dict("records") if df_out is not None else []
+        unmatched_prev = []
+        if unmatched_output_path.exists():
+            df_unmatched_prev = read_output(unmatched_output_path)
+            if df_unmatched_prev is not None and "id" in df_unmatched_prev.columns:
+                unmatched_prev.extend(df_unmatched_prev.to_dict('records'))
+        seed_journal(journal, prev_rows, unmatched_prev)
+    run_start_seq = journal.last_seq
+    store = ResultsStore(store_path)
+    store.catch_up(journal)
+    dataset = None
+    if parquet:
+        dataset = ParquetResultsDataset(output_path, store)
+        dataset.catch_up(journal)
+
+    unmatched_written = 0
+
+    def checkpoint():
+        # Runs on the writer thread, never on the browser loop.
+        nonlocal unmatched_written
+        if dataset is not None:
+            dataset.flush()
+        else:
+            store.export_excel(output_path)
+        unmatched_df = store.unmatched_frame()
+        if len(unmatched_df) != unmatched_written:
+            atomic_write_excel(unmatched_df, unmatched_output_path)
+            unmatched_written = len(unmatched_df)
+
+    writer = ResultsWriter(
+        journal,
+        store,
+        checkpoint,
+        checkpoint_every=CHECKPOINT_EVERY,
+        on_records=(lambda recs: [dataset.mark(r) for r in recs]) if dataset is not None else None,
+    )
+    # Turn SIGTERM into SystemExit so the finally-block below drains the writer.
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(128 + signum))
+
+    scraper = None
+    try:
+        scraper = LinkedInScraper(skip_warmup=args.skip_warmup)
+        scraper.login()
+        run_schools(scraper, input_rows, store, writer)
+    finally:
+        try:
+            if scraper is not None:
+                usage = scraper.log_usage("run")
+                scraper.close()
         finally:
-            wipe_fragments(tmp_frag)
-
-    scraper.close()
-    
-    # Final write of all successful rows
-    if rows:
-        atomic_write_excel(pd.DataFrame(rows), output_path)
-    
-    # WRITE THE UNMATCHED SCHOOLS FILE AT THE END
-    if unmatched_rows:
-        print(f"ℹ️  Writing {len(unmatched_rows)} unmatched schools to {unmatched_output_path}")
-        unmatched_df = pd.DataFrame(unmatched_rows)
-        atomic_write_excel(unmatched_df, unmatched_output_path)
+            writer.close()
+            # Per-school run files are a view of the journal, rebuilt for this run's schools
+            export_run_files(journal, CACHE_DIR / "runs", since_seq=run_start_seq)
+
+    print(f"💾 Durability policy: {DURABILITY}")
+    print("   " + format_durability_stats("journal", journal.stats))
+    if scraper is not None:
+        for label, stats in scraper.durability_stats().items():
+            print("   " + format_durability_stats(label, stats))
+        print(
+            f"💰 LLM usage: {usage['calls']} calls, {usage['prompt_tokens']} prompt "
+            f"({usage['cached_tokens']} cached, {usage['cached_share']:.0%}) + {usage['completion_tokens']} completion tokens, "
+            f"{usage['retries']} retries, ${usage['cost_usd']:.4f} total"
+        )
+        if usage["profiles"]:
+            print(
+                f"   per contact: {usage['tokens_per_profile']:.0f} tokens, ${usage['cost_per_profile_usd']:.5f}, "
+                f"{usage['latency_ms'] / max(1, usage['calls']):.0f} ms avg latency"
+            )
+        conn = scraper.backend.connection_stats()
+        dead = scraper.extractor.stats().get("dead_lettered", 0)
+        if conn:
+            print(
+                f"🔌 {EXTRACTION_BACKEND} HTTP: {conn['requests']} requests over {conn['connections']} connections "
+                f"({conn['reuse_rate']:.0%} reused), avg handshake {conn['avg_handshake_ms']:.0f} ms"
+            )
+            lat = conn["latency_ms"]
+            print(f"⏱️  LLM latency p50/p95/p99: {lat['p50']:.0f}/{lat['p95']:.0f}/{lat['p99']:.0f} ms per call")
+            if conn["hedges_sent"]:
+                hedged = conn["hedged_latency_ms"]
+                print(
+                    f"   with hedging: {hedged['p50']:.0f}/{hedged['p95']:.0f}/{hedged['p99']:.0f} ms; "
+                    f"{conn['hedges_sent']} hedges sent ({conn['hedge_rate']:.1%} of calls), {conn['hedges_won']} won"
+                )
+            print(
+                f"🚦 Rate limiter waited {conn['rate_limit_wait_s']:.0f} s, circuit opened {conn['circuit_trips']} times, "
+                f"{dead} requests dead-lettered" + (" (replay with `python -m scraper.batch submit`)" if dead else "")
+            )
+        pre = scraper.extractor.stats().get("preprocess")
+        if pre:
+            saved = pre["tokens_raw"] - pre["tokens_sent"]
+            print(
+                f"✂️  Preprocessing: {pre['tokens_raw']} -> {pre['tokens_sent']} profile-text tokens "
+                f"over {pre['profiles']} profiles ({saved / max(1, pre['tokens_raw']):.0%} saved)"
+            )
+        pre_x = scraper.extractor.stats().get("pre_extract")
+        if pre_x:
+            n = pre_x["profiles"]
+            rates = ", ".join(f"{f} {pre_x[f] / n:.0%}" for f in ("name", "email", "phone", "linkedin_url"))
+            print(
+                f"🔎 Pre-extraction hit rates: {rates}; {pre_x['narrowed']} narrowed prompts "
+                f"saved {pre_x['prompt_tokens_saved']} prompt tokens"
+            )
+        parse = scraper.extractor.stats().get("parse")
+        if parse:
+            total = sum(parse.values())
+            print(
+                f"🧩 LLM replies: {parse['valid']} valid, {parse['repaired']} repaired locally, "
+                f"{parse['failed']} failed ({parse['failed'] / total:.1%} failure rate)"
+            )
+        cascade = scraper.extractor.stats().get("cascade")
+        if cascade:
+            tiers = "; ".join(
+                f"{model} {t['calls']} calls, {t['escalation_rate']:.0%} escalated, {t['avg_latency_ms']:.0f} ms avg"
+                for model, t in cascade.items()
+            )
+            print(f"🪜 Model cascade: {tiers}")
+        cache = scraper.extractor.stats().get("cache")
+        if cache:
+            print(
+                f"🧠 LLM cache: {cache['hits']} hits / {cache['misses']} misses "
+                f"({cache['hit_rate']:.0%}), {cache['entries']} entries, "
+                f"{cache['bytes'] / 1e6:.1f} MB, {cache['evictions']} evicted, {cache['expired']} expired"
+            )
+
+    unmatched_df = store.unmatched_frame()
+    if len(unmatched_df):
+        print(f"ℹ️  {len(unmatched_df)} unmatched schools in {unmatched_output_path}")
+    store.close()
 
     print(f"✅  Finished. Results in {output_path}")
 
@@ -15,3 +15,15 @@ class Contact(BaseModel):
     @classmethod
     def empty_to_none(cls, v):
         return v or None
+
+
+class ContactDetails(BaseModel):
+    """The fields still asked of the LLM when the rest were pre-extracted."""
+    title: Optional[str] = None
+    department: Optional[str] = None
+    bio: Optional[str] = None
+
+    @field_validator("*", mode="before")
+    @classmethod
+    def empty_to_none(cls, v):
+        return v or None
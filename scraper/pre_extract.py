@@ -0,0 +1,95 @@
+"""
+Deterministic extraction of the contact fields that appear verbatim in the
+captured text, run before the LLM call.
+
+The contact modal lists the e-mail, phone and profile URL under fixed
+labels, and the name heads both the profile and the modal. When the name is
+found here, ContactExtractor only asks the LLM for ``title``,
+``department`` and ``bio`` (see DETAILS_TEMPLATE) and fills the rest from
+these matches. Matches override the LLM's reply, so only the labelled
+modal lines count: an address or profile link elsewhere in the text (a
+colleague in About, the school's info@ address, "People also viewed") may
+belong to someone else.
+
+Every field is a list of compiled patterns with one capture group, tried in
+order, so the same patterns run per profile (``pre_extract``) or vectorized
+over a column of stored texts (``pre_extract_frame``) for backfills.
+"""
+from __future__ import annotations
+import re
+from typing import Any, Dict, List
+
+PATTERNS: Dict[str, List[re.Pattern]] = {
+    "name": [
+        # Contact modal: "Jane Whitfield / Contact Info / Jane's Profile"
+        re.compile(r"^((\S+)[^\n]*)\n\s*Contact Info\s*\n\s*\2['’]s Profile\s*$", re.M),
+        # Profile header: the name is rendered twice (once for screen readers)
+        re.compile(r"\A\s*([^\n]+)\n\s*\1\s*$", re.M),
+    ],
+    "email": [
+        re.compile(r"^\s*Email\s*\n\s*(\S+@\S+\.[A-Za-z]{2,})\s*$", re.M | re.I),
+    ],
+    "phone": [
+        re.compile(r"^\s*Phone\s*\n\s*(\+?[\d(][\d\s().-]{5,}\d)", re.M | re.I),
+    ],
+    "linkedin_url": [
+        # Contact modal: "Jane's Profile / linkedin.com/in/jane-whitfield"
+        re.compile(r"^[^\n]*Profile\s*\n\s*(?:https?://)?(?:[a-z]{2,3}\.)?linkedin\.com/in/([A-Za-z0-9_%-]+)",
+                   re.M | re.I),
+    ],
+}
+# A name should be a few words of letters, not a headline or a location
+NAME_RE = re.compile(r"^[^\W\d_][^\W\d_'’.-]*(?:[ '’.-]+[^\W\d_]+){1,5}\.?$")
+FIELDS = tuple(PATTERNS)
+
+
+def _finish(field: str, value: str | None) -> str | None:
+    if value is None:
+        return None
+    value = value.strip()
+    if field == "name":
+        return value if NAME_RE.match(value) else None
+    if field == "email":
+        return value.rstrip(".").lower()
+    if field == "linkedin_url":
+        return f"https://www.linkedin.com/in/{value}/"
+    return value
+
+
+def pre_extract(text: str) -> Dict[str, Any]:
+    """Fields found in ``text``; missing fields are left out rather than set to None."""
+    found = {}
+    for field, patterns in PATTERNS.items():
+        for pattern in patterns:
+            m = pattern.search(text)
+            value = _finish(field, m.group(1)) if m else None
+            if value:
+                found[field] = value
+                break
+    return found
+
+
+def pre_extract_frame(texts):
+    """
+    Vectorized ``pre_extract`` over a pandas Series of texts: one column per
+    field, NaN where nothing matched.
+    """
+    import pandas as pd
+
+    out = pd.DataFrame(index=texts.index)
+    texts = texts.fillna("").astype(str)
+    for field, patterns in PATTERNS.items():
+        col = pd.Series(None, index=texts.index, dtype=object)
+        for pattern in patterns:
+            # Finish each pattern's matches before combining, so a match that
+            # fails validation falls through to the next pattern as in pre_extract
+            hits = texts.str.extract(pattern, expand=True)[0]
+            col = col.fillna(hits.map(lambda v, f=field: (_finish(f, v) or None) if isinstance(v, str) else None))
+        out[field] = col
+    return out
+
+
+def hit_rates(frame) -> Dict[str, float]:
+    """Share of rows where each field was found, for a ``pre_extract_frame`` result."""
+    n = len(frame)
+    return {field: float(frame[field].notna().sum()) / n if n else 0.0 for field in FIELDS}
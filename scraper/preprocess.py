@@ -0,0 +1,325 @@
+"""
+Shrinks captured profile text before it is rendered into the extraction
+prompt.
+
+The text of a profile's ``<main>`` element plus the contact modal carries
+navigation, "People also viewed" carousels, ads and the page footer.
+``clean_profile_text`` drops those blocks and UI labels, collapses
+whitespace, removes repeated lines (LinkedIn renders most entries twice,
+once for screen readers) and, when the result is still over the token
+budget, keeps whole sections in priority order: the profile header and
+contact info first, then experience, about, education and the rest.
+
+Check a corpus of captured profiles (``<name>.txt`` plus the expected
+contact in ``<name>.json``) with:
+
+    python -m scraper.preprocess bench scraper/tests/data/profiles
+    python -m scraper.preprocess bench scraper/tests/data/profiles --llm
+    python -m scraper.preprocess bench scraper/tests/data/profiles --pack 5
+
+``--pack`` extracts the corpus one profile per request and then packed
+(see ContactExtractor.extract_many) and reports tokens per contact and
+throughput for both; only profiles of the same school share a pack.
+"""
+from __future__ import annotations
+import argparse, json, re, time
+from functools import lru_cache
+from pathlib import Path
+from typing import Any, Dict, List, Tuple
+
+HEADER = "_header"
+# Lower is kept first when trimming to the budget
+SECTION_PRIORITY = {
+    HEADER: 0,
+    "contact info": 0,
+    "experience": 1,
+    "about": 2,
+    "education": 3,
+    "licenses & certifications": 5,
+    "volunteering": 5,
+    "organizations": 6,
+    "honors & awards": 6,
+    "languages": 6,
+    "skills": 7,
+    "recommendations": 7,
+    "publications": 7,
+    "projects": 7,
+    "courses": 8,
+}
+# Sections with nothing about the person themselves; dropped whole
+DROP_SECTIONS = {
+    "activity",
+    "interests",
+    "causes",
+    "featured",
+    "people also viewed",
+    "people you may know",
+    "more profiles for you",
+    "you might like",
+    "explore premium profiles",
+    "promoted",
+    "footer",
+}
+# Lines that open the page footer
+FOOTER_MARKERS = ("accessibility", "talent solutions", "community guidelines", "privacy & terms", "linkedin corporation ©")
+
+NOISE_LINES = re.compile(
+    r"^(?:"
+    r"(?:show|see) all\b.*|…?\s*see more|show less|show credential|endorse|endorsed by .*"
+    r"|message|follow|following|connect|pending|more|save to pdf|add profile section|resources"
+    r"|open to|enhance profile|visit my website"
+    r"|·?\s*(?:1st|2nd|3rd\+?)|(?:1st|2nd|3rd) degree connection"
+    r"|\d[\d,]*\+? (?:connections|followers)|status is (?:online|offline|reachable)"
+    r"|skip to (?:main )?content|home|my network|jobs|messaging|notifications|me|for business"
+    r"|(?:try|reactivate) premium.*|ad options|promoted|\d+ notifications?"
+    r")$",
+    re.IGNORECASE,
+)
+# Repeats of lines this long are dropped even when not adjacent
+DEDUPE_MIN_CHARS = 40
+
+
+@lru_cache(maxsize=1)
+def _encoder():
+    try:
+        import tiktoken
+    except ImportError:
+        return None
+    return tiktoken.get_encoding("o200k_base")
+
+
+def count_tokens(text: str) -> int:
+    """Token count with tiktoken when installed, else the ~4 characters/token rule of thumb."""
+    enc = _encoder()
+    if enc is not None:
+        return len(enc.encode(text))
+    return (len(text) + 3) // 4
+
+
+def _section_name(line: str) -> str | None:
+    key = line.lower()
+    if key in SECTION_PRIORITY or key in DROP_SECTIONS:
+        return key
+    if key.startswith(FOOTER_MARKERS):
+        return "footer"
+    if key.startswith("others named ") or key.startswith("people also viewed"):
+        return "people also viewed"
+    return None
+
+
+def split_sections(text: str) -> List[Tuple[str, List[str]]]:
+    """Normalize lines and group them under the section heading they follow."""
+    sections: List[Tuple[str, List[str]]] = [(HEADER, [])]
+    for raw in text.splitlines():
+        line = " ".join(raw.split())
+        if not line:
+            continue
+        name = _section_name(line)
+        if name is not None:
+            # Headings are rendered twice (once for screen readers)
+            if name != sections[-1][0]:
+                sections.append((name, [line]))
+            continue
+        sections[-1][1].append(line)
+    return sections
+
+
+def _clean_lines(lines: List[str], seen: set) -> List[str]:
+    out: List[str] = []
+    for line in lines:
+        if NOISE_LINES.match(line):
+            continue
+        if out and out[-1] == line:
+            continue
+        if len(line) >= DEDUPE_MIN_CHARS:
+            if line in seen:
+                continue
+            seen.add(line)
+        out.append(line)
+    return out
+
+
+def clean_profile_text(text: str, token_budget: int | None = None) -> Tuple[str, Dict[str, Any]]:
+    """
+    Return the cleaned text and ``{"tokens_raw", "tokens_sent", "tokens_saved",
+    "sections_dropped"}``. With a ``token_budget``, lower-priority sections
+    are cut first; the section that crosses the budget keeps its leading lines.
+    """
+    tokens_raw = count_tokens(text)
+    seen: set = set()
+    kept: List[Tuple[int, str, List[str]]] = []  # (position, name, lines)
+    dropped = 0
+    for pos, (name, lines) in enumerate(split_sections(text)):
+        if name in DROP_SECTIONS:
+            dropped += 1
+            continue
+        heading, body = (lines[:1], lines[1:]) if name != HEADER else ([], lines)
+        body = _clean_lines(body, seen)
+        if body:
+            kept.append((pos, name, heading + body))
+
+    if token_budget is not None:
+        remaining = token_budget
+        trimmed = []
+        for pos, name, lines in sorted(kept, key=lambda s: (SECTION_PRIORITY.get(s[1], 9), s[0])):
+            take = []
+            for line in lines:
+                cost = count_tokens(line) + 1
+                if cost > remaining:
+                    break
+                take.append(line)
+                remaining -= cost
+            # A heading on its own says nothing
+            if len(take) > (0 if name == HEADER else 1):
+                trimmed.append((pos, name, take))
+            else:
+                dropped += 1
+        kept = sorted(trimmed)
+
+    cleaned = "\n".join(line for _, _, lines in kept for line in lines)
+    tokens_sent = count_tokens(cleaned)
+    return cleaned, {
+        "tokens_raw": tokens_raw,
+        "tokens_sent": tokens_sent,
+        "tokens_saved": tokens_raw - tokens_sent,
+        "sections_dropped": dropped,
+    }
+
+
+# ---------- benchmark ----------
+# Expected-contact keys that are not compared (``school`` is the prompt's school name)
+_NOT_SCORED = ("linkedin_url", "bio", "school")
+
+
+def _recall(expected: Dict[str, Any], text: str) -> float:
+    """Share of the expected non-empty contact values that still appear in ``text``."""
+    values = [str(v) for k, v in expected.items() if v and k not in _NOT_SCORED]
+    if not values:
+        return 1.0
+    lower = text.lower()
+    return sum(v.lower() in lower for v in values) / len(values)
+
+
+def load_corpus(corpus: Path) -> List[Tuple[str, str, Dict[str, Any]]]:
+    """``(name, profile text, expected contact)`` for every ``<name>.txt`` with a ``<name>.json``."""
+    items = []
+    for txt in sorted(corpus.glob("*.txt")):
+        expected = txt.with_suffix(".json")
+        if expected.exists():
+            items.append((txt.stem, txt.read_text(encoding="utf-8"), json.loads(expected.read_text(encoding="utf-8"))))
+    return items
+
+
+def benchmark(corpus: Path, token_budget: int | None) -> List[Dict[str, Any]]:
+    rows = []
+    for name, text, expected in load_corpus(corpus):
+        cleaned, stats = clean_profile_text(text, token_budget)
+        rows.append({
+            "profile": name,
+            **stats,
+            "recall_raw": _recall(expected, text),
+            "recall_sent": _recall(expected, cleaned),
+        })
+    return rows
+
+
+def _field_accuracy(expected: Dict[str, Any], got: Dict[str, Any]) -> float:
+    fields = [k for k in expected if k not in _NOT_SCORED]
+    norm = lambda v: (str(v).strip().lower() if v else "")
+    return sum(norm(expected[k]) == norm(got.get(k)) for k in fields) / len(fields) if fields else 1.0
+
+
+def benchmark_llm(corpus: Path, token_budget: int | None) -> List[Dict[str, Any]]:
+    """Extract every corpus profile from raw and from cleaned text and score both against the expected contact."""
+    from openai_api_call import OpenAIIntegration
+    from .extraction import ContactExtractor
+
+    client = OpenAIIntegration()
+    raw = ContactExtractor(client, preprocess=False)
+    sent = ContactExtractor(client, token_budget=token_budget)
+    rows = []
+    for name, text, expected in load_corpus(corpus):
+        school = expected.get("school", "")
+        rows.append({
+            "profile": name,
+            "accuracy_raw": _field_accuracy(expected, raw.extract(school, text)),
+            "accuracy_sent": _field_accuracy(expected, sent.extract(school, text)),
+        })
+    client.close()
+    return rows
+
+
+def benchmark_packing(corpus: Path, token_budget: int | None, pack_size: int) -> List[Dict[str, Any]]:
+    """Extract the corpus uncached, one profile per request and then ``pack_size`` per request."""
+    from openai_api_call import OpenAIIntegration
+    from .extraction import ContactExtractor
+    from .usage import UsageMeter
+
+    corpus_items = load_corpus(corpus)
+    items = [(expected.get("school", ""), text, None) for _, text, expected in corpus_items]
+    client = OpenAIIntegration()
+    rows = []
+    try:
+        for size in (1, pack_size):
+            meter = UsageMeter()
+            client.on_usage = meter.record
+            extractor = ContactExtractor(client, token_budget=token_budget, pack_size=size)
+            started = time.perf_counter()
+            contacts = extractor.extract_many(items)
+            elapsed = time.perf_counter() - started
+            usage = meter.end("run")
+            n = len(contacts)
+            rows.append({
+                "pack_size": size,
+                "profiles": n,
+                "calls": usage["calls"],
+                "prompt_tokens_per_contact": usage["prompt_tokens"] / n if n else 0.0,
+                "completion_tokens_per_contact": usage["completion_tokens"] / n if n else 0.0,
+                "cost_per_contact_usd": usage["cost_usd"] / n if n else 0.0,
+                "cached_share": usage["cached_share"],
+                "contacts_per_s": n / elapsed if elapsed else 0.0,
+                "accuracy": sum(_field_accuracy(e, c) for (_, _, e), c in zip(corpus_items, contacts)) / n if n else 0.0,
+                "fallbacks": extractor.packs["fallbacks"],
+            })
+    finally:
+        client.close()
+    return rows
+
+
+def main(argv=None):
+    from .config import PROMPT_TOKEN_BUDGET
+
+    p = argparse.ArgumentParser(description="Profile-text preprocessing tools.")
+    sub = p.add_subparsers(dest="command", required=True)
+    bench = sub.add_parser("bench", help="Report token savings and field recall over a corpus")
+    bench.add_argument("corpus", help="Directory of <name>.txt profiles with <name>.json expected contacts")
+    bench.add_argument("--budget", type=int, default=PROMPT_TOKEN_BUDGET, help="Token budget (0 = unlimited)")
+    bench.add_argument("--llm", action="store_true", help="Also compare LLM extraction on raw vs. cleaned text")
+    bench.add_argument("--pack", type=int, default=0, metavar="N",
+                       help="Also compare single-profile requests with N profiles per request")
+    args = p.parse_args(argv)
+
+    budget = args.budget or None
+    corpus = Path(args.corpus)
+    rows = benchmark(corpus, budget)
+    for r in rows:
+        print(f"{r['profile']:<30} {r['tokens_raw']:>6} -> {r['tokens_sent']:>6} tokens  "
+              f"recall {r['recall_raw']:.0%} -> {r['recall_sent']:.0%}")
+    raw = sum(r["tokens_raw"] for r in rows)
+    sent = sum(r["tokens_sent"] for r in rows)
+    if raw:
+        print(f"Total: {raw} -> {sent} tokens ({1 - sent / raw:.0%} saved)")
+    if args.llm:
+        for r in benchmark_llm(corpus, budget):
+            print(f"{r['profile']:<30} field accuracy {r['accuracy_raw']:.0%} -> {r['accuracy_sent']:.0%}")
+    if args.pack > 1:
+        for r in benchmark_packing(corpus, budget, args.pack):
+            print(f"pack {r['pack_size']:>2}: {r['calls']} calls, "
+                  f"{r['prompt_tokens_per_contact']:.0f} + {r['completion_tokens_per_contact']:.0f} tokens/contact, "
+                  f"{r['cached_share']:.0%} cached, ${r['cost_per_contact_usd']:.5f}/contact, "
+                  f"{r['contacts_per_s']:.2f} contacts/s, "
+                  f"accuracy {r['accuracy']:.0%}, {r['fallbacks']} fallbacks")
+
+
+if __name__ == "__main__":
+    main()
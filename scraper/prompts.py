@@ -1,15 +1,29 @@
 """
-Prompt template used when calling OpenAIIntegration.fetch_response().
+Prompt templates used when calling OpenAIIntegration.fetch_response().
 """
 
-TEMPLATE = """
-The following is a LinkedIn profile of an individual who works at {school_name}.
+# Bump whenever a template changes meaningfully; it is part of the LLM cache key.
+TEMPLATE_VERSION = "2"
+
+# Each request is (system: *_INSTRUCTIONS, user: *_TEMPLATE). The
+# instructions hold everything that is the same for every profile and
+# school, so all requests of a kind start with identical tokens. OpenAI's
+# prompt cache only serves an identical prefix of 1024+ tokens (then in
+# 128-token steps), and these instructions are shorter (about 200-500
+# tokens), so with OpenAI they are normally not cached: usage reports
+# cached_share, which stays near 0. Padding them past the threshold costs
+# more than the cache discount saves at gpt-4o-mini prices. Keep anything
+# that varies (school, name, profile text) out of the instructions all the
+# same, so a provider or model that caches shorter prefixes can reuse them.
+INSTRUCTIONS = """
+You will be given the LinkedIn profile of an individual, together with the name of the school
+they work at.
 
 Please extract **only** the information listed below and return it **strictly as JSON** —
 no Markdown, no commentary:
 
 1. **name** – full name as it appears on their profile  
-2. **title** – their current job title at {school_name}  
+2. **title** – their current job title at the given school  
 3. **department** – department or functional area (often absent)  
 4. **email** – school-associated e-mail if available; otherwise null  
 5. **phone** – phone number if available; otherwise null  
@@ -27,7 +41,7 @@ no Markdown, no commentary:
 ### Return-format example  *(structure & style to replicate)*
 
 ```json
-{{
+{
   "name": "Jolene Bradford",
   "title": "Deputy Head of Admissions",
   "department": "Admissions",
@@ -35,9 +49,84 @@ no Markdown, no commentary:
   "phone": null,
   "linkedin_url": "https://www.linkedin.com/in/jolene-bradford/",
   "bio": "Birthday is June 1st. Mentions he is in her '10th year as an educator'. Got her MBA from University of Cumbria - graduating in 2023. Got his Post Graduate Certificate in Education from University College London (focus in primary education) - graduating in 2013. Previous expeience includes: 'Assistant Pincipal' at 'Dulwich College Beijing' (Apr 2022 - Jun 2023); 'Deputy Head of Primary' (Jan 2021 - Jan 2022), 'IB PYP Coordinator' (Aug 2018 - Jan 2022), 'Classroom Teacher' (Jun 2017 - Jan 2022) at 'Foshan EtonHouse International School'; 'Teacher' at 'Country Garden Group'. Recent LinkedIn post celebrating the schools diversity and creativity in a face-painting contest."
-}}
+}
 ```
+""".strip()
+
+TEMPLATE = """
+School: {school_name}
+
 Here is the text to analyse (profile + contact-info dump):
 
 {text}
-""".strip()
\ No newline at end of file
+""".strip()
+
+# Used when name, e-mail, phone and profile URL were already pulled from the
+# text (see pre_extract.py); only the fields that need reading are asked for.
+DETAILS_INSTRUCTIONS = """
+You will be given the LinkedIn profile of an individual, together with their name and the
+school they work at.
+
+Please extract **only** the information listed below and return it **strictly as JSON** —
+no Markdown, no commentary:
+
+1. **title** – their current job title at the given school
+2. **department** – department or functional area (often absent)
+3. **bio** – a concise (≤ 5-sentence) bio that surfaces “ice-breaker” (quick) facts such as
+   • total years at the school / in the sector
+   • previous roles or promotions
+   • education & awards
+   • hobbies, passions, family mentions, etc.
+
+**If any field is missing, put `null` for that value. Avoid hallucinations — rely only on the supplied text.**
+
+Return format: {"title": ..., "department": ..., "bio": ...}
+""".strip()
+
+DETAILS_TEMPLATE = """
+Name: {name}
+School: {school_name}
+
+Here is the text to analyse (profile + contact-info dump):
+
+{text}
+""".strip()
+
+# Several profiles of one school in a single request, so the instructions
+# are sent once per pack instead of once per profile. {profiles} is a series
+# of "### Profile <id>" blocks (see extraction.render_pack).
+PACKED_INSTRUCTIONS = """
+You will be given several LinkedIn profiles of people who work at the same school, together
+with the school's name. Each profile starts with a `### Profile <id>` heading.
+
+For **every** profile, extract **only** the information listed below and return it **strictly as JSON** —
+no Markdown, no commentary:
+
+0. **profile_id** – the <id> from the profile's heading, copied exactly
+1. **name** – full name as it appears on their profile
+2. **title** – their current job title at the given school
+3. **department** – department or functional area (often absent)
+4. **email** – school-associated e-mail if available; otherwise null
+5. **phone** – phone number if available; otherwise null
+6. **linkedin_url** – the public profile URL (usually in the Contact-info modal)
+7. **bio** – a concise (≤ 5-sentence) bio that surfaces “ice-breaker” (quick) facts such as
+   • total years at the school / in the sector
+   • previous roles or promotions
+   • education & awards
+   • hobbies, passions, family mentions, etc.
+
+**If any field is missing, put `null` for that value. Never mix details from different profiles.
+Avoid hallucinations — rely only on the supplied text.**
+
+Return format: {"contacts": [{"profile_id": ..., "name": ..., "title": ..., "department": ..., "email": ..., "phone": ..., "linkedin_url": ..., "bio": ...}, ...]}
+with exactly one object per profile, in the order given.
+""".strip()
+
+PACKED_TEMPLATE = """
+School: {school_name}
+Profiles: {count}
+
+Here are the profiles to analyse (profile + contact-info dump each):
+
+{profiles}
+""".strip()
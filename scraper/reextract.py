@@ -0,0 +1,150 @@
+"""
+Re-run LLM extraction over the stored profile captures (see captures.py),
+with no browser.
+
+    python -m scraper.reextract --output contacts.xlsx
+    python -m scraper.reextract --output contacts.xlsx --backend local --concurrency 16
+    python -m scraper.reextract --output contacts.xlsx --prompts my_prompts --model gpt-4.1-mini
+
+The latest capture of every profile goes through ContactExtractor with the
+chosen backend, model and prompt module (a prompt version: any module with
+the same names as scraper.prompts). The new contacts are journaled over
+the old ones, under the URL each was first journaled with, then the store
+and output are refreshed, as for ``scraper.batch ingest``.
+"""
+from __future__ import annotations
+import argparse, importlib, itertools, sys, time
+from pathlib import Path
+from typing import Any, Dict
+
+from .backends import BACKENDS, make_backend
+from .captures import CaptureStore, profile_text
+from .config import CAPTURE_PATH, EXTRACTION_BACKEND, EXTRACTION_PACK_SIZE
+from .extraction import ContactExtractor, default_cache
+from .io_utils import (
+    OUTPUT_DEFAULT, ParquetResultsDataset, ResultsJournal, ResultsStore,
+    canonical_profile_url, journal_path_for, store_path_for,
+)
+
+# Captures handed to extract_many at a time; results are journaled per chunk
+CHUNK_SIZE = 200
+
+
+def _school_ids(journal: ResultsJournal) -> tuple[Dict[str, str], Dict[str, str]]:
+    """(school id by canonical contact URL, school id by school name) from the journal."""
+    by_url: Dict[str, str] = {}
+    by_name: Dict[str, str] = {}
+    for rec in journal.replay():
+        kind = rec.get("kind")
+        if kind == "school" and rec.get("name"):
+            by_name[rec["name"]] = str(rec.get("id"))
+        elif kind == "contact":
+            url = canonical_profile_url((rec.get("contact") or {}).get("linkedin_url"))
+            if url:
+                by_url[url] = str(rec.get("id"))
+    return by_url, by_name
+
+
+def reextract(output_path: Path, extractor: ContactExtractor, captures: CaptureStore,
+              school: str | None = None, concurrency: int | None = None, parquet: bool = False,
+              dry_run: bool = False) -> Dict[str, Any]:
+    """Extract every latest capture again and journal the results; returns counts."""
+    counts: Dict[str, Any] = {"captures": 0, "contacts": 0, "empty": 0, "orphaned": 0}
+    journal = ResultsJournal(journal_path_for(output_path))
+    started = time.perf_counter()
+    try:
+        by_url, by_name = _school_ids(journal)
+        rows = captures.latest(school)
+        while chunk := list(itertools.islice(rows, CHUNK_SIZE)):
+            items = [(c["school"], profile_text(c["main_text"], c["contact_text"]), c["url"]) for c in chunk]
+            contacts = extractor.extract_many(items, concurrency=concurrency)
+            events = []
+            for capture, contact in zip(chunk, contacts):
+                counts["captures"] += 1
+                if not contact.get("name"):
+                    counts["empty"] += 1
+                    continue
+                # Replace the row the profile was journaled under, whatever URL the LLM returns now
+                url = capture["contact_url"] or capture["url"]
+                school_id = by_url.get(canonical_profile_url(url)) or by_name.get(capture["school"])
+                if school_id is None:
+                    counts["orphaned"] += 1
+                    continue
+                events.append(("contact", {"id": school_id, "contact": {**contact, "linkedin_url": url}}))
+            if events and not dry_run:
+                journal.append_many(events)
+            counts["contacts"] += len(events)
+            print(f"🔁 {counts['captures']} captures re-extracted")
+    finally:
+        journal.close()
+    counts["elapsed_s"] = time.perf_counter() - started
+
+    if not dry_run:
+        store = ResultsStore(store_path_for(output_path))
+        try:
+            store.catch_up(journal)
+            if parquet:
+                ParquetResultsDataset(output_path, store).catch_up(journal)
+            else:
+                store.export_excel(output_path)
+        finally:
+            store.close()
+    return counts
+
+
+def parse_args(argv=None):
+    p = argparse.ArgumentParser(description="Re-run LLM extraction over stored profile captures.")
+    p.add_argument("--output", help="Output .xlsx (or Parquet dataset directory) whose journal is updated")
+    p.add_argument("--output-format", choices=("xlsx", "parquet"), default="xlsx")
+    p.add_argument("--captures", default=str(CAPTURE_PATH), help="Capture store to read")
+    p.add_argument("--backend", choices=BACKENDS, default=EXTRACTION_BACKEND)
+    p.add_argument("--model", help="Model to extract with (default: the backend's)")
+    p.add_argument("--prompts", default="scraper.prompts",
+                   help="Module with the prompt templates to use, i.e. the prompt version")
+    p.add_argument("--concurrency", type=int, default=None, help="Requests in flight at once")
+    p.add_argument("--pack", type=int, default=EXTRACTION_PACK_SIZE, metavar="N", help="Profiles of a school per request")
+    p.add_argument("--school", help="Only re-extract this school's captures")
+    p.add_argument("--no-cache", action="store_true", help="Ignore and do not fill the LLM response cache")
+    p.add_argument("--dry-run", action="store_true", help="Extract and report, but write nothing")
+    return p.parse_args(argv)
+
+
+def main(argv=None):
+    args = parse_args(argv)
+    parquet = args.output_format == "parquet"
+    default_output = OUTPUT_DEFAULT.with_suffix("") if parquet else OUTPUT_DEFAULT
+    output_path = Path(args.output or default_output).expanduser().resolve()
+    captures_path = Path(args.captures).expanduser().resolve()
+    if not captures_path.exists():
+        sys.exit(f"No capture store at {captures_path}")
+
+    prompts = importlib.import_module(args.prompts)
+    backend = make_backend(args.backend)
+    cache = None if args.no_cache else default_cache()
+    extractor = ContactExtractor(backend, model=args.model or backend.model, cache=cache,
+                                 prompts=prompts, pack_size=args.pack)
+    captures = CaptureStore(captures_path)
+    print(f"📦 {captures.stats()['profiles']} captured profiles; extracting with {args.backend} "
+          f"{extractor.model}, prompt version {prompts.TEMPLATE_VERSION}")
+    try:
+        counts = reextract(output_path, extractor, captures, school=args.school,
+                           concurrency=args.concurrency, parquet=parquet, dry_run=args.dry_run)
+    finally:
+        extractor.close()
+        backend.close()
+        captures.close()
+
+    rate = counts["captures"] / counts["elapsed_s"] if counts["elapsed_s"] else 0.0
+    print(
+        f"✅  Re-extracted {counts['captures']} captures in {counts['elapsed_s']:.0f} s ({rate:.1f}/s): "
+        f"{counts['contacts']} contacts journaled, {counts['empty']} empty, "
+        f"{counts['orphaned']} without a known school" + (" (dry run, nothing written)" if args.dry_run else "")
+        + f". Results in {output_path}"
+    )
+    parse = extractor.stats().get("parse")
+    if parse:
+        print(f"🧩 LLM replies: {parse['valid']} valid, {parse['repaired']} repaired locally, {parse['failed']} failed")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,60 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+from pathlib import Path
+
+from scraper.backends import ExtractionBackend, FakeBackend, LocalBackend, benchmark
+from scraper.extraction import ContactExtractor
+
+CORPUS = Path(__file__).parent / "data" / "profiles"
+
+
+class LocalLLM(BaseHTTPRequestHandler):
+    """OpenAI-compatible stand-in for llama.cpp / vLLM: echoes FakeBackend's answer."""
+    requests = []
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        LocalLLM.requests.append((self.path, dict(self.headers), data))
+        system = next((m["content"] for m in data["messages"] if m["role"] == "system"), None)
+        reply = FakeBackend()._reply(data["messages"][-1]["content"], system)
+        body = json.dumps({
+            "choices": [{"message": {"content": reply}}],
+            "usage": {"prompt_tokens": 100, "completion_tokens": 20, "total_tokens": 120},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+def test_fake_backend_is_deterministic_and_extracts_the_corpus():
+    rows = benchmark(CORPUS, ["fake"])
+    assert rows[0]["profiles"] == 3 and rows[0]["parse"]["failed"] == 0
+    assert rows[0]["cost_per_contact_usd"] == 0.0
+    first = FakeBackend().fetch_response((CORPUS / "counselor_minimal.txt").read_text(encoding="utf-8"))
+    assert first == FakeBackend().fetch_response((CORPUS / "counselor_minimal.txt").read_text(encoding="utf-8"))
+    assert json.loads(first)["title"] == "School Counselor"
+
+
+def test_local_backend_talks_to_an_openai_compatible_server():
+    server = HTTPServer(("127.0.0.1", 0), LocalLLM)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    backend = LocalBackend(base_url=f"http://127.0.0.1:{server.server_port}/v1", model="llama-3.1-8b", api_key=None)
+    try:
+        assert isinstance(backend, ExtractionBackend)
+        extractor = ContactExtractor(backend, model=backend.model, preprocess=False)
+        text = (CORPUS / "counselor_minimal.txt").read_text(encoding="utf-8")
+        contact = extractor.extract("Hillcrest Middle School", text)
+    finally:
+        backend.close()
+        server.shutdown()
+    assert contact["name"] == "Dana Ortiz" and contact["title"] == "School Counselor"
+    path, headers, data = LocalLLM.requests[-1]
+    assert path == "/v1/chat/completions"
+    assert data["model"] == "llama-3.1-8b"
+    assert "Authorization" not in headers and "OpenAI-Organization" not in headers
@@ -0,0 +1,92 @@
+import json
+import threading
+from http.server import BaseHTTPRequestHandler, HTTPServer
+
+import requests
+
+from scraper import batch
+from scraper.io_utils import ResultsJournal, ResultsStore, journal_path_for, store_path_for
+
+
+class FakeBatchAPI(BaseHTTPRequestHandler):
+    """Stand-in for the provider's /files and /batches endpoints."""
+    uploaded = []
+
+    def _reply(self, payload, content_type="application/json"):
+        body = payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        if self.path == "/v1/files":
+            FakeBatchAPI.uploaded = [
+                json.loads(line) for line in body.decode().splitlines() if line.startswith('{"custom_id"')
+            ]
+            self._reply({"id": "file-in"})
+        elif self.path == "/v1/batches":
+            assert json.loads(body)["input_file_id"] == "file-in"
+            self._reply({"id": "batch_1", "status": "validating"})
+
+    def do_GET(self):
+        if self.path == "/v1/batches/batch_1":
+            self._reply({"id": "batch_1", "status": "completed", "output_file_id": "file-out"})
+        elif self.path == "/v1/files/file-out/content":
+            lines = []
+            for req in FakeBatchAPI.uploaded:
+                name = req["body"]["messages"][-1]["content"].split("NAME:")[1].strip()
+                content = json.dumps({"name": name, "linkedin_url": None})
+                lines.append(json.dumps({
+                    "custom_id": req["custom_id"],
+                    "response": {"status_code": 200, "body": {"choices": [{"message": {"content": content}}]}},
+                }))
+            self._reply(("\n".join(lines) + "\n").encode(), "application/jsonl")
+
+    def log_message(self, *args):
+        pass
+
+
+def test_submit_poll_ingest_against_local_server(tmp_path, monkeypatch):
+    server = HTTPServer(("127.0.0.1", 0), FakeBatchAPI)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    base_url = f"http://127.0.0.1:{server.server_port}/v1"
+    root = tmp_path / "batch"
+    output = tmp_path / "out.xlsx"
+    monkeypatch.setattr(ResultsStore, "export_excel", lambda self, path: None)
+
+    # What the scraper does in batch mode: record the request, journal a placeholder
+    recorder = batch.BatchRecorder(root)
+    journal = ResultsJournal(journal_path_for(output))
+    journal.append("school", id="1", name="Alpha")
+    for i, name in enumerate(["Jo Bloggs", "Ann Lee"]):
+        href = f"https://www.linkedin.com/in/p{i}/"
+        body = {"model": "gpt-4o-mini", "messages": [{"role": "user", "content": f"NAME: {name}"}]}
+        recorder.record(f"key{i}", body, "Alpha", href)
+        journal.append("contact", id="1", contact={"linkedin_url": href})
+    recorder.close()
+    journal.close()
+
+    session = requests.Session()
+    try:
+        [manifest] = batch.submit(session, base_url, root)
+        assert manifest["batch_id"] == "batch_1" and manifest["requests"] == 2
+        assert not (root / batch.PENDING_FILE).exists()
+        assert all("meta" not in r for r in FakeBatchAPI.uploaded)
+
+        [manifest] = batch.poll(session, base_url, root)
+        assert manifest["status"] == "completed"
+    finally:
+        server.shutdown()
+
+    counts = batch.ingest(output, root=root)
+    assert counts["contacts"] == 2 and counts["invalid"] == 0
+
+    store = ResultsStore(store_path_for(output))
+    names = sorted(c["name"] for c in store.contacts_for("1"))
+    store.close()
+    assert names == ["Ann Lee", "Jo Bloggs"]
+    # Ingesting again is a no-op
+    assert batch.ingest(output, root=root)["batches"] == 0
@@ -0,0 +1,37 @@
+import json
+import sqlite3
+
+from scraper.compact import main, read_run_file
+
+
+def _write_run(path, records):
+    path.write_text("".join(json.dumps(r) + "\n" for r in records), encoding="utf-8")
+
+
+def test_compact_keeps_newest_per_canonical_url(tmp_path):
+    runs = tmp_path / "runs"
+    runs.mkdir()
+    _write_run(runs / "alpha-school.jsonl", [
+        {"name": "Jo Bloggs", "linkedin_url": "https://linkedin.com/in/Jo-Bloggs?trk=x", "captured_at": 20},
+        {"name": "No Url"},
+    ])
+    _write_run(runs / "beta-school.jsonl", [
+        {"name": "Jo B.", "linkedin_url": "https://www.linkedin.com/in/jo-bloggs/", "captured_at": 10},
+    ])
+
+    out = tmp_path / "contacts.sqlite"
+    main(["--runs-dir", str(runs), "--output", str(out), "--workers", "2"])
+
+    rows = sqlite3.connect(out).execute("SELECT key, school, name FROM contacts ORDER BY name").fetchall()
+    assert rows == [
+        ("https://www.linkedin.com/in/jo-bloggs/", "alpha-school", "Jo Bloggs"),
+        ("nourl:alpha-school:2", "alpha-school", "No Url"),
+    ]
+
+
+def test_read_run_file_skips_corrupt_and_non_object_lines(tmp_path):
+    path = tmp_path / "alpha-school.jsonl"
+    path.write_text('[]\n1\nnull\n{"name": "Jo", "linkedin_url": "https://linkedin.com/in/jo"}\n{"name": "Tor',
+                    encoding="utf-8")
+    rows = read_run_file(str(path))
+    assert [(r[0], r[2]) for r in rows] == [("https://www.linkedin.com/in/jo/", "Jo")]
@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import openai_api_call
+from openai_api_call import LatencyTracker, OpenAIIntegration
+from scraper.usage import UsageMeter
+
+
+class StragglerAPI(BaseHTTPRequestHandler):
+    """Chat-completions stand-in; the first request for a "SLOW" prompt stalls for ``stall_s``."""
+    stall_s = 3.0
+    stalled = 0
+    lock = threading.Lock()
+
+    def do_POST(self):
+        data = json.loads(self.rfile.read(int(self.headers["Content-Length"])))
+        prompt = data["messages"][-1]["content"]
+        if prompt == "SLOW":
+            with StragglerAPI.lock:
+                StragglerAPI.stalled += 1
+                stall = StragglerAPI.stalled == 1
+            if stall:
+                time.sleep(StragglerAPI.stall_s)
+        body = json.dumps({
+            "choices": [{"message": {"content": json.dumps({"model": data["model"], "prompt": prompt})}}],
+            "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+        }).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StragglerAPI)
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    monkeypatch.setattr(openai_api_call, "OPENAI_BASE_URL", f"http://127.0.0.1:{server.server_port}/v1")
+    monkeypatch.setattr(openai_api_call, "OPENAI_HEDGE_MIN_SAMPLES", 5)
+    monkeypatch.setattr(openai_api_call, "OPENAI_HEDGE_MODEL", "gpt-4o-mini")
+    StragglerAPI.stalled = 0
+    c = OpenAIIntegration()
+    c.hedge = True
+    yield c
+    c.close()
+    server.shutdown()
+
+
+def test_straggler_is_hedged_to_the_fallback_model(client):
+    meter = UsageMeter()
+    client.on_usage = meter.record
+    for i in range(5):
+        client.fetch_response(f"warm-up {i}", model="gpt-4o")
+    assert client.connection_stats()["hedges_sent"] == 0
+
+    meter.begin("profile")
+    started = time.perf_counter()
+    reply, model = client.fetch_answer("SLOW", model="gpt-4o")
+    elapsed = time.perf_counter() - started
+
+    assert json.loads(reply) == {"model": "gpt-4o-mini", "prompt": "SLOW"} and model == "gpt-4o-mini"
+    assert elapsed < StragglerAPI.stall_s / 2
+    stats = client.connection_stats()
+    assert (stats["hedges_sent"], stats["hedges_won"]) == (1, 1)
+    assert stats["hedge_rate"] == pytest.approx(1 / 6)
+    assert stats["hedged_latency_ms"]["p99"] < StragglerAPI.stall_s * 1000 / 2
+    assert meter.end("profile")["calls"] == 1
+
+    # The losing call finishes during the next profile, but is only charged to the run
+    meter.begin("profile")
+    deadline = time.monotonic() + StragglerAPI.stall_s * 2
+    while meter.end("run")["calls"] < 7 and time.monotonic() < deadline:
+        time.sleep(0.05)
+    assert meter.end("run")["calls"] == 7
+    assert meter.end("profile")["calls"] == 0
+
+
+def test_no_hedge_before_enough_samples(client):
+    reply, model = client.fetch_answer("first", model="gpt-4o")
+    assert json.loads(reply)["model"] == model == "gpt-4o"
+    assert client.connection_stats()["hedges_sent"] == 0
+
+
+def test_latency_percentiles():
+    tracker = LatencyTracker(window=100)
+    assert tracker.percentile(95) is None
+    for ms in range(1, 101):
+        tracker.record(ms)
+    assert tracker.summary() == {"p50": 50, "p95": 95, "p99": 99}
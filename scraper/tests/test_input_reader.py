@@ -0,0 +1,27 @@
+import pytest
+
+from scraper import io_utils
+from scraper.io_utils import iter_input
+
+
+def test_iter_input_csv_validates_per_row(tmp_path, capsys):
+    path = tmp_path / "schools.csv"
+    path.write_text("name,id\nAlpha School,1\nBeta School,\n\nGamma School,3\n", encoding="utf-8")
+
+    assert list(iter_input(path)) == [("1", "Alpha School"), ("3", "Gamma School")]
+    assert "row 3" in capsys.readouterr().out
+
+
+def test_iter_input_checks_header_eagerly(tmp_path, monkeypatch):
+    path = tmp_path / "schools.csv"
+    path.write_text("school,label\n1,Alpha\n", encoding="utf-8")
+    handles = []
+
+    def tracking_open(*args, **kwargs):
+        handles.append(open(*args, **kwargs))
+        return handles[-1]
+
+    monkeypatch.setattr(io_utils, "open", tracking_open, raising=False)
+    with pytest.raises(ValueError, match="id, name"):
+        iter_input(path)
+    assert handles and all(fh.closed for fh in handles)
@@ -0,0 +1,49 @@
+import pytest
+
+from scraper.json_repair import repair_json
+
+
+@pytest.mark.parametrize("reply, expected", [
+    ('Here you go:\n```json\n{"name": "Jo", "email": null,}\n```', {"name": "Jo", "email": None}),
+    ("{'name': 'O\\'Brien', phone: None, 'active': True}", {"name": "O'Brien", "phone": None, "active": True}),
+    ('{"name": "Jo", "bio": "line one\nline two"}', {"name": "Jo", "bio": "line one\nline two"}),
+    ('{"name": "Jo", "tags": [1, 2.5e3, -3,], "title": "Head', {"name": "Jo", "tags": [1, 2500.0, -3], "title": "Head"}),
+    ('{"name": "Jo", "title":', {"name": "Jo", "title": None}),
+    ('{"name": "Jo", "tit', {"name": "Jo", "tit": None}),
+])
+def test_repairs_near_valid_replies(reply, expected):
+    assert repair_json(reply) == expected
+
+
+def test_unrepairable_reply_raises():
+    with pytest.raises(ValueError):
+        repair_json("I could not find a profile.")
+
+
+def test_lenient_contact_parse_drops_invalid_optional_fields():
+    from scraper.extraction import contact_json_schema, parse_contact_lenient
+
+    contact, repaired = parse_contact_lenient('{"name": "Jo", "linkedin_url": "not a url", "email": "jo@x.org",}')
+    assert repaired
+    assert contact["name"] == "Jo" and contact["email"] == "jo@x.org" and contact["linkedin_url"] is None
+
+    assert parse_contact_lenient('{"name": "Jo"}') == ({**contact, "email": None}, False)
+
+    schema = contact_json_schema()
+    assert set(schema["required"]) == set(schema["properties"]) >= {"name", "email"}
+    assert schema["properties"]["name"] == {"type": "string"}
+
+
+@pytest.mark.parametrize("reply", ["null", '"Jo"', "42", "[]"])
+def test_lenient_contact_parse_rejects_non_object_replies(reply):
+    from scraper.extraction import parse_contact_lenient
+
+    with pytest.raises(ValueError):
+        parse_contact_lenient(reply, {"name": "Jo"})
+
+
+def test_lenient_contact_parse_repairs_object_wrapped_in_a_list():
+    from scraper.extraction import parse_contact_lenient
+
+    contact, repaired = parse_contact_lenient('[{"name": "Jo", "title": "Head"}]')
+    assert repaired and (contact["name"], contact["title"]) == ("Jo", "Head")
@@ -0,0 +1,46 @@
+from scraper.llm_cache import ResponseCache
+
+
+def test_cache_hit_miss_and_key_versioning(tmp_path):
+    cache = ResponseCache(tmp_path / "c.sqlite", max_bytes=1 << 20, ttl_seconds=3600)
+    k1 = ResponseCache.key("gpt-4o-mini", "1", "prompt")
+    assert k1 != ResponseCache.key("gpt-4o-mini", "2", "prompt")
+    assert cache.get(k1) is None
+    cache.put(k1, "gpt-4o-mini", '{"name": "Jo"}')
+    assert cache.get(k1) == '{"name": "Jo"}'
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    cache.close()
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = ResponseCache(tmp_path / "c.sqlite", max_bytes=20, ttl_seconds=3600)
+    cache.put("a", "m", "x" * 10)
+    cache.put("b", "m", "y" * 10)
+    cache.get("a")  # "b" is now least recently used
+    cache.put("c", "m", "z" * 10)
+    assert cache.get("b") is None
+    assert cache.get("a") == "x" * 10
+    assert cache.stats()["bytes"] <= 20
+    cache.close()
+
+
+def test_cache_expires_entries(tmp_path):
+    cache = ResponseCache(tmp_path / "c.sqlite", max_bytes=1 << 20, ttl_seconds=-1)
+    cache.put("a", "m", "x")
+    assert cache.get("a") is None
+    assert cache.stats()["entries"] == 0
+    cache.close()
+
+
+def test_cache_sweeps_expired_entries_at_open_not_every_put(tmp_path):
+    path = tmp_path / "c.sqlite"
+    cache = ResponseCache(path, max_bytes=1 << 20, ttl_seconds=-1)
+    cache.put("a", "m", "x")
+    cache.put("b", "m", "y")
+    assert cache.stats()["entries"] == 2  # no sweep until the interval passes
+    cache.conn.close()
+    reopened = ResponseCache(path, max_bytes=1 << 20, ttl_seconds=-1)
+    assert reopened.stats()["entries"] == 0
+    assert reopened.stats()["expired"] == 2
+    reopened.close()
@@ -0,0 +1,190 @@
+import pytest
+
+import openai_api_call
+from openai_api_call import CircuitBreaker, CircuitOpenError, ModelCascade, OpenAIIntegration, RetriesExhausted
+
+
+class FakeResponse:
+    def __init__(self, status, headers=None, content=None):
+        self.status_code = status
+        self.headers = headers or {}
+        self._content = content
+        self.text = "error"
+
+    def json(self):
+        return self._content
+
+
+def ok(reply="{}"):
+    return FakeResponse(200, {"x-ratelimit-remaining-requests": "99"}, {
+        "choices": [{"message": {"content": reply}}],
+        "usage": {"prompt_tokens": 10, "completion_tokens": 5, "total_tokens": 15},
+    })
+
+
+class FakeSession:
+    def __init__(self, responses):
+        self.responses = list(responses)
+        self.calls = 0
+
+    def post(self, url, json=None, timeout=None):
+        self.calls += 1
+        return self.responses.pop(0)
+
+    def close(self):
+        pass
+
+
+@pytest.fixture
+def client(monkeypatch):
+    sleeps = []
+    monkeypatch.setattr(openai_api_call.time, "sleep", lambda s: sleeps.append(s))
+    monkeypatch.setattr(openai_api_call, "OPENAI_MAX_RETRIES", 3)
+    c = OpenAIIntegration()
+    c.sleeps = sleeps
+    yield c
+    c.close()
+
+
+def test_retry_after_header_drives_backoff(client):
+    client.session = FakeSession([FakeResponse(429, {"retry-after": "7"}), ok('{"name": "Jo"}')])
+    assert client.fetch_response("hi", model="gpt-4o-mini") == '{"name": "Jo"}'
+    assert 7.0 in client.sleeps
+
+
+def test_exhausted_request_raises_with_body_instead_of_prompting(client):
+    client.session = FakeSession([FakeResponse(503)] * 3)
+    with pytest.raises(RetriesExhausted) as exc:
+        client.fetch_response("hi", model="gpt-4o-mini")
+    assert exc.value.data["messages"][0]["content"] == "hi"
+
+
+def test_non_retryable_error_is_not_retried(client):
+    client.session = FakeSession([FakeResponse(400)])
+    with pytest.raises(Exception, match="HTTP Error: 400"):
+        client.fetch_response("hi", model="gpt-4o-mini")
+    assert client.session.calls == 1
+
+
+def test_circuit_opens_after_consecutive_failures(client):
+    client.breaker.threshold = 3
+    client.session = FakeSession([FakeResponse(500)] * 3)
+    with pytest.raises(RetriesExhausted):
+        client.fetch_response("a", model="gpt-4o-mini")
+    with pytest.raises(CircuitOpenError):
+        client.fetch_response("b", model="gpt-4o-mini")
+    assert client.session.calls == 3
+    assert client.connection_stats()["circuit_trips"] == 1
+
+
+def test_half_open_circuit_admits_a_single_trial_call(monkeypatch):
+    now = [0.0]
+    monkeypatch.setattr(openai_api_call.time, "monotonic", lambda: now[0])
+    breaker = CircuitBreaker(threshold=1, cooldown=10)
+    breaker.record_failure()
+    with pytest.raises(CircuitOpenError):
+        breaker.check({})
+    now[0] = 10.0
+    breaker.check({})  # the trial
+    with pytest.raises(CircuitOpenError):
+        breaker.check({})
+    breaker.record_failure()  # the trial failed: open for another cooldown
+    with pytest.raises(CircuitOpenError):
+        breaker.check({})
+    now[0] = 20.0
+    breaker.check({})
+    breaker.record_success()
+    breaker.check({})
+    breaker.check({})
+
+
+def test_non_json_200_is_retried(client):
+    class HtmlPage(FakeResponse):
+        def json(self):
+            raise ValueError("Expecting value")
+
+    client.session = FakeSession([HtmlPage(200), ok('{"name": "Jo"}')])
+    assert client.fetch_response("hi", model="gpt-4o-mini") == '{"name": "Jo"}'
+    assert client.session.calls == 2 and client.breaker.failures == 0
+
+
+def test_cascade_escalates_on_rejected_reply_and_failure(client):
+    cascade = ModelCascade.parse("gpt-4.1-nano:5, gpt-4.1-mini:10, gpt-4o")
+    assert cascade.tiers == [("gpt-4.1-nano", 5.0), ("gpt-4.1-mini", 10.0), ("gpt-4o", openai_api_call.OPENAI_READ_TIMEOUT)]
+    # nano answers badly, mini fails once (no retries below the last tier), gpt-4o answers well
+    client.session = FakeSession([ok("bad"), FakeResponse(500), ok("good")])
+    reply, model = client.fetch_cascade("hi", cascade, accept=lambda r: r == "good")
+    assert (reply, model) == ("good", "gpt-4o")
+    assert client.session.calls == 3
+    stats = cascade.stats()
+    assert stats["gpt-4.1-nano"]["rejected"] == 1 and stats["gpt-4.1-nano"]["escalation_rate"] == 1.0
+    assert stats["gpt-4.1-mini"]["failed"] == 1
+    assert stats["gpt-4o"]["accepted"] == 1 and stats["gpt-4o"]["escalation_rate"] == 0.0
+
+
+def test_cascade_stops_at_first_accepted_tier(client):
+    cascade = ModelCascade.parse("gpt-4.1-nano,gpt-4o")
+    client.session = FakeSession([ok("good")])
+    assert client.fetch_cascade("hi", cascade, accept=lambda r: True) == ("good", "gpt-4.1-nano")
+    assert cascade.stats()["gpt-4o"]["calls"] == 0
+    with pytest.raises(ValueError):
+        ModelCascade.parse("gpt-99")
+
+
+def test_cascade_replies_are_cached_per_cascade(client, tmp_path):
+    from scraper.extraction import ContactExtractor
+    from scraper.llm_cache import ResponseCache
+
+    cache = ResponseCache(tmp_path / "c.sqlite", max_bytes=1 << 20, ttl_seconds=3600)
+    reply = '{"name": "Jo Ames", "title": "Head"}'
+    client.session = FakeSession([ok(reply), ok(reply)])
+
+    def extractor(spec):
+        return ContactExtractor(client, model="gpt-4o-mini", cache=cache, preprocess=False, narrow=False,
+                                cascade=ModelCascade.parse(spec))
+
+    extractor("gpt-4.1-nano,gpt-4o").extract("Alpha", "Jo Ames\nHead at Alpha")
+    cached = extractor("gpt-4.1-nano,gpt-4o")
+    cached.extract("Alpha", "Jo Ames\nHead at Alpha")
+    assert cached.last_meta["cache_hit"] and client.session.calls == 1
+    # Another cascade (or the plain model) does not reuse those replies
+    other = extractor("gpt-4.1-mini,gpt-4o")
+    other.extract("Alpha", "Jo Ames\nHead at Alpha")
+    assert not other.last_meta["cache_hit"] and client.session.calls == 2
+    cache.close()
+
+
+def test_tokens_are_reserved_once_per_request_and_refunded_on_failure(client):
+    client.breaker.threshold = 10
+    full = client.limiter.tokens.level
+    client.session = FakeSession([FakeResponse(503)] * 3)
+    with pytest.raises(RetriesExhausted):
+        client.fetch_response("hi", model="gpt-4o-mini")
+    assert client.limiter.tokens.level == pytest.approx(full)
+    # Retried to success: only the reply's usage is charged, not one estimate per attempt
+    client.session = FakeSession([FakeResponse(429), FakeResponse(500), ok()])
+    client.fetch_response("hi", model="gpt-4o-mini")
+    assert client.limiter.tokens.level == pytest.approx(full - 15, abs=1)
+
+
+def test_async_client_from_a_previous_loop_is_closed(client, monkeypatch):
+    import asyncio, sys, types
+
+    class FakeAsyncClient:
+        def __init__(self, **kwargs):
+            self.closed = False
+
+        async def post(self, url, json=None):
+            return ok()
+
+        async def aclose(self):
+            self.closed = True
+
+    httpx = types.SimpleNamespace(AsyncClient=FakeAsyncClient, Timeout=lambda *a, **k: None,
+                                  Limits=lambda **k: None)
+    monkeypatch.setitem(sys.modules, "httpx", httpx)
+    data = client.payload("hi", "gpt-4o-mini")
+    asyncio.run(client.afetch(data))
+    first = client._aclient
+    asyncio.run(client.afetch(data))
+    assert first.closed and client._aclient is not first and not client._aclient.closed
@@ -0,0 +1,82 @@
+import json
+
+from scraper.extraction import ContactExtractor, render_pack, split_packed_reply
+
+
+class FakeClient:
+    """Answers packed prompts for every profile except those named in ``skip``."""
+
+    def __init__(self, skip=()):
+        self.skip = set(skip)
+        self.calls = []
+
+    def fetch_many(self, prompts, model, concurrency=None, response_format=None, system=None):
+        replies = []
+        for prompt in prompts:
+            self.calls.append(prompt)
+            if "### Profile" not in prompt:
+                name = prompt.rsplit("NAME:", 1)[1].split()[0]
+                replies.append(json.dumps({"name": name, "title": "single"}))
+                continue
+            contacts = []
+            for block in prompt.split("\n### Profile ")[1:]:
+                pid, body = block.split("\n", 1)
+                name = body.split("NAME:", 1)[1].split()[0]
+                if name not in self.skip:
+                    contacts.append({"profile_id": pid, "name": name, "title": "packed"})
+            replies.append(json.dumps({"contacts": contacts[::-1]}))
+        return replies
+
+
+def _extractor(client, **kwargs):
+    return ContactExtractor(client, model="gpt-4o-mini", preprocess=False, narrow=False, **kwargs)
+
+
+def test_split_packed_reply_matches_by_id_then_url():
+    reply = json.dumps({"contacts": [
+        {"profile_id": "P2", "name": "Bo"},
+        {"profile_id": "?", "name": "Al", "linkedin_url": "https://linkedin.com/in/al"},
+        {"profile_id": "P2", "name": "Duplicate"},
+        "not an object",
+    ]})
+    matched = split_packed_reply(reply, ["P1", "P2", "P3"], ["https://www.linkedin.com/in/al/", None, None])
+    assert matched == {0: {"name": "Al", "linkedin_url": "https://linkedin.com/in/al"}, 1: {"name": "Bo"}}
+
+
+def test_render_pack_numbers_profiles():
+    prompt, ids = render_pack("Alpha", ["one", "two"])
+    assert ids == ["P1", "P2"]
+    assert "### Profile P1\none" in prompt and "### Profile P2\ntwo" in prompt and "Alpha" in prompt
+
+
+def test_extract_many_packs_per_school_and_retries_missing_items():
+    client = FakeClient(skip={"Cy"})
+    items = [
+        ("Alpha", "NAME: Al", "https://www.linkedin.com/in/al/"),
+        ("Beta", "NAME: Zed", "https://www.linkedin.com/in/zed/"),
+        ("Alpha", "NAME: Bo", "https://www.linkedin.com/in/bo/"),
+        ("Alpha", "NAME: Cy", "https://www.linkedin.com/in/cy/"),
+    ]
+    extractor = _extractor(client, pack_size=3)
+    contacts = extractor.extract_many(items)
+
+    assert [c["name"] for c in contacts] == ["Al", "Zed", "Bo", "Cy"]
+    assert [c["title"] for c in contacts] == ["packed", "single", "packed", "single"]
+    # One pack for Alpha, then Beta's lone profile and Cy's retry on their own
+    assert len(client.calls) == 3
+    assert extractor.packs == {"requests": 1, "profiles": 3, "fallbacks": 1}
+
+
+def test_unreadable_pack_falls_back_to_single_requests():
+    class Garbled(FakeClient):
+        def fetch_many(self, prompts, model, concurrency=None, response_format=None, system=None):
+            if "### Profile" in prompts[0]:
+                self.calls.extend(prompts)
+                return ["Sorry, I can't help with that."]
+            return super().fetch_many(prompts, model, concurrency, response_format, system)
+
+    client = Garbled()
+    items = [("Alpha", f"NAME: {n}", None) for n in ("Al", "Bo")]
+    contacts = _extractor(client, pack_size=2).extract_many(items)
+    assert [(c["name"], c["title"]) for c in contacts] == [("Al", "single"), ("Bo", "single")]
+    assert len(client.calls) == 3
@@ -0,0 +1,57 @@
+from pathlib import Path
+
+import pandas as pd
+
+from scraper.pre_extract import FIELDS, hit_rates, pre_extract, pre_extract_frame
+from scraper.preprocess import load_corpus
+
+CORPUS = Path(__file__).parent / "data" / "profiles"
+
+
+def test_pre_extract_matches_expected_contacts():
+    for name, text, expected in load_corpus(CORPUS):
+        found = pre_extract(text)
+        assert found["name"] == expected["name"], name
+        for field, value in found.items():
+            assert value == expected[field], (name, field)
+        for field in ("email", "phone"):
+            if expected[field]:
+                assert found.get(field) == expected[field], (name, field)
+
+
+def test_labels_without_values_are_not_matched():
+    assert pre_extract("Head of Science\nPhone\nEmail\n") == {}
+
+
+def test_unlabelled_addresses_and_links_are_not_matched():
+    text = (
+        "Jane Whitfield\nJane Whitfield\nHead of Mathematics at Riverside Academy\n"
+        "About\nQuestions about admissions go to info@riverside-academy.org or my colleague tom@riverside-academy.org.\n"
+        "People also viewed\nTom Reyes\nlinkedin.com/in/tom-reyes\n"
+    )
+    assert pre_extract(text) == {"name": "Jane Whitfield"}
+
+
+def test_frame_agrees_with_per_text_extraction():
+    corpus = load_corpus(CORPUS)
+    texts = pd.Series([text for _, text, _ in corpus] + [None])
+    frame = pre_extract_frame(texts)
+    for i, (_, text, _) in enumerate(corpus):
+        row = {f: v for f, v in frame.iloc[i].items() if isinstance(v, str)}
+        assert row == pre_extract(text)
+    assert frame.iloc[-1].isna().all()
+    assert hit_rates(frame)["name"] == len(corpus) / len(texts)
+    assert set(frame.columns) == set(FIELDS)
+
+
+def test_frame_falls_back_when_first_match_is_not_a_name():
+    # The modal heading carries a credential, so only the profile header gives the name
+    texts = pd.Series([
+        "Jane Whitfield\nJane Whitfield\nHead of Mathematics\n"
+        "Jane Whitfield, MEd\nContact Info\nJane's Profile\nlinkedin.com/in/jane-whitfield\n",
+    ])
+    frame = pre_extract_frame(texts)
+    for i, text in texts.items():
+        row = {f: v for f, v in frame.loc[i].items() if isinstance(v, str)}
+        assert row == pre_extract(text)
+    assert frame.loc[0, "name"] == "Jane Whitfield"
@@ -0,0 +1,32 @@
+from pathlib import Path
+
+from scraper.preprocess import benchmark, clean_profile_text, count_tokens
+
+CORPUS = Path(__file__).parent / "data" / "profiles"
+
+
+def test_benchmark_corpus_keeps_every_expected_value():
+    rows = benchmark(CORPUS, token_budget=1500)
+    assert rows
+    for row in rows:
+        assert row["recall_sent"] == row["recall_raw"] == 1.0, row["profile"]
+        assert row["tokens_sent"] < row["tokens_raw"], row["profile"]
+
+
+def test_boilerplate_and_repeats_are_removed():
+    text = (CORPUS / "teacher_with_contact.txt").read_text(encoding="utf-8")
+    cleaned, stats = clean_profile_text(text)
+    lines = cleaned.splitlines()
+    for noise in ("People also viewed", "Mark Olsen", "Accessibility", "Show all 4 experiences", "Message"):
+        assert noise not in lines
+    assert lines.count("Head of Mathematics") == 1
+    assert "jwhitfield@riverside-academy.org" in lines
+    assert stats["tokens_saved"] == stats["tokens_raw"] - stats["tokens_sent"] > 0
+
+
+def test_budget_cuts_low_priority_sections_first():
+    text = (CORPUS / "principal_long_history.txt").read_text(encoding="utf-8")
+    cleaned, _ = clean_profile_text(text, token_budget=80)
+    assert count_tokens(cleaned) <= 80
+    assert "Principal at Oakwood Elementary School" in cleaned
+    assert "Recommendations" not in cleaned
@@ -0,0 +1,28 @@
+from scraper.extraction import ContactExtractor, plausible
+from scraper.prompts import INSTRUCTIONS, DETAILS_INSTRUCTIONS, PACKED_INSTRUCTIONS
+
+from openai_api_call import OpenAIIntegration
+
+
+def test_static_prefix_is_shared_across_schools():
+    extractor = ContactExtractor(None, model="gpt-4o-mini", preprocess=False, narrow=False)
+    first = extractor._prompt("Riverside Academy", "Jane Whitfield\nHead of Mathematics")
+    second = extractor._prompt("Oakwood Elementary School", "Tom Reyes\nPrincipal")
+    assert first[0] == second[0] == INSTRUCTIONS
+    assert "Riverside Academy" in first[1] and "Riverside Academy" not in first[0]
+
+    body = OpenAIIntegration.payload(first[1], "gpt-4o-mini", first[3], first[0])
+    assert [m["role"] for m in body["messages"]] == ["system", "user"]
+    assert body["messages"][0]["content"] == INSTRUCTIONS
+
+
+def test_instructions_have_no_placeholders():
+    for instructions in (INSTRUCTIONS, DETAILS_INSTRUCTIONS, PACKED_INSTRUCTIONS):
+        assert "{school_name}" not in instructions and "{text}" not in instructions and "{name}" not in instructions
+
+
+def test_plausible_requires_title_and_a_name_from_the_text():
+    text = "Jane  Whitfield\nHead of Mathematics at Riverside Academy"
+    assert plausible({"name": "Jane Whitfield", "title": "Head of Mathematics"}, text)
+    assert not plausible({"name": "Jane Whitfield", "title": None}, text)
+    assert not plausible({"name": "Janet Smith", "title": "Head of Mathematics"}, text)
@@ -0,0 +1,61 @@
+from pathlib import Path
+
+from scraper.backends import FakeBackend
+from scraper.captures import CaptureStore
+from scraper.extraction import ContactExtractor
+from scraper.io_utils import ResultsJournal, ResultsStore, journal_path_for, store_path_for
+from scraper.reextract import reextract
+
+CORPUS = Path(__file__).parent / "data" / "profiles"
+
+
+def test_captures_are_compressed_and_latest_wins(tmp_path):
+    store = CaptureStore(tmp_path / "captures.sqlite")
+    text = (CORPUS / "principal_long_history.txt").read_text(encoding="utf-8")
+    store.record("https://linkedin.com/in/Marcus-Bell?trk=x", "Oakwood", "old", "", captured_at=1.0)
+    store.record("https://www.linkedin.com/in/marcus-bell/", "Oakwood", text, "Email\nmb@oak.org",
+                 contact_url="https://www.linkedin.com/in/marcus-bell/", captured_at=2.0)
+    [capture] = store.latest()
+    assert capture["url"] == "https://www.linkedin.com/in/marcus-bell/"
+    assert capture["main_text"] == text and capture["contact_text"] == "Email\nmb@oak.org"
+    stats = store.stats()
+    assert (stats["captures"], stats["profiles"]) == (2, 1)
+    assert stats["compression_ratio"] > 1.5
+    store.close()
+
+
+def test_latest_streams_every_profile_across_fetches(tmp_path, monkeypatch):
+    monkeypatch.setattr("scraper.captures.FETCH_SIZE", 2)
+    store = CaptureStore(tmp_path / "captures.sqlite")
+    for i in range(5):
+        store.record(f"https://www.linkedin.com/in/p{i}/", "Oakwood", f"text {i}", "")
+    rows = store.latest("Oakwood")
+    assert next(rows)["main_text"] == "text 0"
+    assert [c["main_text"] for c in rows] == [f"text {i}" for i in range(1, 5)]
+    store.close()
+
+
+def test_reextract_replaces_journaled_contacts_without_a_browser(tmp_path, monkeypatch):
+    monkeypatch.setattr(ResultsStore, "export_excel", lambda self, path: None)
+    monkeypatch.setattr("scraper.reextract.CHUNK_SIZE", 1)
+    output = tmp_path / "out.xlsx"
+    url = "https://www.linkedin.com/in/dana-ortiz-counsel/"
+    journal = ResultsJournal(journal_path_for(output))
+    journal.append("school", id="7", name="Hillcrest Middle School")
+    journal.append("contact", id="7", contact={"name": "Dana Ortiz", "title": None, "linkedin_url": url})
+    journal.close()
+
+    captures = CaptureStore(tmp_path / "captures.sqlite")
+    text = (CORPUS / "counselor_minimal.txt").read_text(encoding="utf-8")
+    captures.record(url, "Hillcrest Middle School", text, "", contact_url=url)
+    captures.record("https://www.linkedin.com/in/nobody/", "Unknown School", "Jo Bloggs\nJo Bloggs", "")
+
+    backend = FakeBackend()
+    counts = reextract(output, ContactExtractor(backend, model=backend.model), captures)
+    captures.close()
+    assert (counts["captures"], counts["contacts"], counts["orphaned"]) == (2, 1, 1)
+
+    store = ResultsStore(store_path_for(output))
+    [contact] = store.contacts_for("7")
+    store.close()
+    assert contact["linkedin_url"] == url and contact["title"] == "School Counselor"
@@ -0,0 +1,136 @@
+from scraper.io_utils import ResultsJournal, ResultsStore
+
+
+def _sample_journal(path):
+    journal = ResultsJournal(path)
+    journal.append("school", id="1", name="Alpha School")
+    journal.append("contact", id="1", contact={"name": "Jo Bloggs", "linkedin_url": "https://www.linkedin.com/in/jo/"})
+    journal.append("contact", id="1", contact={"name": "Jo B.", "linkedin_url": "http://linkedin.com/in/Jo?trk=x"})
+    journal.append("unmatched", id="2", name="Beta School")
+    journal.close()
+    return journal
+
+
+def test_journal_drops_torn_tail(tmp_path):
+    path = tmp_path / "out.journal.jsonl"
+    journal = ResultsJournal(path)
+    journal.append("school", id="1", name="Alpha School")
+    journal.close()
+    with open(path, "a", encoding="utf-8") as fh:
+        fh.write('{"seq": 2, "kind": "cont')  # crash mid-write
+
+    journal = ResultsJournal(path)
+    rec = journal.append("contact", id="1", contact={"name": "Jo Bloggs"})
+    journal.close()
+
+    assert rec["seq"] == 2
+    assert [r["kind"] for r in journal.replay()] == ["school", "contact"]
+
+
+def test_store_catch_up_dedups_and_resumes(tmp_path):
+    journal = _sample_journal(tmp_path / "out.journal.jsonl")
+    store = ResultsStore(tmp_path / "out.sqlite")
+    assert store.catch_up(journal) == 4
+    assert store.catch_up(journal) == 0  # already applied
+
+    assert store.school_status("1") == "matched"
+    assert store.school_status("2") == "unmatched"
+    assert store.school_status("3") is None
+    [contact] = store.contacts_for("1")  # same profile under another URL form
+    assert (contact["name"], contact["linkedin_url"]) == ("Jo B.", "https://www.linkedin.com/in/jo/")
+    assert list(store.unmatched_frame()["id"]) == ["2"]
+
+
+def test_store_from_an_older_version_is_rebuilt(tmp_path):
+    journal = _sample_journal(tmp_path / "out.journal.jsonl")
+    store = ResultsStore(tmp_path / "out.sqlite")
+    store.catch_up(journal)
+    with store.conn:
+        store.conn.execute("UPDATE meta SET value = '1' WHERE key = 'store_version'")
+    store.close()
+    store = ResultsStore(tmp_path / "out.sqlite")
+    assert store.applied_seq == 0 and store.school_status("1") is None
+    assert store.catch_up(journal) == 4
+    store.close()
+
+
+def test_workbook_roundtrip_uses_contacts_sheet(tmp_path):
+    import pandas as pd
+    from scraper.io_utils import EXCEL_CELL_LIMIT, TRUNCATED_MARKER, atomic_write_excel, read_output
+
+    bio = "x" * 40_000  # longer than an Excel cell can hold
+    df = pd.DataFrame([
+        {"id": "1", "name": "Alpha School", "contacts": [{"name": "Jo Bloggs", "bio": bio}, {"name": "Sam Smith"}]},
+        {"id": "2", "name": "Beta School", "contacts": []},
+    ])
+    path = tmp_path / "out.xlsx"
+    atomic_write_excel(df, path)
+
+    assert set(pd.read_excel(path, sheet_name=None)) == {"schools", "contacts"}
+    back = read_output(path)
+    assert [len(c) for c in back["contacts"]] == [2, 0]
+    assert back["contacts"][0][1]["name"] == "Sam Smith"
+    assert back["contacts"][0][1]["bio"] is None
+    long_bio = back["contacts"][0][0]["bio"]
+    assert len(long_bio) == EXCEL_CELL_LIMIT and long_bio.endswith(TRUNCATED_MARKER)
+
+
+def test_writer_coalesces_and_checkpoints_off_thread(tmp_path):
+    import threading
+    from scraper.io_utils import ResultsWriter
+
+    store = ResultsStore(tmp_path / "out.sqlite")
+    checkpoints = []
+    writer = ResultsWriter(
+        ResultsJournal(tmp_path / "out.journal.jsonl"),
+        store,
+        lambda: checkpoints.append(threading.current_thread().name),
+        checkpoint_every=100,
+    )
+    writer.submit("school", id="1", name="Alpha School")
+    for i in range(5):
+        writer.submit("contact", id="1", contact={"name": f"Person {i}", "linkedin_url": f"https://www.linkedin.com/in/p{i}/"})
+    writer.flush()
+    assert len(store.contacts_for("1")) == 5
+    assert checkpoints == []
+
+    writer.submit("unmatched", id="2", name="Beta School")
+    writer.close()
+    assert store.school_status("2") == "unmatched"
+    assert checkpoints and set(checkpoints) == {"results-writer"}
+
+
+def test_group_commit_batches_fsyncs(tmp_path):
+    from scraper.io_utils import DurableAppender
+
+    out = DurableAppender(tmp_path / "log.jsonl", policy="group", group_records=10, group_ms=60_000)
+    for i in range(25):
+        out.write_json({"i": i})
+    assert out.stats["fsyncs"] == 2  # at 10 and 20 records
+    out.close()
+    assert out.stats["fsyncs"] == 3  # remaining 5 synced on close
+    assert len((tmp_path / "log.jsonl").read_text().splitlines()) == 25
+
+
+def test_run_files_are_rebuilt_from_journal(tmp_path):
+    import json
+    from scraper.io_utils import export_run_files
+
+    journal = _sample_journal(tmp_path / "out.journal.jsonl")
+    assert export_run_files(journal, tmp_path / "runs") == 1
+    lines = (tmp_path / "runs" / "alpha-school.jsonl").read_text(encoding="utf-8").splitlines()
+    assert [json.loads(line)["name"] for line in lines] == ["Jo Bloggs", "Jo B."]
+    assert export_run_files(journal, tmp_path / "runs", since_seq=journal.last_seq) == 0
+
+
+def test_store_streams_excel_export(tmp_path):
+    from scraper.io_utils import read_output
+
+    journal = _sample_journal(tmp_path / "out.journal.jsonl")
+    store = ResultsStore(tmp_path / "out.sqlite")
+    store.catch_up(journal)
+    store.export_excel(tmp_path / "out.xlsx")
+
+    back = read_output(tmp_path / "out.xlsx")
+    assert list(back["id"]) == ["1"]
+    assert back["contacts"][0][0]["name"] == "Jo B."
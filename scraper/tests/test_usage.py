@@ -0,0 +1,34 @@
+import pytest
+
+from scraper.usage import UsageMeter, cost_usd
+
+
+def test_cost_prices_cached_tokens_separately():
+    usage = {"model": "gpt-4o-mini", "prompt_tokens": 1_000_000, "cached_tokens": 400_000, "completion_tokens": 100_000}
+    assert cost_usd(usage) == pytest.approx(0.6 * 0.15 + 0.4 * 0.075 + 0.1 * 0.60)
+    assert cost_usd({"model": "unknown", "prompt_tokens": 10}) == 0.0
+
+
+def test_meter_aggregates_per_scope():
+    meter = UsageMeter()
+    call = {"model": "gpt-4o-mini", "prompt_tokens": 100, "completion_tokens": 20, "latency_ms": 50, "retries": 1}
+    meter.begin("school")
+    for _ in range(2):
+        meter.begin("profile")
+        meter.record(call)
+        assert meter.end("profile")["prompt_tokens"] == 100
+    school = meter.end("school")
+    assert (school["calls"], school["retries"], school["completion_tokens"]) == (2, 2, 40)
+
+    meter.record(call)  # outside any profile, still counted for the run
+    run = meter.run_summary()
+    assert run["calls"] == 3 and run["profiles"] == 2
+    assert run["tokens_per_profile"] == 180
+
+
+def test_cached_share_of_prompt_tokens():
+    meter = UsageMeter()
+    meter.record({"model": "gpt-4o-mini", "prompt_tokens": 1500, "cached_tokens": 1024, "completion_tokens": 100})
+    meter.record({"model": "gpt-4o-mini", "prompt_tokens": 500, "completion_tokens": 100})
+    assert meter.run_summary()["cached_share"] == pytest.approx(1024 / 2000)
+    assert meter.end("profile")["cached_share"] == 0.0
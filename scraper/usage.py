@@ -0,0 +1,107 @@
+"""
+Token, latency and cost accounting for LLM calls.
+
+OpenAIIntegration reports one usage record per successful call through its
+``on_usage`` hook:
+
+    {"model", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms", "retries"}
+
+UsageMeter adds each record to every open scope. The scraper opens a
+``profile`` scope around each extraction and a ``school`` scope around each
+school, and the ``run`` scope stays open for the meter's lifetime. Closed
+scopes are written to the structured log as ``<scope>_usage`` events. A
+record tagged ``"scope": "run"`` (a losing hedge that finished after its
+caller moved on, see OpenAIIntegration.fetch_hedged) only counts towards
+the run.
+
+``cached_share`` is the fraction of prompt tokens the provider served from
+its prompt cache (the static instruction prefix, see prompts.py).
+"""
+from __future__ import annotations
+import threading
+from typing import Any, Dict
+
+# USD per 1M tokens: (input, cached input, output). Update when provider prices change.
+MODEL_PRICES = {
+    "gpt-4o-mini": (0.15, 0.075, 0.60),
+    "gpt-4o": (2.50, 1.25, 10.00),
+    "gpt-4.1-nano": (0.10, 0.025, 0.40),
+    "gpt-4.1-mini": (0.40, 0.10, 1.60),
+    "gpt-4.1": (2.00, 0.50, 8.00),
+    "gpt-4-turbo": (10.00, 10.00, 30.00),
+    "gpt-4": (30.00, 30.00, 60.00),
+    "gpt-3.5-turbo": (0.50, 0.50, 1.50),
+    "o1-preview": (15.00, 7.50, 60.00),
+    "o1-mini": (3.00, 1.50, 12.00),
+}
+
+USAGE_FIELDS = ("calls", "retries", "prompt_tokens", "completion_tokens", "cached_tokens", "latency_ms", "cost_usd")
+
+
+def cost_usd(usage: Dict[str, Any]) -> float:
+    """Price of one usage record; 0.0 for models without a known price."""
+    prices = MODEL_PRICES.get(usage.get("model"))
+    if prices is None:
+        return 0.0
+    input_price, cached_price, output_price = prices
+    cached = usage.get("cached_tokens") or 0
+    uncached = (usage.get("prompt_tokens") or 0) - cached
+    return (uncached * input_price + cached * cached_price + (usage.get("completion_tokens") or 0) * output_price) / 1e6
+
+
+def cached_share(totals: Dict[str, Any]) -> float:
+    prompt = totals.get("prompt_tokens") or 0
+    return (totals.get("cached_tokens") or 0) / prompt if prompt else 0.0
+
+
+def _empty() -> Dict[str, Any]:
+    return {f: 0 for f in USAGE_FIELDS}
+
+
+class UsageMeter:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._scopes: Dict[str, Dict[str, Any]] = {"run": _empty()}
+        self.profiles = 0
+
+    def record(self, usage: Dict[str, Any]) -> None:
+        """``on_usage`` hook for OpenAIIntegration."""
+        cost = cost_usd(usage)
+        with self._lock:
+            scopes = [self._scopes["run"]] if usage.get("scope") == "run" else self._scopes.values()
+            for totals in scopes:
+                totals["calls"] += 1
+                totals["retries"] += usage.get("retries") or 0
+                totals["prompt_tokens"] += usage.get("prompt_tokens") or 0
+                totals["completion_tokens"] += usage.get("completion_tokens") or 0
+                totals["cached_tokens"] += usage.get("cached_tokens") or 0
+                totals["latency_ms"] += usage.get("latency_ms") or 0
+                totals["cost_usd"] += cost
+
+    def begin(self, scope: str) -> None:
+        """Open (or restart) a scope; records from now on are added to it."""
+        with self._lock:
+            self._scopes[scope] = _empty()
+
+    def end(self, scope: str) -> Dict[str, Any]:
+        """Close a scope and return its totals (all zero if it was never opened) and cached share."""
+        with self._lock:
+            if scope == "profile":
+                self.profiles += 1
+            if scope == "run":
+                totals = dict(self._scopes["run"])
+            else:
+                totals = self._scopes.pop(scope, None) or _empty()
+        return {**totals, "cached_share": cached_share(totals)}
+
+    def run_summary(self) -> Dict[str, Any]:
+        """Run totals plus per-profile averages."""
+        totals = self.end("run")
+        n = self.profiles
+        tokens = totals["prompt_tokens"] + totals["completion_tokens"]
+        return {
+            **totals,
+            "profiles": n,
+            "tokens_per_profile": tokens / n if n else 0.0,
+            "cost_per_profile_usd": totals["cost_usd"] / n if n else 0.0,
+        }